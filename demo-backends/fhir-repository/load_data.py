@@ -1,13 +1,36 @@
+import os
+import re
+import glob
 import json
-import requests
 import time
+import codecs
+import asyncio
+import argparse
+import threading
+import requests
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 FHIR_SERVER_URL = "http://localhost:9090/fhir/r4"
 DATA_FILE = "united-health-fhir-data-repository.json"
 API_KEY = ""  # Configure API key here if needed
 
+BUNDLE_SIZE = 100  # Resources per Bundle in bulk mode
+BUNDLE_TYPE = "batch"  # "batch" loads entries independently, "transaction" loads a Bundle all or nothing
+CONCURRENCY = 8  # Requests in flight at the same time
+WINDOW_SIZE = 1000  # Resources held in memory at a time when streaming
+HOLD_LIMIT = 100000  # Resources held back when streaming, until the resources they reference are loaded
+
+READ_SIZE = 1024 * 1024
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+ENTRY_PATH = re.compile(r'Bundle\.entry\[(\d+)\]')
+BUNDLE_UNSUPPORTED = [404, 405, 501]  # Statuses of a server that does not take Bundles
 
-# Define order of resource loading to satisfy dependencies
+STATS_LOCK = threading.Lock()
+
+
+# Order of resource loading where resources reference each other in a cycle
 RESOURCE_ORDER = [
     "Organization",
     "Patient",
@@ -20,11 +43,11 @@ RESOURCE_ORDER = [
     "Observation",
     "MedicationRequest",
     "DiagnosticReport",
+    "Questionnaire",
+    "QuestionnaireResponse",
     "Claim",
     "ClaimResponse",
     "ExplanationOfBenefit",
-    "Questionnaire",
-    "QuestionnaireResponse",
     "AllergyIntolerance"
 ]
 
@@ -144,17 +167,10 @@ def fix_diagnostic_report(resource):
     # We will inject these IDs.
     return resource
 
-def inject_missing_resources(data):
-    """Injects missing resources required by other resources."""
-    
-    # Inject Organization/insurance-org
-    if 'Organization' not in data:
-        data['Organization'] = []
-    
-    orgs = {r['id']: r for r in data['Organization'] if 'id' in r}
-    if 'insurance-org' not in orgs:
-        print("Injecting missing Organization/insurance-org")
-        data['Organization'].append({
+# Resources required by other resources that the data may not contain, by type
+MISSING_RESOURCES = {
+    "Organization": [
+        {
             "resourceType": "Organization",
             "id": "insurance-org",
             "name": "Insurance Organization",
@@ -166,26 +182,16 @@ def inject_missing_resources(data):
                     "display": "Payer"
                 }]
             }]
-        })
-
-    # Inject Organization/64
-    if '64' not in orgs:
-        print("Injecting missing Organization/64")
-        data['Organization'].append({
+        },
+        {
             "resourceType": "Organization",
             "id": "64",
             "name": "Reference Organization 64",
             "active": True
-        })
-
-    # Inject Coverage/insurance-coverage
-    if 'Coverage' not in data:
-        data['Coverage'] = []
-
-    coverages = {r['id']: r for r in data['Coverage'] if 'id' in r}
-    if 'insurance-coverage' not in coverages:
-        print("Injecting missing Coverage/insurance-coverage")
-        data['Coverage'].append({
+        }
+    ],
+    "Coverage": [
+        {
             "resourceType": "Coverage",
             "id": "insurance-coverage",
             "status": "active",
@@ -193,140 +199,621 @@ def inject_missing_resources(data):
             "payor": [ { "reference": "Organization/insurance-org" } ],
             "subscriber": { "reference": "Patient/102" },
             "relationship": { "coding": [{ "system": "http://terminology.hl7.org/CodeSystem/subscriber-relationship", "code": "self" }] }
-        })
-
-    # Inject PractitionerRole/456
-    if 'PractitionerRole' not in data:
-        data['PractitionerRole'] = []
-    
-    roles = {r['id']: r for r in data['PractitionerRole'] if 'id' in r}
-    if '456' not in roles:
-        print("Injecting missing PractitionerRole/456")
-        data['PractitionerRole'].append({
+        }
+    ],
+    "PractitionerRole": [
+        {
             "resourceType": "PractitionerRole",
             "id": "456",
             "practitioner": { "reference": "Practitioner/456" },
             "organization": { "reference": "Organization/53" },
             "code": [ { "coding": [ { "system": "http://terminology.hl7.org/CodeSystem/v2-0286", "code": "RP", "display": "Referring Provider" } ] } ]
-        })
-
-    # Inject missing Locations
-    if 'Location' not in data:
-        data['Location'] = []
-    locs = {r['id']: r for r in data['Location'] if 'id' in r}
-    missing_locs = ['hospital', 'clinic1', 'emergency-dept', 'telehealth-unit', 'home', 'ward-a', 'day-surgery', 'ward-b', 'followup-clinic', 'intake-center']
-    for loc_id in missing_locs:
-        if loc_id not in locs:
-            print(f"Injecting missing Location/{loc_id}")
-            data['Location'].append({
-                "resourceType": "Location",
-                "id": loc_id,
-                "name": f"Location {loc_id}",
-                "status": "active"
-            })
-
-    # Inject missing Observations
-    if 'Observation' not in data:
-        data['Observation'] = []
-    obs = {r['id']: r for r in data['Observation'] if 'id' in r}
-    # Add all referenced observations that might be missing
-    missing_obs = ['observation-wbc', 'observation-cholesterol', 'observation-hemoglobin', 'observation-ldl', 'observation-hba1c', 'observation-hdl', 'observation-triglycerides']
-    for obs_id in missing_obs:
-        if obs_id not in obs:
-            print(f"Injecting missing Observation/{obs_id}")
-            data['Observation'].append({
-                "resourceType": "Observation",
-                "id": obs_id,
-                "status": "final",
-                "category": [{
-                    "coding": [{
-                        "system": "http://terminology.hl7.org/CodeSystem/observation-category",
-                        "code": "laboratory",
-                        "display": "Laboratory"
-                    }]
+        }
+    ],
+    "Location": [
+        {
+            "resourceType": "Location",
+            "id": loc_id,
+            "name": f"Location {loc_id}",
+            "status": "active"
+        }
+        for loc_id in ['hospital', 'clinic1', 'emergency-dept', 'telehealth-unit', 'home', 'ward-a', 'day-surgery', 'ward-b', 'followup-clinic', 'intake-center']
+    ],
+    # Referenced by DiagnosticReports
+    "Observation": [
+        {
+            "resourceType": "Observation",
+            "id": obs_id,
+            "status": "final",
+            "category": [{
+                "coding": [{
+                    "system": "http://terminology.hl7.org/CodeSystem/observation-category",
+                    "code": "laboratory",
+                    "display": "Laboratory"
+                }]
+            }],
+            "code": {
+                "coding": [{
+                    "system": "http://loinc.org",
+                    "code": "12345-6",
+                    "display": "Observation"
                 }],
-                "code": {
-                    "coding": [{
-                        "system": "http://loinc.org",
-                        "code": "12345-6",
-                        "display": "Observation"
-                    }],
-                    "text": "Observation"
-                },
-                "subject": { "reference": "Patient/102" }
-            })
-
-def load_data():
-    try:
-        with open(DATA_FILE, 'r') as f:
-            data = json.load(f)
-        
-        print(f"Loaded data from {DATA_FILE}")
-
-        inject_missing_resources(data)
-
-        # Get all resource types from data
-        available_types = list(data.keys())
-        
-        # Create a processing list: defined order first, then any remaining types
-        processing_list = [t for t in RESOURCE_ORDER if t in available_types]
-        remaining_types = [t for t in available_types if t not in RESOURCE_ORDER]
-        processing_list.extend(remaining_types)
-
-        for resource_type in processing_list:
-            if resource_type == 'QuestionnairePackage':
+                "text": "Observation"
+            },
+            "subject": { "reference": "Patient/102" }
+        }
+        for obs_id in ['observation-wbc', 'observation-cholesterol', 'observation-hemoglobin', 'observation-ldl', 'observation-hba1c', 'observation-hdl', 'observation-triglycerides']
+    ]
+}
+
+def with_missing_resources(resource_type, resources):
+    """Passes on the (type, resource) pairs of one type and injects the missing resources of the type after them.
+
+    Only the IDs of the resources that may be missing are remembered, so
+    the data can be streamed.
+    """
+    missing = {resource['id']: resource for resource in MISSING_RESOURCES.get(resource_type, [])}
+    for pair in resources:
+        if pair[0] == resource_type:
+            missing.pop(pair[1].get('id'), None)
+        yield pair
+    for resource_id, resource in missing.items():
+        print(f"Injecting missing {resource_type}/{resource_id}")
+        yield resource_type, dict(resource)
+
+def apply_fixes(resource_type, resource):
+    """Applies the fixes for known data issues of a resource type."""
+    if resource_type == 'QuestionnaireResponse':
+        resource = fix_questionnaire_response(resource)
+    if resource_type == 'Questionnaire':
+        resource = fix_questionnaire(resource)
+    if resource_type == 'ExplanationOfBenefit':
+        resource = fix_explanation_of_benefit(resource)
+    if resource_type == 'MedicationRequest':
+        resource = fix_medication_request(resource)
+    if resource_type == 'DiagnosticReport':
+        resource = fix_diagnostic_report(resource)
+    if resource_type == 'AllergyIntolerance':
+        # Fix bad practitioner reference
+        if 'recorder' in resource and resource['recorder'].get('reference') == 'Practitioner/practitioner-456':
+            resource['recorder']['reference'] = 'Practitioner/456'
+    return resource
+
+def prepare_resources(resources):
+    """Skips unsupported types and resources without an ID and fixes the rest, one resource at a time."""
+    skipped_types = set()
+    for resource_type, resource in resources:
+        if resource_type == 'QuestionnairePackage':
+            if resource_type not in skipped_types:
                 print(f"Skipping unsupported resource type: {resource_type}")
-                continue
+                skipped_types.add(resource_type)
+            continue
+        if not resource.get('id'):
+            print(f"Skipping {resource_type} without ID")
+            continue
+        yield resource_type, apply_fixes(resource_type, resource)
 
-            resources = data[resource_type]
-            print(f"Processing {resource_type} ({len(resources)} resources)...")
-            
-            for resource in resources:
-                resource_id = resource.get('id')
-                if not resource_id:
-                    print(f"Skipping {resource_type} without ID")
-                    continue
-                
-                # Apply fixes
-                if resource_type == 'QuestionnaireResponse':
-                    resource = fix_questionnaire_response(resource)
-                if resource_type == 'Questionnaire':
-                    resource = fix_questionnaire(resource)
-                if resource_type == 'ExplanationOfBenefit':
-                    resource = fix_explanation_of_benefit(resource)
-                if resource_type == 'MedicationRequest':
-                    resource = fix_medication_request(resource)
-                if resource_type == 'DiagnosticReport':
-                    resource = fix_diagnostic_report(resource)
-                if resource_type == 'AllergyIntolerance':
-                    # Fix bad practitioner reference
-                    if 'recorder' in resource and resource['recorder'].get('reference') == 'Practitioner/practitioner-456':
-                        resource['recorder']['reference'] = 'Practitioner/456'
-
-                url = f"{FHIR_SERVER_URL}/{resource_type}"
-                headers = {"Content-Type": "application/fhir+json"}
-                if API_KEY:
-                    headers["Test-Key"] = API_KEY
-                
-                try:
-                    response = requests.post(url, json=resource, headers=headers)
-                    if response.status_code in [200, 201]:
-                        print(f"Successfully loaded {resource_type}/{resource_id}")
-                    elif response.status_code == 409:
-                         print(f"Resource {resource_type}/{resource_id} already exists")
-                    else:
-                        print(f"Failed to load {resource_type}/{resource_id}: {response.status_code} - {response.text}")
-                except Exception as e:
-                     print(f"Error loading {resource_type}/{resource_id}: {str(e)}")
-                
-                time.sleep(0.01)
+def loading_order(available_types):
+    """Returns the types in RESOURCE_ORDER first, then the remaining types in their original order."""
+    processing_list = [t for t in RESOURCE_ORDER if t in available_types]
+    remaining_types = [t for t in available_types if t not in RESOURCE_ORDER]
+    processing_list.extend(remaining_types)
+    return processing_list
+
+def read_data(data):
+    """Yields the (type, resource) pairs of grouped data held in memory, type by type in loading order."""
+    for resource_type in loading_order(list(data) + [t for t in MISSING_RESOURCES if t not in data]):
+        resources = ((resource_type, resource) for resource in data.get(resource_type, []))
+        yield from with_missing_resources(resource_type, resources)
+
+class JsonStream:
+    """Reads the arrays of a grouped JSON file incrementally, one element at a time.
+
+    The file is read in blocks and each element is decoded with
+    `json.JSONDecoder.raw_decode` once the buffer holds all of it, so only
+    the element being decoded is kept in memory.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.decoder = json.JSONDecoder()
+        self.seek(0)
+
+    def seek(self, offset):
+        """Continues reading at a byte offset of the file."""
+        self.file.seek(offset)
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+
+    def tell(self):
+        """Returns the byte offset of the next character to read."""
+        pending = self.utf8.getstate()[0]
+        return self.file.tell() - len(pending) - len(self.buffer[self.pos:].encode('utf-8'))
+
+    def _fill(self, size=READ_SIZE):
+        """Reads more of the file into the buffer, False at the end of the file."""
+        data = self.file.read(size)
+        self.buffer = self.buffer[self.pos:] + self.utf8.decode(data, final=not data)
+        self.pos = 0
+        return bool(data)
+
+    def peek(self):
+        """Skips whitespace and returns the next character, '' at the end of the file."""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buffer, self.pos)
+        self.pos += 1
+
+    def decode(self):
+        """Decodes the next value, reading until the buffer holds all of it."""
+        self.peek()
+        while True:
+            try:
+                value, self.pos = self.decoder.raw_decode(self.buffer, self.pos)
+                return value
+            except json.JSONDecodeError:
+                # Read at least as much again, so large values aren't decoded over and over
+                if not self._fill(max(READ_SIZE, len(self.buffer) - self.pos)):
+                    raise
+
+    def array(self):
+        """Yields the elements of the array at the current position."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.decode()
+            if self.peek() != ',':
+                self.expect(']')
+                return
+            self.pos += 1
+
+    def index(self):
+        """Returns the byte offset of the array of every key of the top-level object."""
+        offsets = {}
+        self.expect('{')
+        if self.peek() == '}':
+            return offsets
+        while True:
+            key = self.decode()
+            self.expect(':')
+            offsets[key] = self.tell()
+            for _ in self.array():
+                pass
+            if self.peek() != ',':
+                self.expect('}')
+                return offsets
+            self.pos += 1
+
+def read_grouped_json(path):
+    """Streams the (type, resource) pairs of a grouped JSON file, type by type in loading order.
+
+    A first pass finds where the array of each type starts, then the arrays
+    are read in loading order.
+    """
+    with open(path, 'rb') as f:
+        stream = JsonStream(f)
+        offsets = stream.index()
+        for resource_type in loading_order(list(offsets) + [t for t in MISSING_RESOURCES if t not in offsets]):
+            resources = ()
+            if resource_type in offsets:
+                stream.seek(offsets[resource_type])
+                resources = ((resource_type, resource) for resource in stream.array())
+            yield from with_missing_resources(resource_type, resources)
+
+def read_ndjson_files(paths, resource_type):
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    resource = json.loads(line)
+                    yield resource.get('resourceType', resource_type), resource
+
+def read_ndjson(path):
+    """Streams the (type, resource) pairs of Bulk Data NDJSON files, type by type in loading order.
+
+    `path` is a directory of NDJSON files or a single file. Bulk Data
+    exports name each file after the type of its resources, as in
+    `Patient.ndjson` or `Patient.000.ndjson`.
+    """
+    paths = sorted(glob.glob(os.path.join(path, '*.ndjson'))) if os.path.isdir(path) else [path]
+    files = defaultdict(list)
+    for file_path in paths:
+        files[os.path.basename(file_path).split('.')[0]].append(file_path)
+    for resource_type in loading_order(list(files) + [t for t in MISSING_RESOURCES if t not in files]):
+        yield from with_missing_resources(resource_type, read_ndjson_files(files.get(resource_type, []), resource_type))
+
+def type_rank(resource_type):
+    """Returns the position of a resource type in RESOURCE_ORDER, unknown types last."""
+    if resource_type in RESOURCE_ORDER:
+        return RESOURCE_ORDER.index(resource_type)
+    return len(RESOURCE_ORDER)
+
+def resource_key(reference):
+    """Returns the (type, id) a literal reference points to, None for contained and logical references."""
+    if reference.startswith(('#', 'urn:')):
+        return None
+    parts = reference.split('/')
+    if '_history' in parts:
+        parts = parts[:parts.index('_history')]
+    if len(parts) < 2:
+        return None
+    return parts[-2], parts[-1]
+
+def find_references(value):
+    """Yields every reference string in a resource."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == 'reference' and isinstance(item, str):
+                yield item
+            else:
+                yield from find_references(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from find_references(item)
+
+def dependency_levels(resources):
+    """Orders (type, resource) pairs into levels that only reference resources of earlier levels.
+
+    A resource depends on the resources of the dataset it references, so the
+    resources of one level can be loaded at the same time. Resources that
+    reference each other in a cycle are loaded in RESOURCE_ORDER instead.
+    """
+    indices = defaultdict(list)
+    for index, (resource_type, resource) in enumerate(resources):
+        indices[(resource_type, resource['id'])].append(index)
+
+    dependents = defaultdict(list)
+    remaining = {}
+    for index, (resource_type, resource) in enumerate(resources):
+        dependencies = set()
+        for reference in find_references(resource):
+            key = resource_key(reference)
+            if key != (resource_type, resource['id']):
+                dependencies.update(indices.get(key, []))
+        for dependency in dependencies:
+            dependents[dependency].append(index)
+        remaining[index] = len(dependencies)
+
+    levels = []
+    ready = [index for index, count in remaining.items() if count == 0]
+    while remaining:
+        if not ready:
+            # Only cycles are left, load the type that comes first in RESOURCE_ORDER
+            rank = min(type_rank(resources[index][0]) for index in remaining)
+            ready = [index for index in remaining if type_rank(resources[index][0]) == rank]
+            print(f"Resources reference each other in a cycle, loading {resources[ready[0]][0]} first")
+        ready.sort()
+        levels.append([resources[index] for index in ready])
+        for index in ready:
+            del remaining[index]
+        next_ready = []
+        for index in ready:
+            for dependent in dependents[index]:
+                if dependent in remaining:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        next_ready.append(dependent)
+        ready = next_ready
+    return levels
+
+def stream_windows(resources, window, hold_limit=HOLD_LIMIT):
+    """Groups a stream of (type, resource) pairs into windows to load one after another.
+
+    Every window is expected to be loaded before the next one is taken. A
+    resource that references a resource which is neither loaded nor in its
+    window is held back until that resource arrives, and is then loaded
+    with the window it arrives in. Resources still held at the end of the
+    stream reference resources outside the data and make up the last
+    window. Once more than `hold_limit` are held, the oldest are loaded
+    without waiting.
+    """
+    loaded = set()
+    held = {}  # Hold number -> (pair, key, references)
+    waiting = defaultdict(list)  # Key of a missing resource -> hold numbers of the resources referencing it
+    holds = 0
+
+    def references(pair):
+        resource_type, resource = pair
+        key = (resource_type, resource['id'])
+        return key, {ref for ref in map(resource_key, find_references(resource)) if ref and ref != key}
+
+    def take(batch):
+        nonlocal holds
+        candidates = [(pair, *references(pair)) for pair in batch]
+        # Held resources waiting for a resource in the window, or for one of those, join the window
+        frontier = [key for _, key, _ in candidates]
+        while frontier:
+            arrived, frontier = frontier, []
+            for key in arrived:
+                for number in waiting.pop(key, ()):
+                    if number in held:
+                        candidate = held.pop(number)
+                        candidates.append(candidate)
+                        frontier.append(candidate[1])
+
+        # A resource waits if it references a missing resource, or one in the window that waits
+        keys = {key for _, key, _ in candidates}
+        dependents = defaultdict(list)
+        blocked = set()
+        for position, (_, key, refs) in enumerate(candidates):
+            for ref in refs - loaded:
+                if ref in keys:
+                    dependents[ref].append(position)
+                else:
+                    blocked.add(position)
+        frontier = list(blocked)
+        while frontier:
+            key = candidates[frontier.pop()][1]
+            for position in dependents.pop(key, ()):
+                if position not in blocked:
+                    blocked.add(position)
+                    frontier.append(position)
+
+        ready = []
+        for position, candidate in enumerate(candidates):
+            if position in blocked:
+                holds += 1
+                held[holds] = candidate
+                for ref in candidate[2] - loaded:
+                    waiting[ref].append(holds)
+            else:
+                ready.append(candidate)
+        if len(held) > hold_limit:
+            overflow = [held.pop(number) for number in list(held)[:len(held) - hold_limit]]
+            print(f"More than {hold_limit} resources wait for resources they reference, "
+                  f"loading {len(overflow)} of them without waiting")
+            ready.extend(overflow)
+        loaded.update(key for _, key, _ in ready)
+        return [pair for pair, _, _ in ready]
+
+    batch = []
+    for pair in resources:
+        batch.append(pair)
+        if len(batch) == window:
+            ready = take(batch)
+            batch = []
+            if ready:
+                yield ready
+    ready = take(batch)
+    if ready:
+        yield ready
+    if held:
+        print(f"{len(held)} resources reference resources that are not in the data, loading them last")
+        yield [pair for pair, _, _ in held.values()]
+
+def create_session(pool_size=CONCURRENCY):
+    """Creates a keep-alive session, so requests reuse pooled connections."""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_maxsize=pool_size))
+    session.mount("https://", HTTPAdapter(pool_maxsize=pool_size))
+    session.headers["Content-Type"] = "application/fhir+json"
+    if API_KEY:
+        session.headers["Test-Key"] = API_KEY
+    return session
+
+def count(stats, outcome, number=1):
+    """Counts outcomes, requests run on several threads."""
+    with STATS_LOCK:
+        stats[outcome] += number
+
+def report_outcome(stats, resource_type, resource_id, status_code, text):
+    """Prints and counts the outcome of loading one resource."""
+    if status_code in [200, 201]:
+        print(f"Successfully loaded {resource_type}/{resource_id}")
+        count(stats, "loaded")
+    elif status_code == 409:
+        print(f"Resource {resource_type}/{resource_id} already exists")
+        count(stats, "exists")
+    else:
+        print(f"Failed to load {resource_type}/{resource_id}: {status_code} - {text}")
+        count(stats, "failed")
+
+def post_resource(session, stats, resource_type, resource):
+    """POSTs a single resource."""
+    resource_id = resource['id']
+    try:
+        response = session.post(f"{FHIR_SERVER_URL}/{resource_type}", json=resource)
+        report_outcome(stats, resource_type, resource_id, response.status_code, response.text)
+    except Exception as e:
+        print(f"Error loading {resource_type}/{resource_id}: {str(e)}")
+        count(stats, "failed")
+
+def entry_status(entry):
+    """Returns the HTTP status code and outcome text of a Bundle response entry."""
+    response = entry.get('response', {})
+    try:
+        status_code = int(str(response.get('status', '')).split()[0])
+    except (ValueError, IndexError):
+        status_code = 0
+    return status_code, json.dumps(response.get('outcome', response))
+
+def outcome_entries(outcome):
+    """Returns the indexes of the Bundle entries the issues of an OperationOutcome point at."""
+    indexes = set()
+    if not isinstance(outcome, dict) or outcome.get('resourceType') != 'OperationOutcome':
+        return indexes
+    for issue in outcome.get('issue', []):
+        for path in issue.get('expression', []) + issue.get('location', []):
+            match = ENTRY_PATH.match(path)
+            if match:
+                indexes.add(int(match.group(1)))
+    return indexes
+
+def post_bundle(session, stats, resource_type, resources, bundle_type=BUNDLE_TYPE):
+    """POSTs resources of one type as a batch or transaction Bundle and reports every entry.
+
+    Returns False when the server does not support Bundles (404, 405 or
+    501), so the caller can load the resources one by one instead. When the
+    Bundle as a whole is rejected, nothing in it was loaded: entries the
+    OperationOutcome points at get the response status and the others fail.
+    """
+    bundle = {
+        "resourceType": "Bundle",
+        "type": bundle_type,
+        "entry": [
+            {"resource": resource, "request": {"method": "POST", "url": resource_type}}
+            for resource in resources
+        ]
+    }
+    try:
+        response = session.post(FHIR_SERVER_URL, json=bundle)
+    except Exception as e:
+        print(f"Error loading {resource_type} Bundle: {str(e)}")
+        count(stats, "failed", len(resources))
+        return True
+    try:
+        result = response.json()
+    except ValueError:
+        result = {}
+    if response.status_code in BUNDLE_UNSUPPORTED:
+        print(f"Server did not accept a {bundle_type} Bundle ({response.status_code}), loading resources one by one")
+        return False
+    if response.status_code not in [200, 201] or result.get('resourceType') != 'Bundle':
+        causes = outcome_entries(result)
+        for index, resource in enumerate(resources):
+            if index in causes:
+                report_outcome(stats, resource_type, resource['id'], response.status_code, response.text)
+            else:
+                print(f"Failed to load {resource_type}/{resource['id']}: "
+                      f"{bundle_type} Bundle rejected with {response.status_code}")
+                count(stats, "failed")
+        return True
+
+    # Response entries are in the same order as the request entries
+    entries = result.get('entry', [])
+    for index, resource in enumerate(resources):
+        if index < len(entries):
+            status_code, text = entry_status(entries[index])
+        else:
+            status_code, text = 0, "no response entry"
+        report_outcome(stats, resource_type, resource['id'], status_code, text)
+    return True
+
+async def load_levels(session, stats, levels, concurrency, bulk, bundle_size, bundle_type):
+    """Loads the levels one after another and the resources of each level concurrently.
+
+    At most `concurrency` requests are in flight, each on a thread of its
+    own over the shared session. A level starts once every request of the
+    previous one has finished, so referenced resources always exist first.
+    Returns whether the server still takes Bundles in bulk mode.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load")
+    bundles = {"supported": bulk}
+
+    async def load_chunk(resource_type, chunk):
+        if bundles["supported"]:
+            if await loop.run_in_executor(executor, post_bundle, session, stats, resource_type, chunk, bundle_type):
+                return
+            # The server does not support Bundles, don't try again
+            bundles["supported"] = False
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, post_resource, session, stats, resource_type, resource)
+            for resource in chunk
+        ))
+
+    try:
+        for number, level in enumerate(levels, 1):
+            by_type = defaultdict(list)
+            for resource_type, resource in level:
+                by_type[resource_type].append(resource)
+            summary = ", ".join(f"{resource_type} ({len(resources)})" for resource_type, resources in by_type.items())
+            print(f"Processing level {number} of {len(levels)}: {summary}...")
+
+            # Bundles never mix types and only hold resources of one level
+            chunk_size = bundle_size if bundles["supported"] else len(level)
+            await asyncio.gather(*(
+                load_chunk(resource_type, resources[start:start + chunk_size])
+                for resource_type, resources in by_type.items()
+                for start in range(0, len(resources), chunk_size)
+            ))
+    finally:
+        executor.shutdown(wait=True)
+    return bundles["supported"]
+
+async def load_stream(session, stats, resources, window, concurrency, bulk, bundle_size, bundle_type,
+                      hold_limit=HOLD_LIMIT):
+    """Loads a stream of (type, resource) pairs in windows of `window` resources.
+
+    Only one window, the resources held back by `stream_windows` and the
+    IDs of loaded resources are kept in memory. The resources of a window
+    are loaded in dependency levels, so every resource is loaded after the
+    resources of the data it references, in whichever window they arrive.
+    """
+    for batch in stream_windows(resources, window, hold_limit):
+        bulk = await load_levels(session, stats, dependency_levels(batch), concurrency, bulk, bundle_size, bundle_type)
+
+def load_data(data_file=DATA_FILE, bulk=False, bundle_size=BUNDLE_SIZE, bundle_type=BUNDLE_TYPE,
+              concurrency=CONCURRENCY, stream=False, window=WINDOW_SIZE, hold_limit=HOLD_LIMIT):
+    """Loads a data file into the FHIR server.
+
+    The resources are ordered into dependency levels from the references in
+    the data and the resources of a level are loaded concurrently, up to
+    `concurrency` requests at a time over one keep-alive session. By default
+    every resource is POSTed on its own. In bulk mode the resources of each
+    type in a level are POSTed as Bundles of `bundle_size` and the outcome
+    of every entry is reported the same way.
+
+    Bulk Data NDJSON files, or a grouped JSON file with `stream`, are read
+    and loaded in windows of `window` resources, so memory use only grows
+    with the IDs of the data. Resources that reference resources further
+    on in the data wait for them, up to `hold_limit` at a time.
+    """
+    stats = Counter()
+    started = time.perf_counter()
+    session = create_session(concurrency)
+    try:
+        ndjson = os.path.isdir(data_file) or data_file.endswith('.ndjson')
+        if ndjson or stream:
+            resources = read_ndjson(data_file) if ndjson else read_grouped_json(data_file)
+            print(f"Streaming data from {data_file}")
+            asyncio.run(load_stream(session, stats, prepare_resources(resources), window,
+                                    concurrency, bulk, bundle_size, bundle_type, hold_limit))
+        else:
+            with open(data_file, 'r') as f:
+                data = json.load(f)
+
+            print(f"Loaded data from {data_file}")
+
+            # Fixes rewrite references, so apply them before ordering
+            levels = dependency_levels(list(prepare_resources(read_data(data))))
+            asyncio.run(load_levels(session, stats, levels, concurrency, bulk, bundle_size, bundle_type))
 
     except FileNotFoundError:
-        print(f"Error: Data file not found at {DATA_FILE}")
+        print(f"Error: Data file not found at {data_file}")
     except json.JSONDecodeError:
-        print(f"Error: Failed to decode JSON from {DATA_FILE}")
+        print(f"Error: Failed to decode JSON from {data_file}")
     except Exception as e:
         print(f"An unexpected error occurred: {str(e)}")
+    finally:
+        session.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Loaded {stats['loaded']}, already existing {stats['exists']}, failed {stats['failed']} in {elapsed:.1f}s")
 
 if __name__ == "__main__":
-    load_data()
+    parser = argparse.ArgumentParser(description="Load sample data into the FHIR server.")
+    parser.add_argument("data_file", nargs="?", default=DATA_FILE,
+                        help="Grouped JSON file, Bulk Data NDJSON file or directory of NDJSON files")
+    parser.add_argument("--stream", action="store_true", help="Read a grouped JSON file incrementally")
+    parser.add_argument("--window", type=int, default=WINDOW_SIZE,
+                        help="Resources held in memory at a time when streaming")
+    parser.add_argument("--hold-limit", type=int, default=HOLD_LIMIT,
+                        help="Resources held back when streaming until the resources they reference are loaded")
+    parser.add_argument("--bulk", action="store_true", help="POST resources as batch or transaction Bundles")
+    parser.add_argument("--bundle-size", type=int, default=BUNDLE_SIZE, help="Resources per Bundle in bulk mode")
+    parser.add_argument("--bundle-type", choices=["batch", "transaction"], default=BUNDLE_TYPE,
+                        help="Bundle type in bulk mode")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Requests in flight at the same time")
+    args = parser.parse_args()
+    load_data(args.data_file, bulk=args.bulk, bundle_size=max(1, args.bundle_size), bundle_type=args.bundle_type,
+              concurrency=max(1, args.concurrency), stream=args.stream, window=max(1, args.window),
+              hold_limit=max(0, args.hold_limit))
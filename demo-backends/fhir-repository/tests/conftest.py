@@ -0,0 +1,5 @@
+import os
+import sys
+
+# load_data.py is a script, so make it importable from the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
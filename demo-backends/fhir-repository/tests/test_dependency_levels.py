@@ -0,0 +1,66 @@
+from load_data import dependency_levels, resource_key
+
+
+def resource(resource_type, resource_id, *references):
+    return resource_type, {
+        "resourceType": resource_type,
+        "id": resource_id,
+        "extension": [{"valueReference": {"reference": reference}} for reference in references],
+    }
+
+
+def keys(levels):
+    return [[(resource_type, item["id"]) for resource_type, item in level] for level in levels]
+
+
+def test_resource_key():
+    assert resource_key("Patient/123") == ("Patient", "123")
+    assert resource_key("http://example.org/fhir/Patient/123") == ("Patient", "123")
+    assert resource_key("Patient/123/_history/2") == ("Patient", "123")
+    assert resource_key("#contained") is None
+    assert resource_key("urn:uuid:0d3c0b3e") is None
+    assert resource_key("Patient") is None
+
+
+def test_levels_only_reference_earlier_levels():
+    levels = dependency_levels([
+        resource("Claim", "c", "Patient/p", "Coverage/cov"),
+        resource("Coverage", "cov", "Patient/p", "Organization/o"),
+        resource("Patient", "p", "Practitioner/gp"),
+        resource("Practitioner", "gp"),
+        resource("Organization", "o"),
+    ])
+    assert keys(levels) == [
+        [("Practitioner", "gp"), ("Organization", "o")],
+        [("Patient", "p")],
+        [("Coverage", "cov")],
+        [("Claim", "c")],
+    ]
+
+
+def test_references_outside_the_data_and_to_itself_are_ignored():
+    levels = dependency_levels([
+        resource("Observation", "o", "Patient/elsewhere", "Observation/o", "#contained"),
+        resource("Patient", "p"),
+    ])
+    assert keys(levels) == [[("Observation", "o"), ("Patient", "p")]]
+
+
+def test_cycles_are_broken_in_resource_order(capsys):
+    levels = dependency_levels([
+        resource("Encounter", "e", "Condition/c"),
+        resource("Condition", "c", "Encounter/e"),
+        resource("Observation", "o", "Encounter/e"),
+    ])
+    # Encounter comes before Condition in RESOURCE_ORDER, the rest follows its references
+    assert keys(levels) == [[("Encounter", "e")], [("Condition", "c"), ("Observation", "o")]]
+    assert "cycle" in capsys.readouterr().out
+
+
+def test_duplicate_ids_all_wait_for_their_dependencies():
+    levels = dependency_levels([
+        resource("Patient", "p", "Organization/o"),
+        resource("Patient", "p", "Organization/o"),
+        resource("Organization", "o"),
+    ])
+    assert keys(levels) == [[("Organization", "o")], [("Patient", "p"), ("Patient", "p")]]
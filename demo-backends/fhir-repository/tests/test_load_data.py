@@ -0,0 +1,140 @@
+import io
+import json
+import asyncio
+
+import pytest
+
+import load_data
+from load_data import JsonStream, load_stream, read_data, read_grouped_json, stream_windows
+
+
+def resource(resource_type, resource_id, *references):
+    return resource_type, {
+        "resourceType": resource_type,
+        "id": resource_id,
+        "extension": [{"valueReference": {"reference": reference}} for reference in references],
+    }
+
+
+def keys(pairs):
+    return [(resource_type, item["id"]) for resource_type, item in pairs]
+
+
+@pytest.fixture(params=[1, 2, 7])
+def small_reads(request, monkeypatch):
+    # `_fill` binds READ_SIZE when it is defined, so patch its default
+    monkeypatch.setattr(JsonStream._fill, "__defaults__", (request.param,))
+    monkeypatch.setattr(load_data, "READ_SIZE", request.param)
+
+
+GROUPED = {
+    "Patient": [
+        {"resourceType": "Patient", "id": "p1", "name": [{"text": "Zoë Ångström 漢字"}]},
+        {"resourceType": "Patient", "id": "p2", "name": [{"text": "\U0001f600 emoji"}]},
+    ],
+    "Empty": [],
+    "Practitioner": [{"resourceType": "Practitioner", "id": "gp", "note": "café à – —"}],
+}
+
+
+def grouped_bytes():
+    return json.dumps(GROUPED, ensure_ascii=False, indent=1).encode("utf-8")
+
+
+def test_json_stream_reads_arrays_across_buffer_boundaries(small_reads):
+    stream = JsonStream(io.BytesIO(grouped_bytes()))
+    offsets = stream.index()
+    assert list(offsets) == list(GROUPED)
+    for resource_type, resources in GROUPED.items():
+        stream.seek(offsets[resource_type])
+        assert list(stream.array()) == resources
+
+
+def test_json_stream_offsets_are_byte_offsets(small_reads):
+    data = grouped_bytes()
+    offsets = JsonStream(io.BytesIO(data)).index()
+    for resource_type in GROUPED:
+        # Each offset points at the array of its key, after multibyte text
+        rest = data[offsets[resource_type]:].decode("utf-8").lstrip()
+        assert rest.startswith("[")
+        assert json.JSONDecoder().raw_decode(rest)[0] == GROUPED[resource_type]
+
+
+def test_read_grouped_json_matches_reading_whole_file(small_reads, tmp_path):
+    path = tmp_path / "data.json"
+    path.write_bytes(grouped_bytes())
+    assert list(read_grouped_json(str(path))) == list(read_data(GROUPED))
+
+
+def test_stream_windows_holds_forward_references_until_target_arrives():
+    # Resources of one window are ordered by dependency_levels when loading
+    windows = list(stream_windows([
+        resource("Patient", "p1", "Practitioner/gp"),
+        resource("Patient", "p2"),
+        resource("Patient", "p3", "Patient/p4"),
+        resource("Patient", "p4"),
+        resource("Practitioner", "gp"),
+    ], window=2))
+    assert [keys(batch) for batch in windows] == [
+        [("Patient", "p2")],
+        [("Patient", "p3"), ("Patient", "p4")],
+        [("Practitioner", "gp"), ("Patient", "p1")],
+    ]
+
+
+def test_stream_windows_releases_chains_of_held_resources():
+    windows = list(stream_windows([
+        resource("Encounter", "e", "Condition/c"),
+        resource("Claim", "cl", "Encounter/e"),
+        resource("Condition", "c"),
+    ], window=1))
+    assert [keys(batch) for batch in windows] == [
+        [("Condition", "c"), ("Encounter", "e"), ("Claim", "cl")],
+    ]
+
+
+def test_stream_windows_loads_resources_with_missing_references_last(capsys):
+    windows = list(stream_windows([
+        resource("Patient", "p1", "Practitioner/missing"),
+        resource("Observation", "o", "Patient/p1"),
+        resource("Patient", "p2"),
+    ], window=1))
+    assert [keys(batch) for batch in windows] == [
+        [("Patient", "p2")],
+        [("Patient", "p1"), ("Observation", "o")],
+    ]
+    assert "2 resources reference resources that are not in the data" in capsys.readouterr().out
+
+
+def test_stream_windows_loads_oldest_held_resources_past_the_limit(capsys):
+    windows = list(stream_windows([
+        resource("Patient", "p1", "Practitioner/gp"),
+        resource("Patient", "p2", "Practitioner/gp"),
+        resource("Practitioner", "gp"),
+    ], window=1, hold_limit=1))
+    assert [keys(batch) for batch in windows] == [
+        [("Patient", "p1")],
+        [("Practitioner", "gp"), ("Patient", "p2")],
+    ]
+    assert "loading 1 of them without waiting" in capsys.readouterr().out
+
+
+def test_load_stream_posts_referenced_resources_first(monkeypatch):
+    posted = []
+    monkeypatch.setattr(load_data, "post_resource",
+                        lambda session, stats, resource_type, item: posted.append((resource_type, item["id"])))
+    asyncio.run(load_stream(None, {}, iter([
+        resource("Patient", "p1", "Practitioner/gp"),
+        resource("Patient", "p2", "Patient/p3"),
+        resource("Patient", "p3"),
+        resource("Practitioner", "gp"),
+        resource("PractitionerRole", "r", "Practitioner/gp", "Location/l"),
+        resource("Location", "l"),
+    ]), 2, 1, False, 100, "batch"))
+    assert sorted(posted) == sorted(keys([
+        resource("Patient", "p1"), resource("Patient", "p2"), resource("Patient", "p3"),
+        resource("Practitioner", "gp"), resource("PractitionerRole", "r"), resource("Location", "l"),
+    ]))
+    assert posted.index(("Practitioner", "gp")) < posted.index(("Patient", "p1"))
+    assert posted.index(("Patient", "p3")) < posted.index(("Patient", "p2"))
+    assert posted.index(("Location", "l")) < posted.index(("PractitionerRole", "r"))
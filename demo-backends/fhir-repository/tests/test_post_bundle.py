@@ -0,0 +1,118 @@
+import json
+import asyncio
+from collections import Counter
+
+import load_data
+from load_data import entry_status, load_levels, post_bundle
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.text = json.dumps(body) if body is not None else "error"
+        self.body = body
+
+    def json(self):
+        if self.body is None:
+            raise ValueError("no JSON body")
+        return self.body
+
+
+class FakeSession:
+    """Answers Bundle POSTs with the given responses in order and records the requests."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def post(self, url, json=None):
+        self.requests.append((url, json))
+        return self.responses.pop(0)
+
+
+def patients(*ids):
+    return [{"resourceType": "Patient", "id": resource_id} for resource_id in ids]
+
+
+def bundle_response(*statuses):
+    return FakeResponse(200, {
+        "resourceType": "Bundle",
+        "type": "batch-response",
+        "entry": [{"response": {"status": status}} for status in statuses],
+    })
+
+
+def outcome(*entries):
+    return {
+        "resourceType": "OperationOutcome",
+        "issue": [{"severity": "error", "code": "conflict", "expression": [f"Bundle.entry[{index}]"]}
+                  for index in entries],
+    }
+
+
+def test_entry_status_parses_status_lines():
+    assert entry_status({"response": {"status": "201 Created"}})[0] == 201
+    assert entry_status({"response": {"status": "409"}})[0] == 409
+    assert entry_status({"response": {}})[0] == 0
+    assert entry_status({})[0] == 0
+
+
+def test_post_bundle_reports_every_entry():
+    stats = Counter()
+    session = FakeSession(bundle_response("201 Created", "409 Conflict", "400 Bad Request"))
+    assert post_bundle(session, stats, "Patient", patients("p1", "p2", "p3"))
+    assert stats == Counter(loaded=1, exists=1, failed=1)
+    url, bundle = session.requests[0]
+    assert url == load_data.FHIR_SERVER_URL
+    assert [entry["request"] for entry in bundle["entry"]] == [{"method": "POST", "url": "Patient"}] * 3
+
+
+def test_post_bundle_fails_entries_missing_from_the_response():
+    stats = Counter()
+    assert post_bundle(FakeSession(bundle_response("201 Created")), stats, "Patient", patients("p1", "p2", "p3"))
+    assert stats == Counter(loaded=1, failed=2)
+
+
+def test_post_bundle_fails_every_entry_of_a_rolled_back_transaction(capsys):
+    stats = Counter()
+    session = FakeSession(FakeResponse(409, outcome()))
+    assert post_bundle(session, stats, "Patient", patients("p1", "p2"), "transaction")
+    assert stats == Counter(failed=2)
+    assert "already exists" not in capsys.readouterr().out
+
+
+def test_post_bundle_applies_the_status_to_the_entry_the_outcome_points_at():
+    stats = Counter()
+    session = FakeSession(FakeResponse(409, outcome(1)))
+    assert post_bundle(session, stats, "Patient", patients("p1", "p2", "p3"), "transaction")
+    assert stats == Counter(exists=1, failed=2)
+
+
+def test_post_bundle_reports_other_errors_per_entry():
+    stats = Counter()
+    assert post_bundle(FakeSession(FakeResponse(500)), stats, "Patient", patients("p1", "p2"))
+    assert stats == Counter(failed=2)
+
+
+def test_post_bundle_declines_when_bundles_are_not_supported():
+    for status_code in [404, 405, 501]:
+        stats = Counter()
+        assert not post_bundle(FakeSession(FakeResponse(status_code)), stats, "Patient", patients("p1"))
+        assert stats == Counter()
+
+
+def test_load_levels_falls_back_only_when_bundles_are_not_supported(monkeypatch):
+    posted = []
+    monkeypatch.setattr(load_data, "post_resource",
+                        lambda session, stats, resource_type, item: posted.append(item["id"]))
+    levels = [[("Patient", item) for item in patients("p1", "p2")], [("Patient", item) for item in patients("p3")]]
+
+    stats = Counter()
+    session = FakeSession(FakeResponse(500), bundle_response("201 Created"))
+    assert asyncio.run(load_levels(session, stats, levels, 1, True, 10, "batch"))
+    assert stats == Counter(failed=2, loaded=1) and posted == []
+
+    stats = Counter()
+    session = FakeSession(FakeResponse(405))
+    assert not asyncio.run(load_levels(session, stats, levels, 1, True, 10, "batch"))
+    assert len(session.requests) == 1 and posted == ["p1", "p2", "p3"]
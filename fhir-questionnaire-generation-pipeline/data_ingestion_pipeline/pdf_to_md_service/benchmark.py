@@ -0,0 +1,360 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Conversion benchmark for the PDF to Markdown service.
+
+Generates a synthetic corpus of policy documents from the sample policy PDF,
+varying page count, table density, images and multi-column layouts, and runs
+`convert_pdf_to_markdown` over it on the conversion engine. Reports latency
+per document and per page, peak worker RSS and throughput, and optionally
+fails when results regress against a baseline.
+
+Usage:
+    uv run python benchmark.py --output baseline.json
+    uv run python benchmark.py --baseline baseline.json --max-regression 0.2
+    uv run python benchmark.py --profile auto --cases text_10_pages,tables_10_pages
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import resource
+import statistics
+import tempfile
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import pymupdf
+from settings import Configs
+from models import ConversionProfile
+from conversion_cache import CONVERTER_VERSION
+from conversion_engine import ConversionEngine
+from utils import convert_pdf_to_markdown
+
+DEFAULT_SEED_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "assets", "Sample_MRI_Medical_Policy.pdf")
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter
+MARGIN = 54
+COLUMN_GAP = 18
+IMAGE_BAND_HEIGHT = 180
+PROCEDURE_CODES = ["70551", "70552", "70553", "72141", "72148", "73721", "74181", "C8903", "S8042", "0698T"]
+
+@dataclass
+class CorpusCase:
+    name: str
+    pages: int
+    tables_per_page: int = 0
+    images_per_page: int = 0
+    columns: int = 1
+    # Repeat the pages of the seed PDF instead of generating synthetic pages
+    from_seed: bool = False
+
+DEFAULT_CASES = [
+    CorpusCase("seed", 3, from_seed=True),
+    CorpusCase("seed_30_pages", 30, from_seed=True),
+    CorpusCase("seed_150_pages", 150, from_seed=True),
+    CorpusCase("text_10_pages", 10),
+    CorpusCase("tables_10_pages", 10, tables_per_page=1),
+    CorpusCase("dense_tables_10_pages", 10, tables_per_page=3),
+    CorpusCase("images_10_pages", 10, images_per_page=2),
+    CorpusCase("two_columns_10_pages", 10, columns=2),
+    CorpusCase("three_columns_10_pages", 10, columns=3),
+    CorpusCase("mixed_40_pages", 40, tables_per_page=1, images_per_page=1, columns=2),
+]
+
+@dataclass
+class CaseResult:
+    name: str
+    pages: int
+    file_bytes: int
+    runs: int
+    median_seconds: float
+    min_seconds: float
+    ms_per_page: float
+    peak_worker_rss_mb: Optional[float]
+
+def _seed_sentences(seed_pdf: str) -> List[str]:
+    """Policy text lines of the seed PDF, used as filler for synthetic pages."""
+    with pymupdf.open(seed_pdf) as doc:
+        text = "\n".join(page.get_text() for page in doc)
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return [line for line in lines if len(line) > 20]
+
+def _table_html(rng: random.Random, sentences: List[str]) -> str:
+    rows = "".join(
+        f"<tr><td>{rng.choice(PROCEDURE_CODES)}</td><td>{rng.choice(sentences)[:60]}</td>"
+        f"<td>{rng.choice(['Covered', 'Not covered', 'Prior authorization'])}</td></tr>"
+        for _ in range(rng.randint(4, 8))
+    )
+    return f"<table><tr><th>Code</th><th>Description</th><th>Coverage</th></tr>{rows}</table>"
+
+def _column_html(case: CorpusCase, page_number: int, column: int, rng: random.Random, sentences: List[str]) -> str:
+    parts = []
+    if column == 0:
+        parts.append(f"<h1>Coverage Rationale {page_number + 1}</h1>")
+    parts.append(f"<h2>Section {page_number + 1}.{column + 1}</h2>")
+    tables = [table for table in range(case.tables_per_page) if table % case.columns == column]
+    for _ in tables:
+        parts.append(_table_html(rng, sentences))
+    # Fewer filler paragraphs on crowded pages, insert_htmlbox scales the rest to fit
+    for _ in range(max(1, 4 - len(tables))):
+        parts.append(f"<p>{' '.join(rng.sample(sentences, min(4, len(sentences))))}</p>")
+    return "".join(parts)
+
+CSS = "body {font-family: sans-serif; font-size: 10px;} table {border-collapse: collapse;} td, th {border: 1px solid black; padding: 2px;}"
+
+def generate_case(case: CorpusCase, seed_pdf: str, output_path: str, sentences: List[str], thumbnail: pymupdf.Pixmap):
+    """Write the PDF of a corpus case to `output_path`."""
+    rng = random.Random(case.name)
+    with pymupdf.open() as doc:
+        if case.from_seed:
+            with pymupdf.open(seed_pdf) as seed:
+                while doc.page_count < case.pages:
+                    doc.insert_pdf(seed, to_page=min(seed.page_count, case.pages - doc.page_count) - 1)
+        else:
+            for page_number in range(case.pages):
+                page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+                text_bottom = PAGE_HEIGHT - MARGIN - (IMAGE_BAND_HEIGHT if case.images_per_page else 0)
+                column_width = (PAGE_WIDTH - 2 * MARGIN - (case.columns - 1) * COLUMN_GAP) / case.columns
+                for column in range(case.columns):
+                    x0 = MARGIN + column * (column_width + COLUMN_GAP)
+                    rect = pymupdf.Rect(x0, MARGIN, x0 + column_width, text_bottom)
+                    page.insert_htmlbox(rect, _column_html(case, page_number, column, rng, sentences), css=CSS)
+                if case.images_per_page:
+                    image_width = (PAGE_WIDTH - 2 * MARGIN) / case.images_per_page
+                    for image in range(case.images_per_page):
+                        x0 = MARGIN + image * image_width
+                        rect = pymupdf.Rect(x0, text_bottom + 10, x0 + image_width - 10, PAGE_HEIGHT - MARGIN)
+                        page.insert_image(rect, pixmap=thumbnail)
+        doc.save(output_path, garbage=3, deflate=True)
+
+def generate_corpus(cases: List[CorpusCase], seed_pdf: str, corpus_dir: str) -> Dict[str, str]:
+    """Generate missing corpus PDFs and return their paths by case name."""
+    os.makedirs(corpus_dir, exist_ok=True)
+    sentences = _seed_sentences(seed_pdf)
+    with pymupdf.open(seed_pdf) as seed:
+        thumbnail = seed[0].get_pixmap(matrix=pymupdf.Matrix(0.5, 0.5))
+    paths = {}
+    for case in cases:
+        path = os.path.join(corpus_dir, f"{case.name}.pdf")
+        if not os.path.exists(path):
+            generate_case(case, seed_pdf, path, sentences, thumbnail)
+        paths[case.name] = path
+    return paths
+
+def _reset_peak_rss(pids: List[int]):
+    # Writing 5 to clear_refs resets the peak RSS (VmHWM) on Linux
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/clear_refs", "w") as f:
+                f.write("5")
+        except OSError:
+            pass
+
+def _peak_rss_mb(pids: List[int]) -> Optional[float]:
+    peaks = []
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        peaks.append(int(line.split()[1]) / 1024)
+        except OSError:
+            pass
+    return round(max(peaks), 1) if peaks else None
+
+async def run_case(case: CorpusCase, pdf_path: str, engine: ConversionEngine, logger: logging.Logger,
+                   repeat: int, parallel_pages: Optional[bool], output_dir: str) -> CaseResult:
+    durations = []
+    peak_rss = None
+    output_path = os.path.join(output_dir, f"{case.name}.md")
+    for _ in range(repeat):
+        pids = engine.worker_pids()
+        _reset_peak_rss(pids)
+        started = time.perf_counter()
+        await convert_pdf_to_markdown(pdf_path, output_path, engine, logger, parallel_pages)
+        durations.append(time.perf_counter() - started)
+        rss = _peak_rss_mb(pids)
+        if rss is not None:
+            peak_rss = max(peak_rss or 0.0, rss)
+    os.remove(output_path)
+    median = statistics.median(durations)
+    return CaseResult(
+        name=case.name,
+        pages=case.pages,
+        file_bytes=os.path.getsize(pdf_path),
+        runs=repeat,
+        median_seconds=round(median, 4),
+        min_seconds=round(min(durations), 4),
+        ms_per_page=round(1000 * median / case.pages, 2),
+        peak_worker_rss_mb=peak_rss,
+    )
+
+async def run_throughput(cases: List[CorpusCase], paths: Dict[str, str], engine: ConversionEngine,
+                         logger: logging.Logger, parallel_pages: Optional[bool], output_dir: str) -> Dict[str, float]:
+    """Convert the whole corpus concurrently and measure sustained throughput."""
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        convert_pdf_to_markdown(paths[case.name], os.path.join(output_dir, f"throughput-{case.name}.md"), engine, logger, parallel_pages)
+        for case in cases
+    ))
+    elapsed = time.perf_counter() - started
+    for case in cases:
+        os.remove(os.path.join(output_dir, f"throughput-{case.name}.md"))
+    pages = sum(case.pages for case in cases)
+    return {
+        "documents": len(cases),
+        "pages": pages,
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(pages / elapsed, 2),
+        "documents_per_minute": round(60 * len(cases) / elapsed, 2),
+    }
+
+def check_regressions(results: dict, baseline: Optional[dict], args: argparse.Namespace) -> List[str]:
+    """Return a message for every threshold the results violate."""
+    failures = []
+    baseline_cases = {case["name"]: case for case in (baseline or {}).get("cases", [])}
+    for case in results["cases"]:
+        name = case["name"]
+        if args.max_ms_per_page is not None and case["ms_per_page"] > args.max_ms_per_page:
+            failures.append(f"{name}: {case['ms_per_page']} ms/page exceeds {args.max_ms_per_page}")
+        rss = case["peak_worker_rss_mb"]
+        if args.max_rss_mb is not None and rss is not None and rss > args.max_rss_mb:
+            failures.append(f"{name}: peak RSS {rss} MB exceeds {args.max_rss_mb}")
+        base = baseline_cases.get(name)
+        if base is None:
+            continue
+        limit = base["median_seconds"] * (1 + args.max_regression)
+        if case["median_seconds"] > limit:
+            failures.append(f"{name}: median {case['median_seconds']}s regressed from {base['median_seconds']}s")
+        base_rss = base.get("peak_worker_rss_mb")
+        if rss is not None and base_rss and rss > base_rss * (1 + args.max_rss_regression):
+            failures.append(f"{name}: peak RSS {rss} MB regressed from {base_rss} MB")
+    base_throughput = (baseline or {}).get("throughput")
+    throughput = results.get("throughput")
+    if base_throughput and throughput:
+        floor = base_throughput["pages_per_second"] * (1 - args.max_regression)
+        if throughput["pages_per_second"] < floor:
+            failures.append(f"throughput: {throughput['pages_per_second']} pages/s regressed from {base_throughput['pages_per_second']}")
+    return failures
+
+def print_report(results: dict):
+    print(f"{'case':<26}{'pages':>7}{'median s':>11}{'min s':>9}{'ms/page':>10}{'peak RSS MB':>13}")
+    for case in results["cases"]:
+        rss = case["peak_worker_rss_mb"]
+        print(f"{case['name']:<26}{case['pages']:>7}{case['median_seconds']:>11.3f}{case['min_seconds']:>9.3f}"
+              f"{case['ms_per_page']:>10.1f}{rss if rss is not None else 'n/a':>13}")
+    throughput = results.get("throughput")
+    if throughput:
+        print(f"throughput: {throughput['pages_per_second']} pages/s, {throughput['documents_per_minute']} documents/min "
+              f"({throughput['documents']} documents, {throughput['pages']} pages in {throughput['seconds']}s)")
+    print(f"benchmark process peak RSS: {results['meta']['process_peak_rss_mb']} MB")
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark PDF to Markdown conversion on a synthetic policy corpus.")
+    parser.add_argument("--seed-pdf", default=DEFAULT_SEED_PDF, help="PDF the corpus is derived from")
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "pdf_to_md_benchmark"),
+                        help="Directory for the generated corpus, reused across runs")
+    parser.add_argument("--cases", help="Comma separated case names to run, defaults to all")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case")
+    parser.add_argument("--workers", type=int, default=0, help="Conversion worker processes, 0 uses CONVERSION_WORKERS")
+    parser.add_argument("--parallel-pages", choices=("auto", "on", "off"), default="auto",
+                        help="Page-range conversion, auto uses PAGE_SPLIT_THRESHOLD")
+    parser.add_argument("--profile", choices=[profile.value for profile in ConversionProfile],
+                        help="Conversion profile, defaults to DEFAULT_CONVERSION_PROFILE")
+    parser.add_argument("--skip-throughput", action="store_true", help="Skip the concurrent throughput run")
+    parser.add_argument("--output", help="Write results as JSON, usable as a later --baseline")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed fractional slowdown against the baseline (latency and throughput)")
+    parser.add_argument("--max-rss-regression", type=float, default=0.25,
+                        help="Allowed fractional growth of peak worker RSS against the baseline")
+    parser.add_argument("--max-ms-per-page", type=float, help="Absolute limit on median milliseconds per page")
+    parser.add_argument("--max-rss-mb", type=float, help="Absolute limit on peak worker RSS in MB")
+    return parser.parse_args()
+
+async def run(args: argparse.Namespace) -> int:
+    logger = logging.getLogger("benchmark")
+    cases = DEFAULT_CASES
+    if args.cases:
+        selected = set(args.cases.split(","))
+        cases = [case for case in DEFAULT_CASES if case.name in selected]
+        unknown = selected - {case.name for case in cases}
+        if unknown:
+            print(f"Unknown case(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+            return 2
+    parallel_pages = {"auto": None, "on": True, "off": False}[args.parallel_pages]
+
+    paths = generate_corpus(cases, args.seed_pdf, args.corpus_dir)
+    overrides = {}
+    if args.workers:
+        overrides["CONVERSION_WORKERS"] = args.workers
+    if args.profile:
+        overrides["DEFAULT_CONVERSION_PROFILE"] = args.profile
+    configs = Configs(**overrides)
+    engine = ConversionEngine(configs, logger)
+    engine.start()
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            # Warm up every worker so process start and imports are not measured
+            await asyncio.gather(*(
+                convert_pdf_to_markdown(paths[cases[0].name], os.path.join(output_dir, f"warmup-{i}.md"), engine, logger, False)
+                for i in range(engine.max_workers)
+            ))
+            case_results = []
+            for case in cases:
+                case_results.append(await run_case(case, paths[case.name], engine, logger, args.repeat, parallel_pages, output_dir))
+            throughput = None
+            if not args.skip_throughput:
+                throughput = await run_throughput(cases, paths, engine, logger, parallel_pages, output_dir)
+    finally:
+        engine.shutdown()
+
+    results = {
+        "meta": {
+            "pymupdf4llm": CONVERTER_VERSION,
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "workers": engine.max_workers,
+            "parallel_pages": args.parallel_pages,
+            "profile": configs.DEFAULT_CONVERSION_PROFILE,
+            "process_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+        "cases": [asdict(result) for result in case_results],
+        "throughput": throughput,
+    }
+    print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    failures = check_regressions(results, baseline, args)
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(asyncio.run(run(parse_args())))
@@ -0,0 +1,310 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+import asyncio
+import hashlib
+import logging
+import tempfile
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from settings import Configs
+from conversion_engine import CONVERTER_VERSION, PdfSource
+from file_utils import sidecar_paths
+from markdown_index import index_path
+from metrics import CACHE_LOOKUPS
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key onto one in-flight call."""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run `fn` unless a call for `key` is already running.
+
+        Returns the result and whether it was shared from another caller's call.
+        """
+        call = self._calls.get(key)
+        while call is not None:
+            try:
+                return await asyncio.shield(call), True
+            except asyncio.CancelledError:
+                # Run the call again when the caller that ran it was cancelled, but not this caller
+                if not call.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            call = self._calls.get(key)
+
+        call = asyncio.get_running_loop().create_future()
+        # Avoid "exception was never retrieved" warnings when nobody is waiting
+        call.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = call
+        try:
+            result = await fn()
+            call.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except Exception as e:
+            call.set_exception(e)
+            raise
+        finally:
+            del self._calls[key]
+
+class ConversionCache:
+    """Content-addressed on-disk cache of converted Markdown.
+
+    Entries are keyed by the SHA-256 of the PDF bytes and the pymupdf4llm
+    version, so a re-submitted document skips conversion entirely. The cache
+    is bounded by `CACHE_MAX_BYTES` and evicts the least recently used entries
+    first. Concurrent conversions of the same content, and concurrent jobs for
+    the same file name and options, are coalesced onto a single in-flight call.
+
+    Conversions write their Markdown to a file in the spool directory, which
+    is moved into the cache once complete. Callers get a file path and stream
+    from it, then hand it back with `release`. Cache entries handed out are
+    pinned until released, so eviction never removes a file that a caller is
+    still reading. A page manifest written next to the Markdown is kept with it.
+    """
+
+    def __init__(self, configs: Configs, logger: logging.Logger):
+        self.configs = configs
+        self.logger = logger
+        self.enabled = configs.CACHE_ENABLED
+        self.max_bytes = configs.CACHE_MAX_BYTES
+        self.cache_dir = os.path.normpath(configs.CACHE_DIR or os.path.join(configs.LOCAL_DIR, "cache"))
+        self.spool_dir = os.path.normpath(configs.SPOOL_DIR or os.path.join(configs.LOCAL_DIR, "spool"))
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._pins: Dict[str, int] = {}
+        self._conversions = SingleFlight()
+        self._files = SingleFlight()
+
+    def load(self):
+        """Clear the spool directory and index existing cache entries, oldest use first."""
+        if os.path.isdir(self.spool_dir):
+            # Leftovers of conversions interrupted by a restart
+            for entry in os.scandir(self.spool_dir):
+                if entry.is_file():
+                    os.remove(entry.path)
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".md"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-3], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total_bytes += size
+        self.logger.info(f"Conversion cache loaded {len(self._entries)} entries ({self._total_bytes} bytes)")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.md")
+
+    async def key_for(self, source: PdfSource, variant: str = "") -> str:
+        """Compute the cache key of a PDF from its content."""
+        def _hash() -> str:
+            if not isinstance(source, str):
+                return hashlib.sha256(source).hexdigest()
+            digest = hashlib.sha256()
+            with open(source, "rb") as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            return digest.hexdigest()
+
+        content_hash = await asyncio.to_thread(_hash)
+        suffix = f"-{variant}" if variant else ""
+        return f"{content_hash}-{CONVERTER_VERSION}{suffix}"
+
+    def spool_path(self, suffix: str = ".md") -> str:
+        """Create an empty scratch file in the spool directory and return its path."""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.spool_dir, suffix=suffix)
+        os.close(fd)
+        return path
+
+    def _pin(self, key: str) -> bool:
+        """Pin a cache entry for one caller, or return False when it has been evicted."""
+        if key not in self._entries:
+            return False
+        self._pins[key] = self._pins.get(key, 0) + 1
+        return True
+
+    def _unpin(self, key: str) -> bool:
+        """Drop one pin of a cache entry and return whether it was the last one."""
+        pins = self._pins.get(key, 0) - 1
+        if pins > 0:
+            self._pins[key] = pins
+            return False
+        self._pins.pop(key, None)
+        return True
+
+    async def release(self, path: Optional[str]):
+        """Hand back a path returned by `get_or_convert`.
+
+        Spool files are removed and cache entries are unpinned, which lets
+        eviction catch up on entries it had to skip.
+        """
+        if path and os.path.dirname(path) == self.cache_dir:
+            if self._unpin(os.path.basename(path)[:-3]):
+                await self._evict()
+        elif path and os.path.dirname(path) == self.spool_dir:
+            def _remove():
+                for spool_path in [path] + [sidecar for _, sidecar in sidecar_paths(path)]:
+                    try:
+                        os.remove(spool_path)
+                    except FileNotFoundError:
+                        pass
+
+            await asyncio.to_thread(_remove)
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the path of cached Markdown for `key`, or None on a miss.
+
+        The entry stays pinned until the path is passed to `release`.
+        """
+        if not self.enabled:
+            return None
+        if not self._pin(key):
+            CACHE_LOOKUPS.inc(result="miss")
+            return None
+        path = self._path(key)
+
+        def _touch():
+            if self.configs.MARKDOWN_INDEX_ENABLED and not os.path.exists(index_path(path)):
+                # Entries converted before the index was enabled are converted again
+                raise FileNotFoundError(index_path(path))
+            # Record the use so the entry survives a reload in LRU order
+            os.utime(path)
+
+        try:
+            await asyncio.to_thread(_touch)
+        except FileNotFoundError:
+            self._unpin(key)
+            self._total_bytes -= self._entries.pop(key, 0)
+            CACHE_LOOKUPS.inc(result="miss")
+            return None
+        self._entries.move_to_end(key)
+        CACHE_LOOKUPS.inc(result="hit")
+        return path
+
+    async def put(self, key: str, path: str) -> str:
+        """Move a converted Markdown file into the cache for `key`.
+
+        Returns the path of the cache entry, pinned like a result of `get`, or
+        `path` itself when the cache is disabled or the entry could not be written.
+        """
+        if not self.enabled:
+            return path
+
+        def _move() -> int:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Cache and spool normally share a file system, which makes this an atomic rename
+            shutil.move(path, self._path(key))
+            for (_, sidecar), (_, cached_sidecar) in zip(sidecar_paths(path), sidecar_paths(self._path(key))):
+                if os.path.exists(sidecar):
+                    shutil.move(sidecar, cached_sidecar)
+                elif os.path.exists(cached_sidecar):
+                    os.remove(cached_sidecar)
+            return os.path.getsize(self._path(key))
+
+        try:
+            size = await asyncio.to_thread(_move)
+        except Exception as e:
+            self.logger.error(f"Error writing conversion cache entry {key}: {e}")
+            return path
+        self._total_bytes += size - self._entries.pop(key, 0)
+        self._entries[key] = size
+        self._pin(key)
+        await self._evict()
+        return self._path(key)
+
+    async def _evict(self):
+        evicted = []
+        # Pinned entries are being read and are evicted once released
+        for key in list(self._entries):
+            if self._total_bytes <= self.max_bytes or len(self._entries) <= 1:
+                break
+            if key in self._pins:
+                continue
+            self._total_bytes -= self._entries.pop(key)
+            evicted.append(key)
+        if not evicted:
+            return
+
+        def _remove():
+            for key in evicted:
+                for path in [self._path(key)] + [sidecar for _, sidecar in sidecar_paths(self._path(key))]:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+        await asyncio.to_thread(_remove)
+        self.logger.info(f"Evicted {len(evicted)} conversion cache entries")
+
+    async def get_or_convert(self, key: str, convert: Callable[[str], Awaitable[None]],
+                             reuse: bool = True) -> Tuple[Optional[str], bool]:
+        """Return a Markdown file for `key` from the cache or by running `convert`.
+
+        `convert` is called with the path to write the Markdown to. Returns the
+        path, or None when the conversion produced no output, and whether the
+        conversion was skipped, either because of a cache hit or because
+        another job converted the same content concurrently. With `reuse`
+        False, `convert` always runs and its output replaces the cache entry.
+        """
+        if reuse:
+            cached = await self.get(key)
+            if cached is not None:
+                return cached, True
+
+        async def _convert_and_store() -> Optional[str]:
+            path = self.spool_path()
+            try:
+                await convert(path)
+                empty = os.path.getsize(path) == 0
+            except BaseException:
+                await self.release(path)
+                raise
+            if empty:
+                await self.release(path)
+                return None
+            return await self.put(key, path)
+
+        if not self.enabled or not reuse:
+            # Spool files belong to a single caller, so only cache entries are shared
+            return await _convert_and_store(), False
+        while True:
+            path, shared = await self._conversions.do(key, _convert_and_store)
+            if not shared or path is None:
+                return path, shared
+            # Followers need their own pin, and can't use the leader's spool file when it wasn't cached
+            if path == self._path(key) and self._pin(key):
+                return path, True
+            cached = await self.get(key)
+            if cached is not None:
+                return cached, True
+
+    async def coalesce_file(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Share one fetch and conversion between concurrent jobs for the same file and conversion options."""
+        return await self._files.do(key, fn)
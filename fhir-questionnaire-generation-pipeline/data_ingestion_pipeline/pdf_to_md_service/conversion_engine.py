@@ -0,0 +1,508 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import math
+import asyncio
+import hashlib
+import logging
+import dataclasses
+from importlib.metadata import version, PackageNotFoundError
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+
+from settings import Configs
+from models import ConversionProfile
+from markdown_index import write_index
+from page_manifest import PageManifest, PageRecord, PreviousOutput, fingerprint_pages, manifest_path
+from worker_pool import WorkerPool
+from memory_budget import MB, MemoryBudget, estimate_memory
+from image_assets import ImageExtraction, extract_images
+from job_profiler import JobProfile, run_profiled, track_pages
+
+# pymupdf and pymupdf4llm take about a second to import. They are only
+# imported by the functions that run in worker processes, so the service
+# process starts without them and workers load them while warming up.
+if TYPE_CHECKING:
+    import pymupdf
+
+try:
+    CONVERTER_VERSION = version("pymupdf4llm")
+except PackageNotFoundError:
+    CONVERTER_VERSION = "unknown"
+
+# A PDF is either a path to read in place or its content held in memory
+PdfSource = Union[str, bytes, bytearray]
+
+# Auto profile thresholds for a sampled page. Pages with little text or large
+# images may be scanned and need OCR, many ruling lines suggest a table.
+AUTO_MIN_TEXT_CHARS = 100
+AUTO_MAX_IMAGE_COVERAGE = 0.02
+AUTO_MIN_TABLE_RULINGS = 10
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# The Markdown of one page in a file: (path, offset, size)
+PageSegment = Tuple[str, int, int]
+
+@dataclasses.dataclass
+class ConversionResult:
+    profile: ConversionProfile  # The profile used, after auto selection
+    pages_converted: int
+    pages_reused: int = 0  # Pages spliced in from a previous conversion
+    page_sizes: List[int] = dataclasses.field(default_factory=list)  # Bytes of each page's Markdown
+
+def describe_source(source: PdfSource) -> str:
+    """Describe a PDF source for log messages."""
+    if isinstance(source, str):
+        return source
+    return f"<in-memory PDF, {len(source)} bytes>"
+
+def _open_pdf(source: PdfSource) -> "pymupdf.Document":
+    import pymupdf
+    if isinstance(source, str):
+        return track_pages(pymupdf.open(source))
+    return track_pages(pymupdf.open(stream=source, filetype="pdf"))
+
+def _layout_available() -> bool:
+    import pymupdf4llm
+    return getattr(pymupdf4llm, "_use_layout", False)
+
+def _pages_convert_independently() -> bool:
+    """Whether the layout engine renders each page without looking at the others.
+
+    Some pymupdf4llm versions rank header levels by font size across the
+    whole document, so pages converted apart would get other header levels.
+    """
+    if not _layout_available():
+        return False
+    from pymupdf4llm.helpers import document_layout
+    return "header_level" not in {field.name for field in dataclasses.fields(document_layout.LayoutBox)}
+
+def _warm_up_in_worker() -> bool:
+    """Import the converter in a new worker process, returns whether layout analysis is available."""
+    from pymupdf4llm.helpers import document_layout, pymupdf_rag  # noqa: F401
+    return _layout_available()
+
+def output_variant(profile: ConversionProfile, images: bool = False) -> str:
+    """Name the kind of Markdown a conversion produces, for page manifests."""
+    return f"{profile.value}+images" if images else profile.value
+
+def _rag_page_markdown(doc: "pymupdf.Document", profile: ConversionProfile,
+                       images: Optional[ImageExtraction] = None) -> List[str]:
+    """Convert every page without the layout engine, for the fast profile or when layout analysis is unavailable."""
+    if profile == ConversionProfile.FAST:
+        # Text extraction without table detection or image handling
+        options = dict(table_strategy=None, ignore_images=True, ignore_graphics=True)
+    elif profile == ConversionProfile.TABLES and images is None:
+        options = dict(ignore_images=True)
+    else:
+        options = {}
+    if images is not None and profile != ConversionProfile.FAST:
+        options.update(embed_images=True, image_format=images.image_format, dpi=images.dpi)
+    from pymupdf4llm.helpers import pymupdf_rag
+    pages = [chunk["text"] for chunk in pymupdf_rag.to_markdown(doc, page_chunks=True, **options)]
+    if images is not None:
+        pages = [extract_images(page, images.directory) for page in pages]
+    return pages
+
+def _layout_page_markdown(doc: "pymupdf.Document", pages: Optional[List[int]], use_ocr: bool = True,
+                          images: Optional[ImageExtraction] = None) -> List[str]:
+    """Convert pages with the layout engine through `pymupdf4llm.to_markdown`, one string per page.
+
+    Layout headers do not depend on the rest of the document (titles are
+    `#`, section headers `##`), so the pages of a range come out the same
+    as in a conversion of the whole file.
+    """
+    import pymupdf4llm
+    options = {}
+    if images is not None:
+        options = dict(embed_images=True, image_format=images.image_format, dpi=images.dpi)
+    chunks = pymupdf4llm.to_markdown(doc, pages=pages, use_ocr=use_ocr, page_chunks=True, **options)
+    markdown = [chunk["text"] for chunk in chunks]
+    if images is not None:
+        markdown = [extract_images(page, images.directory) for page in markdown]
+    return markdown
+
+def _write_pages(pages: List[str], output_path: str) -> List[int]:
+    """Write the Markdown of each page to `output_path`, returning the size in bytes of each page."""
+    sizes = []
+    with open(output_path, "wb") as f:
+        for page in pages:
+            content = page.encode("utf-8")
+            f.write(content)
+            sizes.append(len(content))
+    return sizes
+
+def _convert_in_worker(source: PdfSource, output_path: str, profile: ConversionProfile = ConversionProfile.FULL,
+                       images: Optional[ImageExtraction] = None) -> List[int]:
+    """Convert a whole PDF to Markdown inside a pool worker process and write it to `output_path`.
+
+    The tables and full profiles make a single `pymupdf4llm.to_markdown`
+    call when layout analysis is available. Returns the size in bytes of
+    each page's Markdown.
+    """
+    with _open_pdf(source) as doc:
+        if profile == ConversionProfile.FAST or not _layout_available():
+            pages = _rag_page_markdown(doc, profile, images)
+        else:
+            pages = _layout_page_markdown(doc, None, profile == ConversionProfile.FULL, images)
+    return _write_pages(pages, output_path)
+
+def _convert_pages_in_worker(source: PdfSource, pages: List[int], output_path: str, use_ocr: bool = True,
+                             images: Optional[ImageExtraction] = None) -> List[int]:
+    """Convert a list of pages inside a pool worker process and write them to `output_path`.
+
+    With `images`, pictures are written to its directory and linked from the
+    Markdown. Returns the size in bytes of each page, in the order the pages
+    were written.
+    """
+    with _open_pdf(source) as doc:
+        markdown = _layout_page_markdown(doc, pages, use_ocr, images)
+    return _write_pages(markdown, output_path)
+
+def _assemble_pages(segments: List[PageSegment], output_path: str) -> Tuple[List[int], str]:
+    """Join the Markdown of every page in page order into `output_path`.
+
+    Only one page is held in memory at a time. Returns the size of each page
+    in the output and the SHA-256 of the output.
+    """
+    files: Dict[str, BinaryIO] = {}
+    sizes = []
+    digest = hashlib.sha256()
+    try:
+        with open(output_path, "wb") as output:
+            for path, offset, size in segments:
+                if path not in files:
+                    files[path] = open(path, "rb")
+                files[path].seek(offset)
+                content = files[path].read(size)
+                output.write(content)
+                digest.update(content)
+                sizes.append(len(content))
+    finally:
+        for f in files.values():
+            f.close()
+    return sizes, digest.hexdigest()
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _write_manifest(manifest: PageManifest, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(manifest.to_json())
+
+def _inspect_in_worker(source: PdfSource, profile: ConversionProfile, sample_pages: int,
+                       fingerprint: bool = False) -> Tuple[int, ConversionProfile, bool, Optional[List[str]]]:
+    """Count the pages of a PDF and resolve the auto profile inside a pool worker process.
+
+    Malformed PDFs can keep MuPDF busy from the moment they are opened, so
+    the service process never opens a PDF itself. Also returns whether
+    pages can be converted apart (see `_pages_convert_independently`), and
+    with `fingerprint` the page fingerprints of layout conversions, while
+    the document is open anyway.
+    """
+    if profile == ConversionProfile.AUTO:
+        profile = _choose_profile(source, sample_pages)
+    pages_independent = _pages_convert_independently()
+    with _open_pdf(source) as doc:
+        page_count = doc.page_count
+        fingerprints = None
+        if fingerprint and pages_independent and profile != ConversionProfile.FAST:
+            fingerprints = fingerprint_pages(doc)
+    return page_count, profile, pages_independent, fingerprints
+
+def _choose_profile(source: PdfSource, sample_pages: int) -> ConversionProfile:
+    """Pick the cheapest profile that keeps the structure of the first `sample_pages` pages.
+
+    Pages that look scanned or carry images need the full profile, ruled
+    tables need the tables profile and plain text pages use the fast profile.
+    Tables without ruling lines are not detected.
+    """
+    import pymupdf
+    needs_tables = False
+    with _open_pdf(source) as doc:
+        for page in doc.pages(0, min(sample_pages, doc.page_count)):
+            page_area = abs(page.rect) or 1
+            image_area = sum(abs(pymupdf.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+            if image_area / page_area > AUTO_MAX_IMAGE_COVERAGE or len(page.get_text().strip()) < AUTO_MIN_TEXT_CHARS:
+                return ConversionProfile.FULL
+            rulings = sum(
+                1 for drawing in page.get_drawings() for item in drawing["items"] if item[0] in ("l", "re")
+            )
+            needs_tables = needs_tables or rulings >= AUTO_MIN_TABLE_RULINGS
+    return ConversionProfile.TABLES if needs_tables else ConversionProfile.FAST
+
+class ConversionEngine:
+    """Runs PDF to Markdown conversions on a bounded process pool.
+
+    pymupdf4llm is CPU bound and holds the GIL, so conversions are executed in
+    worker processes to keep the event loop free for API requests. At most
+    `max_workers` conversions run at a time; further callers wait on the
+    event loop until a worker is free. Cancelling a conversion kills the
+    workers running it (see `worker_pool`).
+
+    Documents above `PAGE_SPLIT_THRESHOLD` pages are split into page ranges
+    that are analysed concurrently and joined back in page order. Each range
+    is converted with `pymupdf4llm.to_markdown` and written to a file by its
+    worker, so the service never holds a whole large document in memory.
+    Smaller documents are converted with a single `to_markdown` call.
+
+    With `INCREMENTAL_CONVERSION`, layout conversions also write a page
+    manifest next to the Markdown (see `page_manifest`). When a revised PDF
+    is converted with the previous output, pages whose fingerprint is listed
+    in the previous manifest are copied from the previous Markdown and only
+    the other pages are converted.
+
+    Each conversion runs with a `ConversionProfile`. The fast profile skips
+    layout analysis and is an order of magnitude quicker on plain text, the
+    tables profile skips OCR and the full profile is the pymupdf4llm default.
+
+    Once a PDF's page count is known, its conversion waits until its
+    estimated memory fits in `MEMORY_BUDGET_MB` (see `memory_budget`).
+    Workers are replaced after `WORKER_MAX_TASKS` tasks or when their
+    resident memory exceeds `WORKER_MAX_RSS_MB`.
+    """
+
+    def __init__(self, configs: Configs, logger: logging.Logger):
+        self.configs = configs
+        self.logger = logger
+        self.max_workers = configs.CONVERSION_WORKERS or os.cpu_count() or 1
+        self.default_profile = ConversionProfile(configs.DEFAULT_CONVERSION_PROFILE)
+        # Whether pymupdf4llm can convert the pages of a document apart, as reported by the workers
+        self.page_ranges_available = True
+        self.memory_budget = MemoryBudget(configs.MEMORY_BUDGET_MB * MB, logger)
+        self._pool = None
+
+    def start(self):
+        """Create the worker pool. Workers start and import the converter in the background."""
+        if self._pool is not None:
+            return
+        self._pool = WorkerPool(
+            self.max_workers, self.logger, initializer=_warm_up_in_worker,
+            max_tasks=self.configs.WORKER_MAX_TASKS, max_rss=self.configs.WORKER_MAX_RSS_MB * MB
+        )
+        self._pool.start()
+        self.logger.info(f"Conversion engine starting {self.max_workers} worker(s)")
+
+    @property
+    def ready(self) -> bool:
+        """Whether at least one worker is warm and conversions can start right away."""
+        return self._pool is not None and self._pool.ready_workers > 0
+
+    @property
+    def ready_workers(self) -> int:
+        return self._pool.ready_workers if self._pool is not None else 0
+
+    def shutdown(self):
+        """Stop the worker pool."""
+        if self._pool is None:
+            return
+        self._pool.shutdown()
+        self._pool = None
+        self.logger.info("Conversion engine stopped")
+
+    def worker_pids(self) -> List[int]:
+        return self._pool.pids() if self._pool is not None else []
+
+    async def _submit(self, fn, *args, job_profile: Optional[JobProfile] = None):
+        """Run `fn` on the worker pool once a worker is free, under a sampling profiler if `job_profile` is given."""
+        if self._pool is None:
+            self.start()
+        if job_profile is None:
+            return await self._pool.run(fn, *args)
+        result, data = await self._pool.run(run_profiled, job_profile.interval, fn, *args)
+        job_profile.add(fn.__name__.strip("_"), data)
+        return result
+
+    def use_page_ranges(self, page_count: int, parallel_pages: Optional[bool] = None,
+                        profile: ConversionProfile = ConversionProfile.FULL) -> bool:
+        """Decide whether a document is converted as concurrent page ranges.
+
+        Only the layout based profiles are split, and only with a pymupdf4llm
+        version that converts pages independently. An explicit `parallel_pages`
+        value from the request wins, otherwise documents above the configured
+        page threshold are split.
+        """
+        if page_count <= 1 or profile == ConversionProfile.FAST or not self.page_ranges_available:
+            return False
+        if parallel_pages is not None:
+            return parallel_pages
+        return page_count > self.configs.PAGE_SPLIT_THRESHOLD
+
+    def estimate_memory(self, source: PdfSource, page_count: int, parallel_pages: Optional[bool] = None,
+                        profile: ConversionProfile = ConversionProfile.FULL) -> int:
+        """Estimate the memory in bytes a conversion needs, counting the page ranges converted at once."""
+        file_size = os.path.getsize(source) if isinstance(source, str) else len(source)
+        tasks = 1
+        if self.use_page_ranges(page_count, parallel_pages, profile):
+            ranges = math.ceil(page_count / max(1, self.configs.PAGE_RANGE_SIZE))
+            tasks = min(ranges, self.max_workers)
+        return estimate_memory(self.configs, file_size, page_count, tasks)
+
+    async def convert(self, source: PdfSource, output_path: str, parallel_pages: Optional[bool] = None,
+                      on_progress: Optional[Callable[[int, int], None]] = None,
+                      profile: Optional[ConversionProfile] = None,
+                      previous: Optional[PreviousOutput] = None,
+                      job_profile: Optional[JobProfile] = None,
+                      images: Optional[ImageExtraction] = None) -> ConversionResult:
+        """Convert a PDF to a Markdown file without blocking the event loop.
+
+        `source` is either the path of the original file, which workers read in
+        place, or the PDF content already held in memory. The Markdown is
+        written to `output_path`, with its page manifest for layout
+        conversions and its structure index when enabled next to it. `on_progress` is called with
+        (pages_done, pages_total) as pages finish. `profile` defaults to
+        DEFAULT_CONVERSION_PROFILE. `previous` is the stored output of an
+        earlier conversion of the same file, whose unchanged pages are reused.
+        When `job_profile` is given, every worker task is profiled into it.
+        With `images`, pictures are extracted into its directory (see
+        `image_assets`) instead of being dropped. The conversion holds its estimated memory of the budget while it runs.
+        """
+        requested = ConversionProfile(profile or self.default_profile)
+        page_count, profile, self.page_ranges_available, fingerprints = await self._submit(
+            _inspect_in_worker, source, requested, self.configs.AUTO_PROFILE_SAMPLE_PAGES,
+            self.configs.INCREMENTAL_CONVERSION, job_profile=job_profile
+        )
+        report = on_progress or (lambda done, total: None)
+        report(0, page_count)
+        if requested == ConversionProfile.AUTO:
+            self.logger.info(f"Auto profile chose '{profile.value}' for {describe_source(source)}")
+        estimate = self.estimate_memory(source, page_count, parallel_pages, profile)
+        async with self.memory_budget.reserve(estimate, describe_source(source)):
+            if fingerprints is None and not self.use_page_ranges(page_count, parallel_pages, profile):
+                page_sizes = await self._submit(
+                    _convert_in_worker, source, output_path, profile, images, job_profile=job_profile
+                )
+                report(page_count, page_count)
+                result = ConversionResult(profile, page_count, page_sizes=page_sizes)
+            else:
+                result = await self._convert_pages(
+                    source, output_path, page_count, parallel_pages, report, profile, fingerprints, previous,
+                    job_profile, images
+                )
+        if self.configs.MARKDOWN_INDEX_ENABLED:
+            await asyncio.to_thread(write_index, output_path, result.page_sizes)
+        return result
+
+    async def _reusable_pages(self, source: PdfSource, fingerprints: List[str], variant: str,
+                              previous: PreviousOutput, previous_path: str) -> Dict[int, Tuple[int, PageRecord]]:
+        """Map pages to the offset and record of an identical page in the previous output.
+
+        The previous Markdown is fetched to `previous_path` only when at least
+        one page can be reused, and is ignored unless it matches its manifest.
+        """
+        manifest = previous.manifest
+        if manifest.profile != variant or manifest.converter != CONVERTER_VERSION:
+            return {}
+        previous_pages = {}
+        for offset, record in zip(manifest.offsets(), manifest.pages):
+            previous_pages.setdefault(record.fingerprint, (offset, record))
+        reusable = {
+            index: previous_pages[fingerprint]
+            for index, fingerprint in enumerate(fingerprints) if fingerprint in previous_pages
+        }
+        if not reusable:
+            return {}
+        if not await previous.fetch(previous_path):
+            return {}
+        if await asyncio.to_thread(_file_sha256, previous_path) != manifest.markdown_sha256:
+            self.logger.warning(f"Stored Markdown of {describe_source(source)} does not match its page manifest, converting all pages")
+            return {}
+        return reusable
+
+    async def _convert_pages(self, source: PdfSource, output_path: str, page_count: int, parallel_pages: Optional[bool],
+                             report: Callable[[int, int], None], profile: ConversionProfile,
+                             fingerprints: Optional[List[str]], previous: Optional[PreviousOutput],
+                             job_profile: Optional[JobProfile] = None,
+                             images: Optional[ImageExtraction] = None) -> ConversionResult:
+        """Convert a document page by page with the layout engine, reusing unchanged pages of `previous`.
+
+        Without `fingerprints` no page is reused and no page manifest is written.
+        """
+        variant = output_variant(profile, images is not None)
+        previous_path = f"{output_path}.previous"
+        range_paths: List[str] = []
+        # Page index to (range path, offset, size) of its converted Markdown
+        converted: Dict[int, Tuple[str, int, int]] = {}
+        pages_done = 0
+
+        async def convert_range(pages: List[int], range_path: str):
+            nonlocal pages_done
+            sizes = await self._submit(
+                _convert_pages_in_worker, source, pages, range_path, profile == ConversionProfile.FULL, images,
+                job_profile=job_profile
+            )
+            offset = 0
+            for page, size in zip(pages, sizes):
+                converted[page] = (range_path, offset, size)
+                offset += size
+            pages_done += len(pages)
+            report(pages_done, page_count)
+
+        async def convert_pages(pages: List[int]):
+            if not pages:
+                return
+            range_size = len(pages)
+            if self.use_page_ranges(page_count, parallel_pages, profile):
+                range_size = max(1, self.configs.PAGE_RANGE_SIZE)
+            page_ranges = [pages[start:start + range_size] for start in range(0, len(pages), range_size)]
+            paths = [f"{output_path}.{len(range_paths) + index}.part" for index in range(len(page_ranges))]
+            range_paths.extend(paths)
+            if len(page_ranges) > 1:
+                self.logger.info(f"Converting {describe_source(source)} as {len(page_ranges)} page range(s) of up to {range_size} page(s)")
+            # Let every range finish before cleaning up, so no worker writes a range file afterwards
+            results = await asyncio.gather(*(
+                convert_range(page_range, path) for page_range, path in zip(page_ranges, paths)
+            ), return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+
+        try:
+            reused = {}
+            if previous is not None and fingerprints is not None:
+                reused = await self._reusable_pages(source, fingerprints, variant, previous, previous_path)
+            if reused:
+                self.logger.info(f"Reusing {len(reused)} of {page_count} page(s) from the previous conversion of {describe_source(source)}")
+                pages_done = len(reused)
+                report(pages_done, page_count)
+            await convert_pages([page for page in range(page_count) if page not in reused])
+
+            segments = [
+                (previous_path, reused[page][0], reused[page][1].size) if page in reused else converted[page]
+                for page in range(page_count)
+            ]
+            sizes, markdown_sha256 = await asyncio.to_thread(_assemble_pages, segments, output_path)
+            if fingerprints is not None:
+                manifest = PageManifest(
+                    profile=variant,
+                    converter=CONVERTER_VERSION,
+                    markdown_sha256=markdown_sha256,
+                    pages=[
+                        PageRecord(fingerprint, size)
+                        for page, (fingerprint, size) in enumerate(zip(fingerprints, sizes))
+                    ],
+                )
+                await asyncio.to_thread(_write_manifest, manifest, manifest_path(output_path))
+        finally:
+            for path in range_paths + [previous_path]:
+                if os.path.exists(path):
+                    os.remove(path)
+        return ConversionResult(profile, page_count - len(reused), len(reused), sizes)
@@ -15,59 +15,180 @@
 # under the License.
 
 import os
+import shutil
 import asyncio
 import logging
 import tempfile
+from typing import List, Optional, Tuple
 from settings import Configs
+from markdown_index import INDEX_SUFFIX
+from page_manifest import MANIFEST_SUFFIX, PageManifest
+from image_assets import ASSETS_DIR
+from md_compression import Codec, CompressingReader, get_codec, open_markdown, stored_suffixes
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Files kept next to a markdown file, named after it with these suffixes
+SIDECAR_SUFFIXES = (MANIFEST_SUFFIX, INDEX_SUFFIX)
+
+def sidecar_paths(md_path: str) -> List[Tuple[str, str]]:
+    """Return the suffix and path of every file kept next to a markdown file."""
+    base = os.path.splitext(md_path)[0]
+    return [(suffix, base + suffix) for suffix in SIDECAR_SUFFIXES]
+
+def _copy_into_place(source_path: str, target_path: str, codec: Optional[Codec] = None, level: int = 0) -> int:
+    # Copy to a temporary file next to the target, compressed with `codec`, and rename it into place
+    target_dir, target_name = os.path.split(target_path)
+    fd, temp_path = tempfile.mkstemp(dir=target_dir, prefix=f".{target_name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f, open(source_path, "rb") as source:
+            if codec is not None:
+                source = CompressingReader(source, codec.compressor(level), COPY_CHUNK_SIZE)
+            shutil.copyfileobj(source, f, COPY_CHUNK_SIZE)
+            size = f.tell()
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, target_path)
+        return size
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+def stored_md_name(file_name: str, configs: Configs) -> str:
+    """Return the name markdown is stored under, marked with the configured content encoding."""
+    codec = get_codec(configs.MD_COMPRESSION)
+    return f"{file_name}.md{codec.suffix if codec else ''}"
 
 async def read_pdf_file_local(file_name: str, configs: Configs, logger: logging.Logger):
-    """Read a PDF file from local storage and copy it to a temporary file.
+    """Locate a PDF file in local storage and return its path.
 
-    Note:
-        The returned temporary file path is owned by the caller. The caller is
-        responsible for deleting the file after processing.
+    The converter reads the original file directly, so no temporary copy is
+    made. The file must not be removed until the conversion has finished.
     """
     try:
         # Prepare the PDF filename
         pdf_filename = os.path.join(configs.LOCAL_DIR, "pdf", f"{file_name}.pdf")
-
-        def _copy_pdf_to_temp() -> str:
-            temp_file_path = None
-            try:
-                # Create a temporary file to store the PDF
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                    temp_file_path = temp_file.name
-                    # Read the PDF file from local storage and copy content
-                    with open(pdf_filename, 'rb') as f:
-                        temp_file.write(f.read())
-                return temp_file_path
-            except Exception:
-                if temp_file_path and os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
-                raise
-
-        loop = asyncio.get_running_loop()
-        temp_file_path = await loop.run_in_executor(None, _copy_pdf_to_temp)
+        if not os.path.isfile(pdf_filename):
+            raise FileNotFoundError(f"No such file: '{pdf_filename}'")
         logger.info(f"Successfully read PDF file for {file_name} from local storage")
-        return temp_file_path
+        return pdf_filename
     except Exception as e:
         logger.error(f"Error reading PDF file from local storage: {e}")
         return None
     
-async def store_md_content_local(file_name: str, content: str, configs: Configs, logger: logging.Logger):
-    """Store markdown content in local storage."""
-    try:
-        # Prepare the markdown filename
+async def store_md_content_local(file_name: str, md_path: str, configs: Configs, logger: logging.Logger) -> Optional[int]:
+    """Store a markdown file in local storage and return the number of bytes stored, or None on failure.
+
+    The content is streamed in chunks, compressed with MD_COMPRESSION, to a
+    temporary file next to the target and renamed into place, so readers
+    never see a partial file. A copy stored with another content encoding is
+    removed. Files kept next to `md_path`, such as its page manifest, are
+    stored after the markdown, and stored ones that `md_path` no longer has
+    are removed.
+    """
+    def _copy() -> int:
         md_dir = os.path.join(configs.LOCAL_DIR, "md")
         os.makedirs(md_dir, exist_ok=True)
-        md_filename = os.path.join(md_dir, f"{file_name}.md")
-        # Write the markdown content to a local file
-        with open(md_filename, 'w', encoding='utf-8') as f:
-            f.write(content)
+        md_name = stored_md_name(file_name, configs)
+        size = _copy_into_place(
+            md_path, os.path.join(md_dir, md_name), get_codec(configs.MD_COMPRESSION), configs.MD_COMPRESSION_LEVEL
+        )
+        for suffix in stored_suffixes():
+            stale_path = os.path.join(md_dir, f"{file_name}.md{suffix}")
+            if f"{file_name}.md{suffix}" != md_name and os.path.exists(stale_path):
+                os.remove(stale_path)
+        for suffix, path in sidecar_paths(md_path):
+            target_path = os.path.join(md_dir, f"{file_name}{suffix}")
+            if os.path.exists(path):
+                _copy_into_place(path, target_path)
+            elif os.path.exists(target_path):
+                os.remove(target_path)
+        return size
+
+    try:
+        size = await asyncio.to_thread(_copy)
         logger.info(f"Successfully stored markdown content for {file_name} to local storage")
-        return True
+        return size
     except Exception as e:
         logger.error(f"Error storing markdown content to local storage: {e}")
+        return None
+
+async def store_artifacts_local(file_name: str, artifacts: List[Tuple[str, str]], configs: Configs,
+                                logger: logging.Logger) -> bool:
+    """Store files produced by a job, such as its profile, in local storage as md/<file_name><suffix>.
+
+    `artifacts` are (suffix, path) pairs. Returns False on failure.
+    """
+    def _copy():
+        md_dir = os.path.join(configs.LOCAL_DIR, "md")
+        os.makedirs(md_dir, exist_ok=True)
+        for suffix, path in artifacts:
+            _copy_into_place(path, os.path.join(md_dir, f"{file_name}{suffix}"))
+
+    try:
+        await asyncio.to_thread(_copy)
+        logger.info(f"Successfully stored {len(artifacts)} artifact(s) for {file_name} to local storage")
+        return True
+    except Exception as e:
+        logger.error(f"Error storing artifacts to local storage: {e}")
+        return False
+
+async def store_images_local(images_dir: str, names: List[str], configs: Configs, logger: logging.Logger) -> Optional[int]:
+    """Store extracted images in local storage as md/assets/<name> and return the bytes written, or None on failure.
+
+    Images are named by their content hash, so those already stored are skipped.
+    """
+    def _copy() -> int:
+        assets_dir = os.path.join(configs.LOCAL_DIR, "md", ASSETS_DIR)
+        os.makedirs(assets_dir, exist_ok=True)
+        written = 0
+        for name in names:
+            target_path = os.path.join(assets_dir, name)
+            if not os.path.exists(target_path):
+                written += _copy_into_place(os.path.join(images_dir, name), target_path)
+        return written
+
+    try:
+        written = await asyncio.to_thread(_copy)
+        logger.info(f"Successfully stored {len(names)} image(s), {written} new byte(s), to local storage")
+        return written
+    except Exception as e:
+        logger.error(f"Error storing images to local storage: {e}")
+        return None
+
+async def read_page_manifest_local(file_name: str, configs: Configs, logger: logging.Logger) -> Optional[PageManifest]:
+    """Read the page manifest stored with a markdown file, or None if there is none."""
+    def _read() -> Optional[PageManifest]:
+        path = os.path.join(configs.LOCAL_DIR, "md", f"{file_name}{MANIFEST_SUFFIX}")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return PageManifest.from_json(f.read())
+        except FileNotFoundError:
+            return None
+
+    try:
+        return await asyncio.to_thread(_read)
+    except Exception as e:
+        logger.error(f"Error reading page manifest from local storage: {e}")
+        return None
+
+async def fetch_md_content_local(file_name: str, dest_path: str, configs: Configs, logger: logging.Logger) -> bool:
+    """Copy a stored markdown file to `dest_path`, decompressing it if it was stored compressed."""
+    def _copy():
+        md_dir = os.path.join(configs.LOCAL_DIR, "md")
+        # The configured encoding is the likeliest, a file stored before a configuration change has another
+        names = [stored_md_name(file_name, configs)] + [f"{file_name}.md{suffix}" for suffix in stored_suffixes()]
+        for name in dict.fromkeys(names):
+            if os.path.exists(os.path.join(md_dir, name)):
+                with open_markdown(os.path.join(md_dir, name)) as source, open(dest_path, "wb") as f:
+                    shutil.copyfileobj(source, f, COPY_CHUNK_SIZE)
+                return
+        raise FileNotFoundError(f"No stored markdown for '{file_name}'")
+
+    try:
+        await asyncio.to_thread(_copy)
+        return True
+    except Exception as e:
+        logger.error(f"Error reading markdown content from local storage: {e}")
         return False
 
 async def delete_pdf_file_local(file_name: str, configs: Configs, logger: logging.Logger):
@@ -0,0 +1,208 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import ctypes
+import struct
+import asyncio
+import logging
+import ctypes.util
+from typing import Callable, Dict, List, Optional, Tuple
+
+from settings import Configs
+
+# inotify event flags, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event: wd, mask, cookie and len, followed by len bytes of name
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+# Size and modification time of a file, which change while it is written
+FileSignature = Tuple[int, int]
+
+class Inotify:
+    """A non-blocking inotify instance watching one directory, through libc.
+
+    Raises OSError where inotify is not available.
+    """
+
+    def __init__(self, path: str, mask: int):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+        except (OSError, AttributeError) as e:
+            raise OSError(f"inotify is not available: {e}") from e
+        self.fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if add_watch(self.fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"Could not watch {path}")
+
+    def read(self) -> List[Tuple[int, str]]:
+        """Return the (mask, file name) of the pending events."""
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            events.append((mask, os.fsdecode(data[offset:offset + length].rstrip(b"\0"))))
+            offset += length
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+def _signature(path: str) -> Optional[FileSignature]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+class FolderWatcher:
+    """Feeds PDFs dropped into `LOCAL_DIR/pdf` into the conversion pipeline.
+
+    inotify reports files as they are created, written and moved in. A file
+    is submitted once it has been left unchanged for `WATCH_DEBOUNCE`
+    seconds, so files still being copied in are not converted half written.
+    PDFs that are already in the folder when the watcher starts are
+    submitted as well, since converted PDFs are removed from it.
+
+    `submit` is called with the file name without `.pdf` and returns None
+    once the file is handled, or the seconds to wait before trying again
+    when the scheduler queue is full. A file is submitted again only after
+    it changes. Where inotify is not available, the folder is scanned every
+    `WATCH_DEBOUNCE` seconds instead.
+    """
+
+    def __init__(self, configs: Configs, logger: logging.Logger, submit: Callable[[str], Optional[int]]):
+        self.configs = configs
+        self.logger = logger
+        self.submit = submit
+        self.directory = os.path.join(configs.LOCAL_DIR, "pdf")
+        self.debounce = max(0.05, configs.WATCH_DEBOUNCE)
+        self._inotify: Optional[Inotify] = None
+        self._poller: Optional[asyncio.Task] = None
+        # File name -> settle timer and the signature seen when it was armed
+        self._pending: Dict[str, Tuple[asyncio.TimerHandle, Optional[FileSignature]]] = {}
+        # File name -> signature of the file when it was submitted
+        self._submitted: Dict[str, FileSignature] = {}
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        try:
+            self._inotify = Inotify(self.directory, WATCH_MASK)
+            loop.add_reader(self._inotify.fd, self._on_events)
+            self.logger.info(f"Watching {self.directory} for new PDFs")
+        except OSError as e:
+            self.logger.warning(f"{e}, scanning {self.directory} every {self.debounce} seconds instead")
+            self._poller = asyncio.create_task(self._poll())
+        self._scan()
+
+    def close(self):
+        if self._inotify is not None:
+            asyncio.get_running_loop().remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+        for timer, _ in self._pending.values():
+            timer.cancel()
+        self._pending.clear()
+
+    def _on_events(self):
+        for mask, name in self._inotify.read():
+            if mask & IN_Q_OVERFLOW:
+                self.logger.warning("inotify queue overflowed, rescanning the watch folder")
+                self._scan()
+            elif name.endswith(".pdf") and not name.startswith("."):
+                file_name = name[:-len(".pdf")]
+                if mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._forget(file_name)
+                else:
+                    self._arm(file_name)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.debounce)
+            self._scan()
+
+    def _scan(self):
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".pdf") and not name.startswith(".")]
+        except OSError as e:
+            self.logger.error(f"Could not list the watch folder: {e}")
+            return
+        present = {name[:-len(".pdf")] for name in names}
+        for file_name in list(self._submitted):
+            if file_name not in present:
+                del self._submitted[file_name]
+        for file_name in present:
+            if file_name not in self._pending:
+                self._arm(file_name)
+
+    def _forget(self, file_name: str):
+        pending = self._pending.pop(file_name, None)
+        if pending is not None:
+            pending[0].cancel()
+        self._submitted.pop(file_name, None)
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.directory, f"{file_name}.pdf")
+
+    def _arm(self, file_name: str, delay: Optional[float] = None):
+        """(Re)start the quiet period of a file, which ends in `_settle`."""
+        if file_name in self._pending:
+            self._pending[file_name][0].cancel()
+        signature = _signature(self._path(file_name))
+        if signature is not None and self._submitted.get(file_name) == signature:
+            # Unchanged since it was submitted, e.g. a PDF whose conversion failed
+            self._pending.pop(file_name, None)
+            return
+        timer = asyncio.get_running_loop().call_later(delay or self.debounce, self._settle, file_name, signature)
+        self._pending[file_name] = (timer, signature)
+
+    def _settle(self, file_name: str, armed: Optional[FileSignature]):
+        signature = _signature(self._path(file_name))
+        if signature is None:
+            # Removed or renamed away before it settled
+            self._forget(file_name)
+            return
+        if signature != armed or signature[0] == 0:
+            # Still being written without raising events, e.g. on a network share
+            self._arm(file_name)
+            return
+        retry_after = self.submit(file_name)
+        if retry_after is not None:
+            self._arm(file_name, retry_after)
+            return
+        del self._pending[file_name]
+        self._submitted[file_name] = signature
@@ -14,103 +14,404 @@
 # specific language governing permissions and limitations
 # under the License.
 
-import io
+import os
+import time
 import ftplib
+import asyncio
 import logging
-import os
-import tempfile
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Set, Tuple
 from settings import Configs
+from file_utils import sidecar_paths, stored_md_name
+from md_compression import Codec, CompressingReader, codec_for, get_codec, stored_suffixes
+from page_manifest import MANIFEST_SUFFIX, PageManifest
+from image_assets import ASSETS_DIR
+
+class FTPConnectionPool:
+    """Pool of logged-in FTP sessions shared by all jobs.
+
+    ftplib is blocking, so every FTP command runs on a dedicated thread pool
+    sized to the connection pool and the event loop never waits on a socket.
+    Idle sessions are kept alive with NOOPs and are health checked before they
+    are reused, so a job only pays for connect and login when the pool has no
+    healthy idle session.
+    """
+
+    def __init__(self, configs: Configs, logger: logging.Logger):
+        self.configs = configs
+        self.logger = logger
+        self.size = max(1, configs.FTP_POOL_SIZE)
+        self._idle: List[Tuple[ftplib.FTP, float]] = []
+        self._slots = asyncio.Semaphore(self.size)
+        # One spare thread so a broken session can be closed while the others are busy
+        self._executor = ThreadPoolExecutor(max_workers=self.size + 1, thread_name_prefix="ftp")
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._cleanup: Set[asyncio.Task] = set()
+        self._md_dir_ready = False
+        self._md_dir_lock = asyncio.Lock()
+
+    def start(self):
+        """Start the background keep-alive loop."""
+        if self._keepalive_task is None and self.configs.FTP_KEEPALIVE_INTERVAL > 0:
+            self._keepalive_task = asyncio.create_task(self._keepalive())
+
+    async def close(self):
+        """Stop the keep-alive loop and log out of every idle session."""
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+        if self._cleanup:
+            await asyncio.gather(*self._cleanup, return_exceptions=True)
+        idle, self._idle = self._idle, []
+        for ftp, _ in idle:
+            await self._run(self._quit, ftp)
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def _run_kept(self, on_result: Callable[[Any], Any], fn, *args):
+        """Run `fn` like `_run`, handing its result to `on_result` if the caller is cancelled first.
+
+        The blocking call keeps running on its thread after a cancellation, so
+        a session it connected or checked goes back to the pool instead of leaking.
+        """
+        call = asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        try:
+            return await asyncio.shield(call)
+        except asyncio.CancelledError:
+            call.add_done_callback(lambda f: f.cancelled() or f.exception() is not None or on_result(f.result()))
+            raise
+
+    def _connect(self) -> ftplib.FTP:
+        ftp = ftplib.FTP(timeout=self.configs.FTP_TIMEOUT)
+        try:
+            ftp.connect(self.configs.FTP_HOST, self.configs.FTP_PORT)
+            ftp.login(self.configs.FTP_USERNAME, self.configs.FTP_PASSWORD)
+        except BaseException:
+            ftp.close()
+            raise
+        return ftp
+
+    @staticmethod
+    def _quit(ftp: ftplib.FTP):
+        try:
+            ftp.quit()
+        except Exception:
+            ftp.close()
+
+    @staticmethod
+    def _is_alive(ftp: ftplib.FTP) -> bool:
+        try:
+            ftp.voidcmd("NOOP")
+            return True
+        except Exception:
+            ftp.close()
+            return False
+
+    async def _acquire(self) -> ftplib.FTP:
+        while self._idle:
+            ftp, last_used = self._idle.pop()
+            # Sessions used moments ago are trusted, older ones are checked first
+            if time.monotonic() - last_used < self.configs.FTP_HEALTH_CHECK_AFTER:
+                return ftp
+            if await self._run_kept(lambda alive, ftp=ftp: alive and self._release(ftp), self._is_alive, ftp):
+                return ftp
+        return await self._run_kept(self._release, self._connect)
+
+    def _release(self, ftp: ftplib.FTP):
+        if len(self._idle) >= self.size:
+            self._executor.submit(self._quit, ftp)
+            return
+        self._idle.append((ftp, time.monotonic()))
+
+    @asynccontextmanager
+    async def session(self):
+        """Borrow a logged-in session for the duration of the block."""
+        async with self._slots:
+            ftp = await self._acquire()
+            try:
+                yield ftp
+            except ftplib.error_perm:
+                # Permanent errors (e.g. missing file) leave the session usable
+                self._release(ftp)
+                raise
+            except BaseException:
+                self._executor.submit(ftp.close)
+                raise
+            else:
+                self._release(ftp)
 
-async def read_pdf_file_ftp(file_name: str, configs: Configs, logger: logging.Logger):
-    """Read PDF file from FTP server and return local temporary file path."""
-    ftp = None
-    temp_file_path = None
+    async def run(self, fn, *args):
+        """Run a blocking `fn(ftp, *args)` on a pooled session off the event loop."""
+        async with self.session() as ftp:
+            return await self._run(fn, ftp, *args)
+
+    async def store(self, path: str, local_path: str, codec: Optional[Codec] = None, level: int = 0) -> int:
+        """Upload a file with `_store`, removing its partial upload when the store fails or is cancelled."""
+        try:
+            return await self.run(_store, path, local_path, codec, level)
+        except ftplib.error_perm:
+            # The session was still usable, so _store removed the partial upload itself
+            raise
+        except BaseException:
+            self._discard(f"{path}.part")
+            raise
+
+    def _discard(self, path: str):
+        """Delete `path` on another session in the background."""
+        async def _delete():
+            try:
+                await self.run(_delete_if_exists, path)
+            except Exception as e:
+                self.logger.warning(f"Could not remove {path} from the FTP server: {e}")
+
+        task = asyncio.create_task(_delete())
+        self._cleanup.add(task)
+        task.add_done_callback(self._cleanup.discard)
+
+    async def ensure_md_dir(self):
+        """Create the /md directory once per process if it doesn't exist."""
+        def _ensure(ftp: ftplib.FTP):
+            try:
+                ftp.cwd('/md')
+            except ftplib.error_perm:
+                # Directory doesn't exist, try to create it
+                try:
+                    ftp.mkd('/md')
+                except ftplib.error_perm:
+                    # Another client may have created it in the meantime
+                    ftp.cwd('/md')
+            finally:
+                ftp.cwd('/')
+
+        async with self._md_dir_lock:
+            if not self._md_dir_ready:
+                await self.run(_ensure)
+                self._md_dir_ready = True
+
+    async def _keepalive(self):
+        interval = self.configs.FTP_KEEPALIVE_INTERVAL
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            stale = [entry for entry in self._idle if now - entry[1] >= interval]
+            self._idle = [entry for entry in self._idle if now - entry[1] < interval]
+            for ftp, _ in stale:
+                try:
+                    alive = await self._run(self._is_alive, ftp)
+                except Exception:
+                    alive = False
+                if alive:
+                    self._release(ftp)
+            if stale:
+                self.logger.debug(f"FTP keep-alive checked {len(stale)} idle session(s)")
+
+_ftp_pool: Optional[FTPConnectionPool] = None
+
+def get_ftp_pool(configs: Configs, logger: logging.Logger) -> FTPConnectionPool:
+    """Return the process wide FTP connection pool, creating it on first use."""
+    global _ftp_pool
+    if _ftp_pool is None:
+        _ftp_pool = FTPConnectionPool(configs, logger)
+        _ftp_pool.start()
+    return _ftp_pool
+
+async def close_ftp_pool():
+    """Close the FTP connection pool if it was created."""
+    global _ftp_pool
+    if _ftp_pool is not None:
+        await _ftp_pool.close()
+        _ftp_pool = None
+
+def _retrieve(ftp: ftplib.FTP, path: str) -> bytearray:
+    content = bytearray()
+    ftp.retrbinary(f'RETR {path}', content.extend)
+    return content
+
+STORE_BLOCK_SIZE = 64 * 1024
+
+def _retrieve_to_file(ftp: ftplib.FTP, path: str, dest_path: str):
+    # Stored markdown is decompressed block by block as it arrives
+    codec = codec_for(path)
+    decompressor = codec.decompressor() if codec else None
+    with open(dest_path, 'wb') as f:
+        write = (lambda block: f.write(decompressor.decompress(block))) if decompressor else f.write
+        ftp.retrbinary(f'RETR {path}', write, blocksize=STORE_BLOCK_SIZE)
+
+def _store(ftp: ftplib.FTP, path: str, md_path: str, codec: Optional[Codec] = None, level: int = 0) -> int:
+    # Upload under a temporary name and rename, so readers never see a partial file
+    temp_path = f"{path}.part"
     try:
-        # Connect to FTP server
-        ftp = ftplib.FTP()
-        ftp.connect(configs.FTP_HOST, configs.FTP_PORT)
-        ftp.login(configs.FTP_USERNAME, configs.FTP_PASSWORD)
-        # Change to the pdf directory
-        ftp.cwd('/pdf')
-        # Prepare the PDF filename
-        pdf_filename = f"{file_name}.pdf"
-        # Create a temporary file to store the downloaded PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            # Download the PDF file from FTP server
-            temp_file_path = temp_file.name
-            ftp.retrbinary(f'RETR {pdf_filename}', temp_file.write)
+        with open(md_path, 'rb') as f:
+            if codec is None:
+                ftp.storbinary(f'STOR {temp_path}', f, blocksize=STORE_BLOCK_SIZE)
+                size = f.tell()
+            else:
+                # Compress while uploading
+                reader = CompressingReader(f, codec.compressor(level), STORE_BLOCK_SIZE)
+                ftp.storbinary(f'STOR {temp_path}', reader, blocksize=STORE_BLOCK_SIZE)
+                size = reader.bytes_out
+        try:
+            ftp.rename(temp_path, path)
+        except ftplib.error_perm:
+            # Some servers refuse to rename over an existing file
+            ftp.delete(path)
+            ftp.rename(temp_path, path)
+    except BaseException:
+        # Don't leave the partial upload behind, this fails too when the session broke
+        try:
+            ftp.delete(temp_path)
+        except Exception:
+            pass
+        raise
+    return size
+
+def _store_images(ftp: ftplib.FTP, images_dir: str, names: List[str]) -> int:
+    assets_dir = f"/md/{ASSETS_DIR}"
+    try:
+        ftp.mkd(assets_dir)
+    except ftplib.error_perm:
+        # Already exists
+        pass
+    # Some servers refuse SIZE in ASCII mode
+    ftp.voidcmd("TYPE I")
+    written = 0
+    for name in names:
+        path = f"{assets_dir}/{name}"
+        try:
+            # Images are named by their content hash, so a stored one is identical
+            ftp.size(path)
+            continue
+        except ftplib.error_perm:
+            # Missing, or SIZE is not supported and the image is uploaded again
+            pass
+        written += _store(ftp, path, os.path.join(images_dir, name))
+    return written
+
+def _delete(ftp: ftplib.FTP, path: str):
+    ftp.delete(path)
+
+def _delete_if_exists(ftp: ftplib.FTP, path: str):
+    try:
+        ftp.delete(path)
+    except ftplib.error_perm:
+        pass
+
+async def read_pdf_file_ftp(file_name: str, dest_path: str, configs: Configs, logger: logging.Logger) -> bool:
+    """Download a PDF file from the FTP server to `dest_path`, returning False on failure."""
+    try:
+        pool = get_ftp_pool(configs, logger)
+        # Download in blocks to a local file, which the conversion workers read in place
+        await pool.run(_retrieve_to_file, f"/pdf/{file_name}.pdf", dest_path)
         logger.info(f"Successfully downloaded PDF file for {file_name} from FTP server")
-        return temp_file_path
+        return True
     except Exception as e:
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
         logger.error(f"Error reading PDF file from FTP: {e}")
-        return None
-    finally:
-        # Ensure FTP connection is always closed
-        if ftp is not None:
-            try:
-                ftp.quit()
-            except Exception:
-                ftp.close()
+        return False
     
-async def store_md_content_ftp(file_name: str, content: str, temp_file_path: str, configs: Configs, logger: logging.Logger):
-    """Store markdown content in FTP server."""
-    ftp = None
+async def store_md_content_ftp(file_name: str, md_path: str, configs: Configs, logger: logging.Logger) -> Optional[int]:
+    """Stream a markdown file and the files kept next to it to the FTP server.
+
+    The markdown is compressed with MD_COMPRESSION while it is uploaded, and
+    a copy stored with another content encoding is removed, as are stored
+    files that `md_path` no longer has next to it. Returns the number of
+    markdown bytes stored, or None on failure.
+    """
     try:
-        # Connect to FTP server
-        ftp = ftplib.FTP()
-        ftp.connect(configs.FTP_HOST, configs.FTP_PORT)
-        ftp.login(configs.FTP_USERNAME, configs.FTP_PASSWORD)
-        # Change to the md directory (create if it doesn't exist)
+        pool = get_ftp_pool(configs, logger)
+        # Create the md directory if it doesn't exist
         try:
-            ftp.cwd('/md')
-        except ftplib.error_perm:
-            # Directory doesn't exist, try to create it
-            try:
-                ftp.mkd('/md')
-                ftp.cwd('/md')
-            except ftplib.error_perm as e:
-                logger.error(f"Failed to create or access /md directory: {e}")
-                return False
-        # Prepare the markdown content as a file-like object
-        md_filename = f"{file_name}.md"
-        content_bytes = content.encode('utf-8')
-        content_io = io.BytesIO(content_bytes)
-        # Upload the file
-        ftp.storbinary(f'STOR {md_filename}', content_io)
+            await pool.ensure_md_dir()
+        except ftplib.error_perm as e:
+            logger.error(f"Failed to create or access /md directory: {e}")
+            return None
+        # Upload the file in blocks straight from disk, then its page manifest and index
+        md_name = stored_md_name(file_name, configs)
+        size = await pool.store(f"/md/{md_name}", md_path, get_codec(configs.MD_COMPRESSION), configs.MD_COMPRESSION_LEVEL)
+        for suffix in stored_suffixes():
+            if f"{file_name}.md{suffix}" != md_name:
+                await pool.run(_delete_if_exists, f"/md/{file_name}.md{suffix}")
+        for suffix, path in sidecar_paths(md_path):
+            if os.path.exists(path):
+                await pool.store(f"/md/{file_name}{suffix}", path)
+            else:
+                await pool.run(_delete_if_exists, f"/md/{file_name}{suffix}")
         logger.info(f"Successfully stored markdown content for {file_name} to FTP server")
-        return True
+        return size
     except Exception as e:
         logger.error(f"Error storing markdown content to FTP: {e}")
+        return None
+
+async def store_artifacts_ftp(file_name: str, artifacts: List[Tuple[str, str]], configs: Configs,
+                              logger: logging.Logger) -> bool:
+    """Upload files produced by a job, such as its profile, to the FTP server as /md/<file_name><suffix>.
+
+    `artifacts` are (suffix, path) pairs. Returns False on failure.
+    """
+    try:
+        pool = get_ftp_pool(configs, logger)
+        await pool.ensure_md_dir()
+        for suffix, path in artifacts:
+            await pool.store(f"/md/{file_name}{suffix}", path)
+        logger.info(f"Successfully stored {len(artifacts)} artifact(s) for {file_name} to FTP server")
+        return True
+    except Exception as e:
+        logger.error(f"Error storing artifacts to FTP: {e}")
         return False
-    finally:
-        # Ensure FTP connection is always closed
-        if ftp is not None:
+
+async def store_images_ftp(images_dir: str, names: List[str], configs: Configs, logger: logging.Logger) -> Optional[int]:
+    """Upload extracted images to the FTP server as /md/assets/<name> and return the bytes written, or None on failure.
+
+    Images are named by their content hash, so those already stored are skipped.
+    """
+    try:
+        pool = get_ftp_pool(configs, logger)
+        await pool.ensure_md_dir()
+        written = await pool.run(_store_images, images_dir, names)
+        logger.info(f"Successfully stored {len(names)} image(s), {written} new byte(s), to FTP server")
+        return written
+    except Exception as e:
+        logger.error(f"Error storing images to FTP: {e}")
+        return None
+
+async def read_page_manifest_ftp(file_name: str, configs: Configs, logger: logging.Logger) -> Optional[PageManifest]:
+    """Read the page manifest stored with a markdown file, or None if there is none."""
+    try:
+        pool = get_ftp_pool(configs, logger)
+        content = await pool.run(_retrieve, f"/md/{file_name}{MANIFEST_SUFFIX}")
+        return PageManifest.from_json(content.decode("utf-8"))
+    except ftplib.error_perm:
+        # No manifest was stored for this file
+        return None
+    except Exception as e:
+        logger.error(f"Error reading page manifest from FTP: {e}")
+        return None
+
+async def fetch_md_content_ftp(file_name: str, dest_path: str, configs: Configs, logger: logging.Logger) -> bool:
+    """Download a stored markdown file to `dest_path`, decompressing it if it was stored compressed."""
+    try:
+        pool = get_ftp_pool(configs, logger)
+        # The configured encoding is the likeliest, a file stored before a configuration change has another
+        names = [stored_md_name(file_name, configs)] + [f"{file_name}.md{suffix}" for suffix in stored_suffixes()]
+        for name in dict.fromkeys(names):
             try:
-                ftp.quit()
-            except Exception:
-                ftp.close()
-        # Delete the temporary PDF file if it exists
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+                await pool.run(_retrieve_to_file, f"/md/{name}", dest_path)
+                return True
+            except ftplib.error_perm:
+                continue
+        raise FileNotFoundError(f"No stored markdown for '{file_name}'")
+    except Exception as e:
+        logger.error(f"Error reading markdown content from FTP: {e}")
+        return False
 
 async def delete_pdf_file_ftp(file_name: str, configs: Configs, logger: logging.Logger):
     """Delete the original PDF file from the FTP server."""
-    ftp = None
     try:
-        ftp = ftplib.FTP()
-        ftp.connect(configs.FTP_HOST, configs.FTP_PORT)
-        ftp.login(configs.FTP_USERNAME, configs.FTP_PASSWORD)
-        ftp.cwd('/pdf')
-        ftp.delete(f"{file_name}.pdf")
+        pool = get_ftp_pool(configs, logger)
+        await pool.run(_delete, f"/pdf/{file_name}.pdf")
         logger.info(f"Successfully deleted PDF file {file_name}.pdf from FTP server")
     except Exception as e:
         logger.error(f"Error deleting PDF file from FTP: {e}")
-    finally:
-        # Ensure FTP connection is always closed
-        if ftp is not None:
-            try:
-                ftp.quit()
-            except Exception:
-                ftp.close()
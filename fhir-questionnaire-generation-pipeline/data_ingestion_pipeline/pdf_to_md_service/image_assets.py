@@ -0,0 +1,74 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Images extracted out of line from converted Markdown.
+
+pymupdf4llm renders images as base64 `data:` URIs when it embeds them.
+`extract_images` moves each one into a file named after the SHA-256 of its
+content and links to it instead, as `![](assets/<sha256>.<format>)`. The
+files are stored in the `md/assets` directory next to the Markdown, so a
+link resolves relative to the Markdown file, and an image that occurs in
+many pages or documents is stored once.
+"""
+
+import os
+import re
+import base64
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from typing import List
+
+ASSETS_DIR = "assets"
+IMAGE_FORMATS = ("png", "jpg")
+
+DATA_URI_IMAGE = re.compile(r"!\[([^\]]*)\]\(data:image/([a-z]+);base64,([A-Za-z0-9+/=]+)\)")
+
+@dataclass
+class ImageExtraction:
+    """Where and how conversion workers write the images of a document."""
+
+    directory: str
+    image_format: str = "png"
+    dpi: int = 150
+
+def _write_asset(images_dir: str, name: str, data: bytes):
+    path = os.path.join(images_dir, name)
+    if os.path.exists(path):
+        return
+    fd, temp_path = tempfile.mkstemp(dir=images_dir, prefix=f".{name}.", suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def extract_images(markdown: str, images_dir: str) -> str:
+    """Write the embedded images of `markdown` to `images_dir` and link to them by content hash."""
+    def extract(match: re.Match) -> str:
+        data = base64.b64decode(match.group(3))
+        name = f"{hashlib.sha256(data).hexdigest()}.{match.group(2)}"
+        _write_asset(images_dir, name, data)
+        return f"![{match.group(1)}]({ASSETS_DIR}/{name})"
+
+    if "data:image/" not in markdown:
+        return markdown
+    os.makedirs(images_dir, exist_ok=True)
+    return DATA_URI_IMAGE.sub(extract, markdown)
+
+def image_files(images_dir: str) -> List[str]:
+    """Return the names of the images extracted into `images_dir`, none if it doesn't exist."""
+    if not os.path.isdir(images_dir):
+        return []
+    return sorted(name for name in os.listdir(images_dir) if not name.startswith("."))
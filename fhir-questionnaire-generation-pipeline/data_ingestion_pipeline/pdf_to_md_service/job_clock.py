@@ -0,0 +1,72 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Deadline clocks of scheduled jobs.
+
+A job's deadline guards against conversions that keep a worker busy, so its
+clock only runs while the job holds at least one conversion worker. Waiting
+in the queue, for memory or for a free worker, and FTP transfers don't
+count. The scheduler sets the running job's clock in a context variable,
+which tasks started by the job inherit, and the worker pool charges the
+time of every task to it.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+class JobClock:
+    """Time a job has held at least one conversion worker."""
+
+    def __init__(self):
+        self._holding = 0
+        self._since = 0.0
+        self._elapsed = 0.0
+
+    def elapsed(self) -> float:
+        if self._holding:
+            return self._elapsed + time.monotonic() - self._since
+        return self._elapsed
+
+    @contextmanager
+    def holding(self) -> Iterator[None]:
+        """Run the clock for the duration of the block, counting overlapping blocks once."""
+        if not self._holding:
+            self._since = time.monotonic()
+        self._holding += 1
+        try:
+            yield
+        finally:
+            self._holding -= 1
+            if not self._holding:
+                self._elapsed += time.monotonic() - self._since
+
+_current: ContextVar[Optional[JobClock]] = ContextVar("job_clock", default=None)
+
+def set_job_clock(clock: JobClock):
+    """Make `clock` the clock of the current task and the tasks it starts."""
+    _current.set(clock)
+
+@contextmanager
+def holding_worker() -> Iterator[None]:
+    """Count the block toward the current job's deadline, if it runs in a scheduled job."""
+    clock = _current.get()
+    if clock is None:
+        yield
+        return
+    with clock.holding():
+        yield
@@ -0,0 +1,203 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Sampling profiles of single conversion jobs.
+
+Worker tasks of a profiled job run under a `SamplingProfiler`, which
+samples the worker's Python stack on CPU time timer signals and tracks
+which page is being converted. The samples of all tasks are merged into a
+`JobProfile` and stored as two files next to the Markdown:
+
+- `<name>.profile.folded`: collapsed stacks, one `frame;frame;... value`
+  line per stack with the CPU time in microseconds, as read by
+  flamegraph.pl, speedscope and similar tools. The first frames name the
+  worker task and the page.
+- `<name>.profile.json`: wall and CPU time per page and per worker task.
+
+Jobs that are not profiled never start a profiler.
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pymupdf
+
+FOLDED_SUFFIX = ".profile.folded"
+SUMMARY_SUFFIX = ".profile.json"
+
+# The profiler running in this worker process, if any
+_active: Optional["SamplingProfiler"] = None
+
+# What a worker task sends back: folded stacks, wall and CPU time per page and the task's wall time, in seconds
+ProfileData = Tuple[Dict[str, float], Dict[int, float], Dict[int, float], float]
+
+class SamplingProfiler:
+    """Samples the Python stack of the main thread on SIGPROF.
+
+    The ITIMER_PROF timer fires every `interval` seconds of process CPU
+    time. Each sample is weighted with the CPU time since the previous one,
+    so time spent in long MuPDF calls, during which Python can't handle the
+    signal, is still attributed to the frame that made the call. Must be
+    started on the main thread of the process.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Dict[str, float] = {}
+        self.page_wall: Dict[int, float] = {}
+        self.page_cpu: Dict[int, float] = {}
+        self.page: Optional[int] = None
+        self._page_started = 0.0
+        self._last_cpu = 0.0
+        self._root = None
+        self._previous_handler = None
+
+    def start(self):
+        global _active
+        # Frames above the caller belong to the worker loop and are left out
+        self._root = sys._getframe(1)
+        self._last_cpu = time.process_time()
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        _active = self
+
+    def stop(self):
+        global _active
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler)
+        self.set_page(None)
+        _active = None
+
+    def set_page(self, page: Optional[int]):
+        """Start attributing time to `page` (1-based), or to no page."""
+        now = time.perf_counter()
+        if self.page is not None:
+            self.page_wall[self.page] = self.page_wall.get(self.page, 0.0) + now - self._page_started
+        self.page, self._page_started = page, now
+
+    def _sample(self, signum, frame):
+        now = time.process_time()
+        weight, self._last_cpu = now - self._last_cpu, now
+        frames = []
+        while frame is not None and frame is not self._root:
+            code = frame.f_code
+            frames.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)})")
+            frame = frame.f_back
+        if self.page is not None:
+            frames.append(f"page {self.page}")
+            self.page_cpu[self.page] = self.page_cpu.get(self.page, 0.0) + weight
+        stack = ";".join(reversed(frames))
+        self.stacks[stack] = self.stacks.get(stack, 0.0) + weight
+
+def mark_page(page: int):
+    """Attribute the following work to `page` (1-based) when this worker is being profiled."""
+    if _active is not None:
+        _active.set_page(page)
+
+def track_pages(doc: "pymupdf.Document") -> "pymupdf.Document":
+    """Mark the page whenever `doc` loads one, when this worker is being profiled.
+
+    pymupdf4llm loads every page it converts through `Document.load_page`,
+    so this attributes its work to pages without changing how it runs.
+    """
+    if _active is None:
+        return doc
+    load_page = doc.load_page
+
+    def _load_page(*args, **kwargs):
+        page = load_page(*args, **kwargs)
+        mark_page(page.number + 1)
+        return page
+
+    doc.load_page = _load_page
+    return doc
+
+def run_profiled(interval: float, fn: Callable, *args) -> Tuple[Any, ProfileData]:
+    """Run a worker task under a sampling profiler, returning its result and the profile."""
+    profiler = SamplingProfiler(interval)
+    started = time.perf_counter()
+    profiler.start()
+    try:
+        result = fn(*args)
+    finally:
+        profiler.stop()
+    return result, (profiler.stacks, profiler.page_wall, profiler.page_cpu, time.perf_counter() - started)
+
+@dataclass
+class PageTime:
+    page: int
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+
+@dataclass
+class TaskTime:
+    task: str
+    wall_seconds: float
+    cpu_seconds: float
+
+@dataclass
+class JobProfile:
+    """The merged profile of the worker tasks of one job."""
+
+    interval: float
+    stacks: Dict[str, float] = field(default_factory=dict)
+    pages: Dict[int, PageTime] = field(default_factory=dict)
+    tasks: List[TaskTime] = field(default_factory=list)
+
+    def add(self, task: str, data: ProfileData):
+        stacks, page_wall, page_cpu, wall_seconds = data
+        for stack, seconds in stacks.items():
+            key = f"{task};{stack}" if stack else task
+            self.stacks[key] = self.stacks.get(key, 0.0) + seconds
+        for page in set(page_wall) | set(page_cpu):
+            page_time = self.pages.setdefault(page, PageTime(page))
+            page_time.wall_seconds += page_wall.get(page, 0.0)
+            page_time.cpu_seconds += page_cpu.get(page, 0.0)
+        self.tasks.append(TaskTime(task, wall_seconds, sum(stacks.values())))
+
+    def write(self, base_path: str, **summary: Any) -> List[Tuple[str, str]]:
+        """Write the folded stacks and the summary next to `base_path`.
+
+        `summary` adds job details to the summary. Returns the suffix and
+        path of each file written.
+        """
+        folded_path, summary_path = base_path + FOLDED_SUFFIX, base_path + SUMMARY_SUFFIX
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for stack, seconds in sorted(self.stacks.items()):
+                micros = round(seconds * 1e6)
+                if micros:
+                    f.write(f"{stack} {micros}\n")
+        summary.update(
+            interval=self.interval,
+            cpu_seconds=round(sum(self.stacks.values()), 6),
+            tasks=[
+                {"task": task.task, "wall_seconds": round(task.wall_seconds, 6), "cpu_seconds": round(task.cpu_seconds, 6)}
+                for task in self.tasks
+            ],
+            pages=[
+                {"page": page.page, "wall_seconds": round(page.wall_seconds, 6), "cpu_seconds": round(page.cpu_seconds, 6)}
+                for page in sorted(self.pages.values(), key=lambda page: page.page)
+            ],
+        )
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        return [(FOLDED_SUFFIX, folded_path), (SUMMARY_SUFFIX, summary_path)]
@@ -0,0 +1,225 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import math
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from settings import Configs
+from job_clock import JobClock, set_job_clock
+
+class QueueFullError(Exception):
+    """Raised when a submission does not fit in the scheduler queue."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Conversion queue is full, retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+@dataclass
+class ScheduledJob:
+    job_id: str
+    run: Callable[[], Awaitable[None]]
+    priority: int = 0
+    # Returns the page count once it is known, which extends the job's deadline
+    pages_total: Optional[Callable[[], Optional[int]]] = None
+    # Called with the reason ("cancelled" or "timeout") after the job is cancelled
+    on_cancel: Optional[Callable[[str], Awaitable[None]]] = None
+
+class JobScheduler:
+    """Admission control and fair scheduling for conversion jobs.
+
+    At most `MAX_CONCURRENT_JOBS` jobs run at once and at most
+    `MAX_QUEUED_JOBS` wait for a slot; submissions beyond that are rejected
+    with a Retry-After estimate. Waiting jobs are grouped into lanes, one per
+    batch and one per single request. Lanes of the highest pending priority
+    are served round-robin, so a large batch can't starve other callers.
+
+    Jobs can be cancelled while they wait or run. A watchdog cancels running
+    jobs that exceed their deadline of `JOB_DEADLINE_BASE` seconds plus
+    `JOB_DEADLINE_PER_PAGE` seconds per page, counting only the time they
+    hold a conversion worker (see `job_clock`). A cancelled job's
+    `on_cancel` callback runs before its slot is given to the next job.
+    """
+
+    def __init__(self, configs: Configs, logger: logging.Logger):
+        self.configs = configs
+        self.logger = logger
+        self.max_running = max(1, configs.MAX_CONCURRENT_JOBS)
+        self.max_queued = max(0, configs.MAX_QUEUED_JOBS)
+        # priority -> lane key -> waiting jobs
+        self._lanes: Dict[int, "OrderedDict[str, Deque[ScheduledJob]]"] = {}
+        self._queued = 0
+        self._running: Set[asyncio.Task] = set()
+        # job ID -> task, job and deadline clock of running jobs
+        self._started: Dict[str, Tuple[asyncio.Task, ScheduledJob, JobClock]] = {}
+        # Running tasks cancelled through `cancel`, with the reason
+        self._cancelled: Dict[asyncio.Task, str] = {}
+        # Callbacks of jobs cancelled before they started running
+        self._callbacks: Set[asyncio.Task] = set()
+        self._watchdog: Optional[asyncio.Task] = None
+        self._avg_duration = float(configs.JOB_DURATION_ESTIMATE)
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    def retry_after(self, incoming: int = 1) -> int:
+        """Estimate the seconds until `incoming` more jobs would fit in the queue."""
+        backlog = self._queued + incoming - self.max_queued
+        waves = max(1, math.ceil(backlog / self.max_running))
+        return max(1, math.ceil(waves * self._avg_duration))
+
+    def submit(self, lane: str, jobs: List[ScheduledJob]):
+        """Queue jobs in a lane, all or nothing.
+
+        Raises QueueFullError when the jobs don't fit in the queue.
+        """
+        free_slots = self.max_running - len(self._running)
+        if self._queued + len(jobs) - max(0, free_slots) > self.max_queued:
+            raise QueueFullError(self.retry_after(len(jobs)))
+        for job in jobs:
+            lanes = self._lanes.setdefault(job.priority, OrderedDict())
+            lanes.setdefault(lane, deque()).append(job)
+        self._queued += len(jobs)
+        self._dispatch()
+
+    def _next_job(self) -> ScheduledJob:
+        priority = max(self._lanes)
+        lanes = self._lanes[priority]
+        # Serve the first lane and move it to the back for round-robin
+        lane, waiting = lanes.popitem(last=False)
+        job = waiting.popleft()
+        if waiting:
+            lanes[lane] = waiting
+        if not lanes:
+            del self._lanes[priority]
+        self._queued -= 1
+        return job
+
+    def _dispatch(self):
+        while self._lanes and len(self._running) < self.max_running:
+            job = self._next_job()
+            clock = JobClock()
+            task = asyncio.create_task(self._run(job, clock))
+            self._running.add(task)
+            self._started[job.job_id] = (task, job, clock)
+            task.add_done_callback(self._on_done)
+        if self._started and self.configs.JOB_DEADLINE_BASE > 0 and (self._watchdog is None or self._watchdog.done()):
+            self._watchdog = asyncio.create_task(self._watch())
+
+    async def _run(self, job: ScheduledJob, clock: JobClock):
+        task = asyncio.current_task()
+        started = time.monotonic()
+        set_job_clock(clock)
+        try:
+            await job.run()
+        except asyncio.CancelledError:
+            reason = self._cancelled.pop(task, None)
+            if reason is None:
+                raise
+            task.uncancel()
+            self.logger.warning(f"Job {job.job_id} was cancelled ({reason})")
+            if job.on_cancel is not None:
+                await job.on_cancel(reason)
+        except Exception as e:
+            self.logger.error(f"Unhandled error in job {job.job_id}: {e}")
+        finally:
+            # Exponential moving average of job durations for Retry-After estimates
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * (time.monotonic() - started)
+
+    def _on_done(self, task: asyncio.Task):
+        self._running.discard(task)
+        reason = self._cancelled.pop(task, None)
+        for job_id, (running_task, job, _) in list(self._started.items()):
+            if running_task is task:
+                del self._started[job_id]
+                if reason is not None and task.cancelled() and job.on_cancel is not None:
+                    # Cancelled before the task started running, so `_run` never saw it
+                    self._run_callback(job.on_cancel(reason))
+        self._dispatch()
+
+    def _run_callback(self, callback: Awaitable[None]):
+        task = asyncio.create_task(callback)
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
+
+    def deadline(self, job: ScheduledJob) -> float:
+        """Return the seconds a job may hold conversion workers, 0 when deadlines are disabled."""
+        if self.configs.JOB_DEADLINE_BASE <= 0:
+            return 0
+        pages = (job.pages_total() if job.pages_total else None) or 0
+        return self.configs.JOB_DEADLINE_BASE + self.configs.JOB_DEADLINE_PER_PAGE * pages
+
+    async def _watch(self):
+        """Cancel running jobs that are past their deadline, until no job is running."""
+        while self._started:
+            await asyncio.sleep(self.configs.JOB_WATCHDOG_INTERVAL)
+            for job_id, (task, job, clock) in list(self._started.items()):
+                deadline = self.deadline(job)
+                if deadline and clock.elapsed() > deadline and task not in self._cancelled:
+                    self.logger.warning(f"Job {job_id} exceeded its deadline of {deadline:.0f} seconds")
+                    self._cancelled[task] = "timeout"
+                    task.cancel()
+
+    def cancel(self, job_id: str, reason: str = "cancelled") -> bool:
+        """Cancel a waiting or running job.
+
+        A waiting job is removed from its lane, a running job's task is
+        cancelled, which kills its conversion. Returns False when no such job
+        is waiting or running.
+        """
+        if job_id in self._started:
+            task = self._started[job_id][0]
+            if task not in self._cancelled:
+                self._cancelled[task] = reason
+                task.cancel()
+            return True
+        for priority, lanes in list(self._lanes.items()):
+            for lane, waiting in list(lanes.items()):
+                job = next((job for job in waiting if job.job_id == job_id), None)
+                if job is None:
+                    continue
+                waiting.remove(job)
+                if not waiting:
+                    del lanes[lane]
+                if not lanes:
+                    del self._lanes[priority]
+                self._queued -= 1
+                self.logger.warning(f"Job {job_id} was cancelled while queued ({reason})")
+                if job.on_cancel is not None:
+                    self._run_callback(job.on_cancel(reason))
+                return True
+        return False
+
+    async def close(self):
+        """Drop waiting jobs and cancel running ones."""
+        if self._queued:
+            self.logger.warning(f"Dropping {self._queued} queued job(s) on shutdown")
+        self._lanes.clear()
+        self._queued = 0
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._running, *self._callbacks, return_exceptions=True)
@@ -0,0 +1,252 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import time
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from settings import Configs
+from models import BatchStatus, JobStage, JobStatus
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+class JobExistsError(Exception):
+    """Raised when a job ID is submitted again while its job is still queued or running."""
+
+    def __init__(self, job_id: str, message: str = "is still queued or running"):
+        super().__init__(f"Job {job_id} {message}")
+        self.job_id = job_id
+
+class _Subscription:
+    """Snapshots waiting for one subscriber, the latest one per job.
+
+    A slow consumer skips intermediate snapshots of a job but always gets
+    its last one, so every stream ends with the final status.
+    """
+
+    def __init__(self):
+        self._pending: "OrderedDict[str, JobStatus]" = OrderedDict()
+        self._ready = asyncio.Event()
+
+    def put(self, job: JobStatus):
+        self._pending[job.job_id] = job
+        self._ready.set()
+
+    def empty(self) -> bool:
+        return not self._pending
+
+    async def get(self) -> JobStatus:
+        while not self._pending:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._pending.popitem(last=False)[1]
+
+class JobStore:
+    """In-memory index of conversion jobs and their progress.
+
+    Jobs are registered when a request is accepted and updated by the
+    background task as it moves through the fetch, convert, store and notify
+    stages. Finished jobs are kept until `JOB_HISTORY_LIMIT` newer jobs have
+    finished. Subscribers receive a snapshot on every update, which backs the
+    server-sent-events progress streams. Jobs that join a conversion shared
+    with other jobs follow the stage and progress of the job running it.
+    """
+
+    def __init__(self, configs: Configs):
+        self.configs = configs
+        self._jobs: Dict[str, JobStatus] = {}
+        self._batches: Dict[str, List[str]] = {}
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._stage_started: Dict[str, float] = {}
+        self._subscribers: Dict[str, Set[_Subscription]] = {}
+        self._conversions: Dict[str, Set[str]] = {}
+        self._leading: Dict[str, str] = {}
+
+    def create(self, job_id: str, file_name: str, batch_id: Optional[str] = None) -> JobStatus:
+        """Register a newly accepted job, replacing any earlier job with the same ID."""
+        self._forget(job_id)
+        job = JobStatus(
+            job_id=job_id,
+            file_name=file_name,
+            batch_id=batch_id,
+            created_at=datetime.now(timezone.utc),
+        )
+        self._jobs[job_id] = job
+        if batch_id:
+            self._batches.setdefault(batch_id, []).append(job_id)
+        self._publish(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        return self._jobs.get(job_id)
+
+    def check_available(self, job_ids: List[str]):
+        """Raise JobExistsError when a job ID is repeated or belongs to an unfinished job.
+
+        Finished jobs may be resubmitted under the same ID, which replaces them.
+        """
+        seen: Set[str] = set()
+        for job_id in job_ids:
+            if job_id in seen:
+                raise JobExistsError(job_id, "appears more than once in the request")
+            job = self._jobs.get(job_id)
+            if job is not None and job.status not in TERMINAL_STATUSES:
+                raise JobExistsError(job_id)
+            seen.add(job_id)
+
+    def has_unfinished(self, file_name: str, exclude: Optional[str] = None) -> bool:
+        """Whether a job for `file_name`, other than `exclude`, is queued or running."""
+        return any(
+            job.file_name == file_name and job.job_id != exclude and job.status not in TERMINAL_STATUSES
+            for job in self._jobs.values()
+        )
+
+    def get_batch(self, batch_id: str) -> Optional[BatchStatus]:
+        job_ids = self._batches.get(batch_id)
+        if job_ids is None:
+            return None
+        jobs = [self._jobs[job_id] for job_id in job_ids if job_id in self._jobs]
+        counts = {status: 0 for status in ("queued", "running", "completed", "failed")}
+        for job in jobs:
+            counts[job.status] += 1
+        return BatchStatus(batch_id=batch_id, total=len(job_ids), jobs=jobs, **counts)
+
+    def set_stage(self, job_id: str, stage: JobStage):
+        """Move a job to `stage`, closing the timing of the previous stage."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        self._close_stage(job)
+        if job.started_at is None:
+            job.started_at = datetime.now(timezone.utc)
+        job.stage = stage
+        job.status = "running"
+        self._stage_started[job_id] = time.monotonic()
+        self._publish(job)
+        for follower_id in self._followers(job_id):
+            self.set_stage(follower_id, stage)
+
+    def set_progress(self, job_id: str, pages_done: int, pages_total: int):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job.pages_done = pages_done
+        job.pages_total = pages_total
+        self._publish(job)
+        for follower_id in self._followers(job_id):
+            self.set_progress(follower_id, pages_done, pages_total)
+
+    def join_conversion(self, key: str, job_id: str):
+        """Register a job waiting for the conversion `key`, catching up with the job already running it."""
+        self._conversions.setdefault(key, set()).add(job_id)
+        leader_id = next((lead for lead, led in self._leading.items() if led == key), None)
+        leader = self._jobs.get(leader_id) if leader_id else None
+        if leader is not None and leader_id != job_id and leader.status == "running":
+            self.set_stage(job_id, leader.stage)
+            if leader.pages_total is not None:
+                self.set_progress(job_id, leader.pages_done, leader.pages_total)
+
+    def lead_conversion(self, key: str, job_id: str):
+        """Mark a job as the one running the conversion `key`, so the jobs that joined it follow its updates."""
+        self._leading[job_id] = key
+
+    def leave_conversion(self, key: str, job_id: str):
+        self._leading.pop(job_id, None)
+        joined = self._conversions.get(key)
+        if joined is not None:
+            joined.discard(job_id)
+            if not joined:
+                del self._conversions[key]
+
+    def finish(self, job_id: str, status: str, message: str):
+        """Mark a job as completed or failed."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        self._close_stage(job)
+        job.stage = JobStage.DONE
+        job.status = status
+        job.message = message
+        job.finished_at = datetime.now(timezone.utc)
+        self._finished[job_id] = None
+        self._publish(job)
+        self._evict()
+
+    async def subscribe(self, job_id: Optional[str] = None, batch_id: Optional[str] = None) -> AsyncIterator[JobStatus]:
+        """Yield job snapshots for a job or a whole batch until every job has finished."""
+        key = job_id or f"batch:{batch_id}"
+        queue = _Subscription()
+        self._subscribers.setdefault(key, set()).add(queue)
+        try:
+            job_ids = [job_id] if job_id else list(self._batches.get(batch_id, []))
+            for current_id in job_ids:
+                if current_id in self._jobs:
+                    yield self._jobs[current_id].model_copy(deep=True)
+            while not (queue.empty() and self._is_done(job_id, batch_id)):
+                yield await queue.get()
+        finally:
+            subscribers = self._subscribers.get(key)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[key]
+
+    def _is_done(self, job_id: Optional[str], batch_id: Optional[str]) -> bool:
+        job_ids = [job_id] if job_id else self._batches.get(batch_id, [])
+        return all(
+            job_id not in self._jobs or self._jobs[job_id].status in TERMINAL_STATUSES
+            for job_id in job_ids
+        )
+
+    def _followers(self, job_id: str) -> List[str]:
+        key = self._leading.get(job_id)
+        if key is None:
+            return []
+        return [
+            follower_id for follower_id in self._conversions.get(key, ())
+            if follower_id != job_id and follower_id in self._jobs
+            and self._jobs[follower_id].status not in TERMINAL_STATUSES
+        ]
+
+    def _close_stage(self, job: JobStatus):
+        started = self._stage_started.pop(job.job_id, None)
+        if started is not None:
+            elapsed = time.monotonic() - started
+            job.timings[job.stage.value] = round(job.timings.get(job.stage.value, 0.0) + elapsed, 4)
+
+    def _publish(self, job: JobStatus):
+        keys = [job.job_id] + ([f"batch:{job.batch_id}"] if job.batch_id else [])
+        for key in keys:
+            for queue in self._subscribers.get(key, ()):
+                queue.put(job.model_copy(deep=True))
+
+    def _forget(self, job_id: str):
+        job = self._jobs.pop(job_id, None)
+        self._finished.pop(job_id, None)
+        self._stage_started.pop(job_id, None)
+        if job is not None and job.batch_id in self._batches:
+            batch = self._batches[job.batch_id]
+            if job_id in batch:
+                batch.remove(job_id)
+            if not batch:
+                del self._batches[job.batch_id]
+
+    def _evict(self):
+        while len(self._finished) > self.configs.JOB_HISTORY_LIMIT:
+            job_id, _ = self._finished.popitem(last=False)
+            self._forget(job_id)
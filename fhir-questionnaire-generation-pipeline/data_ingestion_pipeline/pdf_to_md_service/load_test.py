@@ -0,0 +1,358 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""End-to-end load generator for the PDF to Markdown service.
+
+Starts the service against a local notification sink and, with FTP enabled,
+a local FTP stand-in. Submits jobs to `/convert` and `/convert/batch` at a
+Poisson arrival rate, matches every callback to its job ID and reports
+end-to-end latency percentiles and sustained throughput.
+
+The FTP stand-in needs pyftpdlib, which is not a service dependency:
+    uv run --with pyftpdlib python load_test.py --use-ftp both --rate 1 --duration 120
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import logging
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SEED_PDF = os.path.join(SERVICE_DIR, "..", "..", "assets", "Sample_MRI_Medical_Policy.pdf")
+FTP_USERNAME = "load_test"
+FTP_PASSWORD = "load_test"
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class NotificationSink:
+    """Local callback receiver that records when each job's notification arrives."""
+
+    def __init__(self):
+        self.port = _free_port()
+        self.received: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                sink._record(json.loads(body or b"{}"))
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/notification"
+
+    def _record(self, payload: dict):
+        now = time.perf_counter()
+        # Coalesced batch callbacks carry several notifications
+        notifications = payload.get("notifications", [payload])
+        with self._lock:
+            for notification in notifications:
+                self.received.setdefault(notification.get("job_id"), (now, notification.get("status")))
+
+    def get(self, job_id: str) -> Optional[Tuple[float, str]]:
+        with self._lock:
+            return self.received.get(job_id)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+class FTPStandIn:
+    """Local FTP server serving a temporary directory, backed by pyftpdlib."""
+
+    def __init__(self, root: str):
+        try:
+            from pyftpdlib.authorizers import DummyAuthorizer
+            from pyftpdlib.handlers import FTPHandler
+            from pyftpdlib.servers import ThreadedFTPServer
+        except ImportError:
+            raise SystemExit("The FTP stand-in needs pyftpdlib: uv run --with pyftpdlib python load_test.py ...")
+        self.root = root
+        self.port = _free_port()
+        # A handler stops pyftpdlib from logging every command to stderr
+        ftp_logger = logging.getLogger("pyftpdlib")
+        ftp_logger.addHandler(logging.NullHandler())
+        ftp_logger.setLevel(logging.WARNING)
+        authorizer = DummyAuthorizer()
+        authorizer.add_user(FTP_USERNAME, FTP_PASSWORD, root, perm="elradfmwMT")
+        handler = type("LoadTestFTPHandler", (FTPHandler,), {"authorizer": authorizer})
+        self._server = ThreadedFTPServer(("127.0.0.1", self.port), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"handle_exit": False}, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.close_all()
+
+@dataclass
+class JobRecord:
+    job_id: str
+    submitted_at: float
+    batch_id: Optional[str] = None
+    accepted: bool = False
+    finished_at: Optional[float] = None
+    status: Optional[str] = None
+
+@dataclass
+class RunReport:
+    use_ftp: bool
+    submitted: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    completed: int = 0
+    failed: int = 0
+    unfinished: int = 0
+    latency_seconds: Dict[str, float] = field(default_factory=dict)
+    jobs_per_minute: float = 0.0
+    wall_seconds: float = 0.0
+
+def _percentile(values: List[float], percentile: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percentile / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace, use_ftp: bool):
+        self.args = args
+        self.use_ftp = use_ftp
+        self.rng = random.Random(args.seed)
+        self.workdir = tempfile.mkdtemp(prefix="pdf_to_md_load_")
+        self.pdf_dir = os.path.join(self.workdir, "pdf")
+        os.makedirs(self.pdf_dir)
+        self.service_port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.service_port}"
+        self.sink = NotificationSink()
+        self.ftp = FTPStandIn(self.workdir) if use_ftp else None
+        self.service: Optional[subprocess.Popen] = None
+        self.jobs: Dict[str, JobRecord] = {}
+
+    def _service_env(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        env.update({
+            "SERVICE_PORT": str(self.service_port),
+            "LOCAL_DIR": self.workdir,
+            "USE_FTP": str(self.use_ftp).lower(),
+            "NOTIFICATION_CALLBACK_URL": self.sink.url,
+            # Every job submits the same PDF, so cache hits would hide the conversion cost
+            "CACHE_ENABLED": "false",
+        })
+        if self.ftp is not None:
+            env.update({
+                "FTP_HOST": "127.0.0.1",
+                "FTP_PORT": str(self.ftp.port),
+                "FTP_USERNAME": FTP_USERNAME,
+                "FTP_PASSWORD": FTP_PASSWORD,
+            })
+        for setting in self.args.env:
+            key, _, value = setting.partition("=")
+            env[key] = value
+        return env
+
+    async def _start_service(self, client: httpx.AsyncClient):
+        self.log_path = os.path.join(self.workdir, "service.log")
+        with open(self.log_path, "wb") as log:
+            self.service = subprocess.Popen(
+                [sys.executable, "main.py"], cwd=SERVICE_DIR, env=self._service_env(),
+                stdout=log, stderr=subprocess.STDOUT,
+            )
+        deadline = time.monotonic() + self.args.startup_timeout
+        while time.monotonic() < deadline:
+            if self.service.poll() is not None:
+                raise SystemExit(f"Service exited during startup, see {self.log_path}")
+            try:
+                if (await client.get(f"{self.base_url}/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+        raise SystemExit(f"Service did not become healthy within {self.args.startup_timeout}s, see {self.log_path}")
+
+    def _stage_pdf(self, job_id: str):
+        # The FTP stand-in serves the work directory, so both modes read from <workdir>/pdf
+        shutil.copyfile(self.args.seed_pdf, os.path.join(self.pdf_dir, f"{job_id}.pdf"))
+
+    async def _submit(self, client: httpx.AsyncClient, batch_size: int):
+        job_ids = [f"load-{uuid.uuid4().hex[:12]}" for _ in range(batch_size)]
+        for job_id in job_ids:
+            await asyncio.to_thread(self._stage_pdf, job_id)
+        batch_id = uuid.uuid4().hex if batch_size > 1 else None
+        submitted_at = time.perf_counter()
+        records = [JobRecord(job_id, submitted_at, batch_id) for job_id in job_ids]
+        for record in records:
+            self.jobs[record.job_id] = record
+        requests = [{"job_id": job_id, "file_name": job_id} for job_id in job_ids]
+        try:
+            if batch_id:
+                response = await client.post(f"{self.base_url}/convert/batch", json={"batch_id": batch_id, "requests": requests})
+            else:
+                response = await client.post(f"{self.base_url}/convert", json=requests[0])
+            accepted = response.status_code == 200
+        except httpx.HTTPError:
+            accepted = False
+        for record in records:
+            record.accepted = accepted
+
+    async def _arrivals(self, client: httpx.AsyncClient):
+        """Submit single jobs and batches as a Poisson process until the duration ends."""
+        submissions = []
+        end = time.perf_counter() + self.args.duration
+        while time.perf_counter() < end:
+            is_batch = self.rng.random() < self.args.batch_fraction
+            submissions.append(asyncio.create_task(self._submit(client, self.args.batch_size if is_batch else 1)))
+            await asyncio.sleep(self.rng.expovariate(self.args.rate))
+        await asyncio.gather(*submissions)
+
+    async def _wait_for_callbacks(self):
+        deadline = time.perf_counter() + self.args.drain_timeout
+        pending = [record for record in self.jobs.values() if record.accepted]
+        while pending and time.perf_counter() < deadline:
+            still_pending = []
+            for record in pending:
+                received = self.sink.get(record.job_id)
+                if received is None:
+                    still_pending.append(record)
+                else:
+                    record.finished_at, record.status = received
+            pending = still_pending
+            await asyncio.sleep(0.2)
+
+    def _report(self, started: float) -> RunReport:
+        report = RunReport(use_ftp=self.use_ftp, submitted=len(self.jobs))
+        latencies = []
+        finish_times = []
+        for record in self.jobs.values():
+            if not record.accepted:
+                report.rejected += 1
+                continue
+            report.accepted += 1
+            if record.finished_at is None:
+                report.unfinished += 1
+                continue
+            finish_times.append(record.finished_at)
+            if record.status == "completed":
+                report.completed += 1
+                latencies.append(record.finished_at - record.submitted_at)
+            else:
+                report.failed += 1
+        if latencies:
+            report.latency_seconds = {
+                f"p{percentile}": round(_percentile(latencies, percentile), 3) for percentile in (50, 95, 99)
+            }
+            report.latency_seconds["max"] = round(max(latencies), 3)
+        if finish_times:
+            report.wall_seconds = round(max(finish_times) - started, 3)
+            report.jobs_per_minute = round(60 * report.completed / report.wall_seconds, 2)
+        return report
+
+    async def run(self) -> RunReport:
+        self.sink.start()
+        if self.ftp is not None:
+            self.ftp.start()
+        try:
+            limits = httpx.Limits(max_connections=100)
+            async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+                await self._start_service(client)
+                started = time.perf_counter()
+                await self._arrivals(client)
+                await self._wait_for_callbacks()
+                return self._report(started)
+        finally:
+            if self.service is not None:
+                self.service.terminate()
+                try:
+                    self.service.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    self.service.kill()
+            if self.ftp is not None:
+                self.ftp.stop()
+            self.sink.stop()
+            if self.args.keep_workdir:
+                print(f"Work directory kept at {self.workdir}")
+            else:
+                shutil.rmtree(self.workdir, ignore_errors=True)
+
+def print_report(report: RunReport):
+    mode = "FTP" if report.use_ftp else "local"
+    print(f"[{mode}] submitted {report.submitted}, accepted {report.accepted}, rejected (429) {report.rejected}, "
+          f"completed {report.completed}, failed {report.failed}, no callback {report.unfinished}")
+    if report.latency_seconds:
+        latency = ", ".join(f"{name} {value}s" for name, value in report.latency_seconds.items())
+        print(f"[{mode}] end-to-end latency: {latency}")
+    print(f"[{mode}] sustained throughput: {report.jobs_per_minute} jobs/min over {report.wall_seconds}s")
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Drive the PDF to Markdown service end to end and report latency and throughput.")
+    parser.add_argument("--rate", type=float, default=0.5, help="Submissions per second (Poisson arrivals)")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to keep submitting")
+    parser.add_argument("--batch-fraction", type=float, default=0.2, help="Share of submissions sent to /convert/batch")
+    parser.add_argument("--batch-size", type=int, default=5, help="Jobs per /convert/batch submission")
+    parser.add_argument("--use-ftp", choices=("on", "off", "both"), default="off", help="Storage backend(s) to test")
+    parser.add_argument("--seed-pdf", default=DEFAULT_SEED_PDF, help="PDF submitted for every job")
+    parser.add_argument("--drain-timeout", type=float, default=300, help="Seconds to wait for callbacks after the last submission")
+    parser.add_argument("--startup-timeout", type=float, default=60, help="Seconds to wait for the service to become healthy")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra service setting, repeatable")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for arrivals")
+    parser.add_argument("--output", help="Write the reports as JSON")
+    parser.add_argument("--keep-workdir", action="store_true", help="Keep the work directory and service log")
+    return parser.parse_args()
+
+async def main(args: argparse.Namespace):
+    modes = {"on": [True], "off": [False], "both": [False, True]}[args.use_ftp]
+    reports = []
+    for use_ftp in modes:
+        report = await LoadTest(args, use_ftp).run()
+        print_report(report)
+        reports.append(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([asdict(report) for report in reports], f, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -15,32 +15,152 @@
 # under the License.
 
 import os
+import uuid
 import logging
 import uvicorn
-from typing import Dict
+from typing import AsyncIterator, Dict, Optional
+from contextlib import asynccontextmanager
 from settings import Configs
-from models import ConvertRequest, BatchConvertRequest
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from models import ConvertRequest, BatchConvertRequest, BatchStatus, JobStatus
+from fastapi import FastAPI, HTTPException
+from pydantic import ValidationError
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
-from utils import process_pdf_file
+from utils import cancel_pdf_file, process_pdf_file
+from ftp_utils import close_ftp_pool
+from notification_utils import close_notification_dispatcher
+from job_store import TERMINAL_STATUSES, JobExistsError, JobStore
+from conversion_cache import ConversionCache
+from conversion_engine import ConversionEngine
+from md_compression import get_codec
+from image_assets import IMAGE_FORMATS
+from job_scheduler import JobScheduler, QueueFullError, ScheduledJob
+from folder_watcher import FolderWatcher
+from metrics import (
+    CONTENT_TYPE, CONVERSIONS_WAITING_FOR_MEMORY, JOBS_IN_FLIGHT, JOBS_QUEUED, MEMORY_RESERVED, REGISTRY
+)
 
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 configs = Configs()
+engine = ConversionEngine(configs, logger)
+jobs = JobStore(configs)
+cache = ConversionCache(configs, logger)
+scheduler = JobScheduler(configs, logger)
+JOBS_QUEUED.set_function(lambda: scheduler.queued)
+JOBS_IN_FLIGHT.set_function(lambda: scheduler.running)
+MEMORY_RESERVED.set_function(lambda: engine.memory_budget.reserved)
+CONVERSIONS_WAITING_FOR_MEMORY.set_function(lambda: engine.memory_budget.waiting)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the conversion worker pool with the app and stop it on shutdown.
+
+    Workers warm up in the background, so the API accepts requests right
+    away; `/ready` reports when conversions can start without waiting.
+    """
+    # Fail on startup rather than on the first store when the compression setting is unusable
+    get_codec(configs.MD_COMPRESSION)
+    if configs.IMAGE_FORMAT not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported IMAGE_FORMAT '{configs.IMAGE_FORMAT}', use one of: {', '.join(IMAGE_FORMATS)}")
+    cache.load()
+    engine.start()
+    watcher = None
+    if configs.WATCH_FOLDER_ENABLED:
+        if configs.USE_FTP:
+            logger.warning("WATCH_FOLDER_ENABLED only applies to local storage, not watching")
+        else:
+            watcher = FolderWatcher(configs, logger, _submit_watched)
+            watcher.start()
+    yield
+    if watcher is not None:
+        watcher.close()
+    await scheduler.close()
+    await close_notification_dispatcher()
+    await close_ftp_pool()
+    engine.shutdown()
+
+def _admit(lane: str, requests: list, batch_id: Optional[str] = None):
+    """Admit conversion requests into one scheduler lane.
+
+    Raises JobExistsError when a job ID is still in use and QueueFullError
+    when they don't fit in the queue.
+    """
+    jobs.check_available([req.job_id.strip() for req in requests])
+    scheduled = [
+        ScheduledJob(
+            job_id=req.job_id.strip(),
+            run=lambda req=req: process_pdf_file(
+                req.job_id.strip(),
+                req.file_name.strip(),
+                logger,
+                configs,
+                engine,
+                cache,
+                jobs,
+                req.parallel_pages,
+                req.profile,
+                req.profiling,
+                req.extract_images
+            ),
+            priority=req.priority,
+            pages_total=lambda job_id=req.job_id.strip(): getattr(jobs.get(job_id), "pages_total", None),
+            on_cancel=lambda reason, req=req: cancel_pdf_file(
+                req.job_id.strip(), req.file_name.strip(), reason, logger, configs, jobs
+            ),
+        )
+        for req in requests
+    ]
+    scheduler.submit(lane, scheduled)
+    # Admitted jobs only start once the caller yields to the event loop
+    for req in requests:
+        jobs.create(req.job_id.strip(), req.file_name.strip(), batch_id)
+
+def _schedule(lane: str, requests: list, batch_id: Optional[str] = None):
+    """Admit conversion requests into one scheduler lane, or reject them all with HTTP 409 or 429."""
+    try:
+        _admit(lane, requests, batch_id)
+    except JobExistsError as e:
+        logger.warning(f"Rejecting {len(requests)} job(s): {e}")
+        raise HTTPException(status_code=409, detail=str(e))
+    except QueueFullError as e:
+        logger.warning(f"Rejecting {len(requests)} job(s): {e}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def _submit_watched(file_name: str) -> Optional[int]:
+    """Start a job for a PDF dropped into the watch folder.
+
+    Returns the seconds to wait before retrying when the queue is full.
+    Watched files share one lane, so a folder full of PDFs doesn't starve
+    API callers.
+    """
+    if jobs.has_unfinished(file_name):
+        logger.info(f"Watched file {file_name}.pdf already has a job, skipping")
+        return None
+    try:
+        request = ConvertRequest(job_id=f"watch-{uuid.uuid4().hex}", file_name=file_name)
+    except ValidationError:
+        logger.warning(f"Ignoring watched file {file_name}.pdf, its name is not a valid file_name")
+        return None
+    try:
+        _admit("watch", [request])
+    except QueueFullError as e:
+        logger.warning(f"Deferring watched file {file_name}.pdf: {e}")
+        return e.retry_after
+    logger.info(f"Received watched file {file_name}.pdf - job_id: {request.job_id}")
+    return None
 
 app = FastAPI(
     title="PDF to Markdown Converter Service",
     description="A service that converts PDF files to Markdown format and stores them in a database",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 @app.post("/convert", response_model=Dict[str, str])
-async def convert_pdf_to_md(
-    request: ConvertRequest,
-    background_tasks: BackgroundTasks
-) -> Dict[str, str]:
+async def convert_pdf_to_md(request: ConvertRequest) -> Dict[str, str]:
     """
     Give the job ID and filename, process the PDF to Markdown conversion in the background.
     """
@@ -53,14 +173,8 @@ async def convert_pdf_to_md(
             raise HTTPException(status_code=400, detail="file_name is required")
         
         logger.info(f"Received conversion request - job_id: {request.job_id}, file_name: {request.file_name}")
-        # Start background processing
-        background_tasks.add_task(
-            process_pdf_file, 
-            request.job_id.strip(),
-            request.file_name.strip(),
-            logger,
-            configs
-        )
+        # Each single request gets its own lane, so it is never queued behind a whole batch
+        _schedule(f"job:{request.job_id.strip()}", [request])
         return {
             "job_id": request.job_id,
             "filename": request.file_name,
@@ -73,13 +187,12 @@ async def convert_pdf_to_md(
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
 @app.post("/convert/batch", response_model=Dict[str, str])
-async def batch_convert_pdf_to_md(
-    request: BatchConvertRequest,
-    background_tasks: BackgroundTasks
-) -> Dict[str, str]:
+async def batch_convert_pdf_to_md(request: BatchConvertRequest) -> Dict[str, str]:
     """
     Batch convert multiple PDF files to Markdown format.
-    Accepts a list of conversion requests and processes them all in background.
+    Accepts a list of conversion requests and queues them in background as one
+    scheduler lane. The whole batch is rejected with HTTP 429 when it does not
+    fit in the queue.
     """
     if not request.requests:
         raise HTTPException(status_code=400, detail="No conversion requests provided")
@@ -90,20 +203,75 @@ async def batch_convert_pdf_to_md(
         if not req.file_name or not req.file_name.strip():
             raise HTTPException(status_code=400, detail="file_name is required for all requests")
 
-        logger.info(f"Queuing batch conversion - job_id: {req.job_id}, file_name: {req.file_name}")
-        background_tasks.add_task(
-            process_pdf_file,
-            req.job_id.strip(),
-            req.file_name.strip(),
-            logger,
-            configs
-        )
+    batch_id = (request.batch_id or "").strip() or uuid.uuid4().hex
+    logger.info(f"Queuing batch {batch_id} with {len(request.requests)} conversion(s)")
+    _schedule(f"batch:{batch_id}", request.requests, batch_id)
 
     return {
+        "batch_id": batch_id,
         "status": "started",
         "message": f"Batch processing started for {len(request.requests)} file(s)"
     }
 
+async def _progress_events(updates: AsyncIterator[JobStatus]) -> AsyncIterator[str]:
+    """Format job snapshots as server-sent events."""
+    async for job in updates:
+        yield f"event: progress\ndata: {job.model_dump_json()}\n\n"
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job_status(job_id: str) -> JobStatus:
+    """Return the current stage, page progress and stage timings of a job."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.delete("/jobs/{job_id}", status_code=202, response_model=Dict[str, str])
+async def cancel_job(job_id: str) -> Dict[str, str]:
+    """Cancel a queued or running job.
+
+    A running conversion is killed. The job then fails with the message
+    "cancelled", which is also sent to the notification callback.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if job.status in TERMINAL_STATUSES or not scheduler.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} has already finished")
+    logger.info(f"Cancelling job {job_id}")
+    return {
+        "job_id": job_id,
+        "status": "cancelling",
+        "message": "Job cancellation requested."
+    }
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_status(job_id: str) -> StreamingResponse:
+    """Stream progress updates for a job as server-sent events until it finishes."""
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return StreamingResponse(_progress_events(jobs.subscribe(job_id=job_id)), media_type="text/event-stream")
+
+@app.get("/batches/{batch_id}", response_model=BatchStatus)
+async def get_batch_status(batch_id: str) -> BatchStatus:
+    """Return the status of every job in a batch."""
+    batch = jobs.get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+    return batch
+
+@app.get("/batches/{batch_id}/events")
+async def stream_batch_status(batch_id: str) -> StreamingResponse:
+    """Stream progress updates for every job in a batch until all of them finish."""
+    if jobs.get_batch(batch_id) is None:
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+    return StreamingResponse(_progress_events(jobs.subscribe(batch_id=batch_id)), media_type="text/event-stream")
+
+@app.get("/metrics")
+async def get_metrics() -> Response:
+    """Expose stage latencies, queue depth and throughput counters in Prometheus text format."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/health")
 async def health_check() -> Dict[str, str]:
     """Health check endpoint."""
@@ -112,6 +280,18 @@ async def health_check() -> Dict[str, str]:
         "service": "PDF to Markdown Converter"
     }
 
+@app.get("/ready")
+async def readiness_check() -> JSONResponse:
+    """Readiness endpoint, returns 503 until a conversion worker has warmed up."""
+    ready = engine.ready
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "starting",
+            "workers_ready": f"{engine.ready_workers}/{engine.max_workers}"
+        }
+    )
+
 if __name__ == "__main__":
     port = int(os.environ.get("SERVICE_PORT", "8000"))
     uvicorn.run(
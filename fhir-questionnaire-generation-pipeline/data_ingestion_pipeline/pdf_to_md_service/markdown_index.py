@@ -0,0 +1,141 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import re
+import json
+import hashlib
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".index.json"
+
+HEADING = re.compile(r"(#{1,6}) +(.*?)\s*$")
+TABLE_SEPARATOR = re.compile(r"\|(\s*:?-+:?\s*\|)+\s*$")
+
+@dataclass
+class PageSpan:
+    page: int  # 1-based page number
+    start: int  # Byte offset of the page's Markdown
+    end: int
+
+@dataclass
+class Heading:
+    level: int
+    title: str
+    page: int
+    start: int  # Byte offset of the heading line
+    end: int  # Byte offset where the section ends, at the next heading of the same or a higher level
+    parent: Optional[int] = None  # Position of the enclosing heading in `headings`
+
+@dataclass
+class TableSpan:
+    page: int
+    start: int
+    end: int
+    rows: int  # Rows including the header row, excluding the separator row
+
+@dataclass
+class MarkdownIndex:
+    """Structure of a Markdown file, stored next to it for downstream chunking.
+
+    All offsets are byte offsets into the UTF-8 Markdown, with `end`
+    exclusive, so a reader can seek straight to a page, section or table.
+    `markdown_bytes` and `markdown_sha256` identify the Markdown the index
+    was built from. `encoding` is the content encoding the offsets refer
+    to, always `identity`: Markdown stored compressed has to be
+    decompressed before seeking.
+    """
+
+    markdown_bytes: int
+    markdown_sha256: str
+    pages: List[PageSpan] = field(default_factory=list)
+    headings: List[Heading] = field(default_factory=list)
+    tables: List[TableSpan] = field(default_factory=list)
+    encoding: str = "identity"
+    version: int = INDEX_VERSION
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False, separators=(",", ":"))
+
+def index_path(md_path: str) -> str:
+    """Return the path of the index stored next to a Markdown file."""
+    return os.path.splitext(md_path)[0] + INDEX_SUFFIX
+
+def _heading_title(text: str) -> str:
+    # Headings are usually emphasised as a whole, e.g. "**Coverage Rationale**"
+    return text.strip().strip("*_").strip()
+
+def build_index(md_path: str, page_sizes: List[int]) -> MarkdownIndex:
+    """Index the headings, tables and pages of a Markdown file, reading it line by line.
+
+    `page_sizes` are the sizes in bytes of each page's Markdown, in page
+    order. Lines inside fenced code blocks are not treated as structure.
+    """
+    pages, offset = [], 0
+    for number, size in enumerate(page_sizes, start=1):
+        pages.append(PageSpan(number, offset, offset + size))
+        offset += size
+
+    headings: List[Heading] = []
+    tables: List[TableSpan] = []
+    open_headings: List[int] = []  # Positions of the headings enclosing the current line
+    table: Optional[TableSpan] = None
+    in_code_block = False
+    page_index = 0
+    digest = hashlib.sha256()
+    offset = 0
+
+    with open(md_path, "rb") as f:
+        for raw_line in f:
+            digest.update(raw_line)
+            start, offset = offset, offset + len(raw_line)
+            while page_index < len(pages) - 1 and start >= pages[page_index].end:
+                page_index += 1
+            page = pages[page_index].page if pages else 1
+            line = raw_line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+            if line.startswith("```"):
+                in_code_block = not in_code_block
+            if line.startswith("|") and not in_code_block:
+                if table is None:
+                    table = TableSpan(page, start, offset, 0)
+                    tables.append(table)
+                table.end = offset
+                if not TABLE_SEPARATOR.match(line):
+                    table.rows += 1
+                continue
+            table = None
+            match = None if in_code_block else HEADING.match(line)
+            if match is None:
+                continue
+            level = len(match.group(1))
+            while open_headings and headings[open_headings[-1]].level >= level:
+                headings[open_headings.pop()].end = start
+            parent = open_headings[-1] if open_headings else None
+            headings.append(Heading(level, _heading_title(match.group(2)), page, start, start, parent))
+            open_headings.append(len(headings) - 1)
+
+    for position in open_headings:
+        headings[position].end = offset
+    return MarkdownIndex(offset, digest.hexdigest(), pages, headings, tables)
+
+def write_index(md_path: str, page_sizes: List[int]):
+    """Build the index of a Markdown file and write it next to the file."""
+    index = build_index(md_path, page_sizes)
+    with open(index_path(md_path), "w", encoding="utf-8") as f:
+        f.write(index.to_json())
@@ -0,0 +1,139 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Compressed storage of Markdown files.
+
+The content encoding of a stored file is marked by its name, `<name>.md.gz`
+for gzip and `<name>.md.zst` for zstd, so readers can tell it apart from
+plain `<name>.md`. `open_markdown` reads any of them as plain Markdown,
+decompressing as it streams.
+"""
+
+import io
+import zlib
+import gzip
+from typing import BinaryIO, List, Optional, Protocol
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+    def flush(self) -> bytes: ...
+
+class Decompressor(Protocol):
+    def decompress(self, data: bytes) -> bytes: ...
+
+def _zstandard():
+    # zstd support is optional, so the package is only needed when it is used
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("MD_COMPRESSION=zstd needs the zstandard package") from e
+    return zstandard
+
+class Codec:
+    """A content encoding for stored Markdown, applied to streams chunk by chunk."""
+
+    def __init__(self, name: str, suffix: str, default_level: int):
+        self.name = name
+        self.suffix = suffix
+        self.default_level = default_level
+
+    def compressor(self, level: int = 0) -> Compressor:
+        level = level or self.default_level
+        if self.name == "gzip":
+            # wbits 31 writes a gzip header and trailer
+            return zlib.compressobj(level, zlib.DEFLATED, 31)
+        return _zstandard().ZstdCompressor(level=level).compressobj()
+
+    def decompressor(self) -> Decompressor:
+        if self.name == "gzip":
+            return zlib.decompressobj(31)
+        return _zstandard().ZstdDecompressor().decompressobj()
+
+    def open(self, path: str) -> BinaryIO:
+        """Open a compressed file as a stream of its decompressed content."""
+        if self.name == "gzip":
+            return gzip.open(path, "rb")
+        return _zstandard().ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+
+CODECS = {
+    "gzip": Codec("gzip", ".gz", 6),
+    "zstd": Codec("zstd", ".zst", 3),
+}
+
+def get_codec(name: str) -> Optional[Codec]:
+    """Return the codec configured by MD_COMPRESSION, or None for plain text.
+
+    Raises ValueError for an unknown encoding and ImportError when zstd is
+    configured without the zstandard package.
+    """
+    if not name or name == "none":
+        return None
+    if name not in CODECS:
+        raise ValueError(f"Unsupported MD_COMPRESSION '{name}', use one of: none, {', '.join(CODECS)}")
+    codec = CODECS[name]
+    if codec.name == "zstd":
+        _zstandard()
+    return codec
+
+def stored_suffixes() -> List[str]:
+    """Return the file name suffixes a stored Markdown file can have, plain first."""
+    return [""] + [codec.suffix for codec in CODECS.values()]
+
+def codec_for(path: str) -> Optional[Codec]:
+    """Return the codec a stored file was written with, from its name."""
+    for codec in CODECS.values():
+        if path.endswith(codec.suffix):
+            return codec
+    return None
+
+class CompressingReader(io.RawIOBase):
+    """A readable stream of the compressed content of another stream.
+
+    Lets uploads such as FTP STOR compress while they read, without holding
+    the compressed file in memory or on disk.
+    """
+
+    def __init__(self, source: BinaryIO, compressor: Compressor, chunk_size: int = 64 * 1024):
+        self.source = source
+        self.compressor = compressor
+        self.chunk_size = chunk_size
+        self.bytes_out = 0
+        self._buffer = b""
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            chunk = self.source.read(self.chunk_size)
+            if chunk:
+                self._buffer += self.compressor.compress(chunk)
+            else:
+                self._buffer += self.compressor.flush()
+                self._eof = True
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        self.bytes_out += len(data)
+        return data
+
+def open_markdown(path: str) -> BinaryIO:
+    """Open a stored Markdown file for reading as plain UTF-8 bytes, whatever its content encoding."""
+    codec = codec_for(path)
+    if codec is None:
+        return open(path, "rb")
+    return codec.open(path)
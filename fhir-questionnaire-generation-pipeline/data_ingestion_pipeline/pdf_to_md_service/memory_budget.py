@@ -0,0 +1,101 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Tuple
+
+from settings import Configs
+
+MB = 1024 * 1024
+
+def estimate_memory(configs: Configs, file_size: int, page_count: int, tasks: int = 1) -> int:
+    """Estimate the memory in bytes a conversion needs on top of its warm workers.
+
+    Every worker task running for the conversion opens the whole PDF and
+    loads the layout model's working set, and each converted page adds its
+    text, layout and Markdown. `tasks` is the number of worker tasks that
+    run at the same time.
+    """
+    per_task = configs.MEMORY_ESTIMATE_BASE_MB * MB + configs.MEMORY_ESTIMATE_FILE_FACTOR * file_size
+    return int(tasks * per_task + configs.MEMORY_ESTIMATE_PER_PAGE_MB * MB * page_count)
+
+class MemoryBudget:
+    """Admits memory reservations while their sum fits in `limit` bytes.
+
+    Reservations are granted in arrival order, so a large conversion is not
+    overtaken forever by small ones. A reservation larger than the whole
+    budget is granted once nothing else is reserved, so oversized documents
+    run alone instead of never. A limit of 0 admits everything.
+    """
+
+    def __init__(self, limit: int, logger: logging.Logger):
+        self.limit = limit
+        self.logger = logger
+        self.reserved = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _fits(self, nbytes: int) -> bool:
+        return self.reserved == 0 or self.reserved + nbytes <= self.limit
+
+    def _wake(self):
+        while self._waiters and self._fits(self._waiters[0][0]):
+            nbytes, future = self._waiters.popleft()
+            self.reserved += nbytes
+            future.set_result(None)
+
+    def _release(self, nbytes: int):
+        self.reserved -= nbytes
+        self._wake()
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int, label: str) -> AsyncIterator[None]:
+        """Hold `nbytes` of the budget while the block runs, waiting until they fit."""
+        if self.limit <= 0:
+            yield
+            return
+        if nbytes > self.limit:
+            self.logger.warning(
+                f"{label} is estimated to need {nbytes // MB} MB, more than the memory budget of {self.limit // MB} MB, it will run alone"
+            )
+        if not self._waiters and self._fits(nbytes):
+            self.reserved += nbytes
+        else:
+            self.logger.info(
+                f"{label} waits for {nbytes // MB} MB of the memory budget, {self.reserved // MB} of {self.limit // MB} MB are reserved"
+            )
+            entry = (nbytes, asyncio.get_running_loop().create_future())
+            self._waiters.append(entry)
+            try:
+                await entry[1]
+            except asyncio.CancelledError:
+                if entry[1].done() and not entry[1].cancelled():
+                    # Granted just before the cancellation arrived
+                    self._release(nbytes)
+                else:
+                    self._waiters.remove(entry)
+                    self._wake()
+                raise
+        try:
+            yield
+        finally:
+            self._release(nbytes)
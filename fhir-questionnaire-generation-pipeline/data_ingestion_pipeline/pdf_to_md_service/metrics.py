@@ -0,0 +1,217 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import time
+import bisect
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from fast storage operations to long conversions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+class Metric:
+    """A named metric family with optional labels, rendered in Prometheus text format.
+
+    Metrics are only updated from the event loop, so recording a sample is a
+    dictionary update without locking.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra is not None:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{self._labels(key)} {_format_value(value)}" for key, value in self._values.items()]
+
+class Gauge(Metric):
+    """A gauge whose value is read from a callback when the metrics are scraped."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._function: Callable[[], float] = lambda: 0
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {_format_value(self._function())}"]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: a count for each bucket plus +Inf, and the sum of observations
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Observe the duration of the block, including when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "pdf_to_md_stage_duration_seconds",
+    "Time spent in each processing stage.",
+    ("stage",),
+))
+JOBS_QUEUED = REGISTRY.register(Gauge("pdf_to_md_jobs_queued", "Jobs waiting for a scheduler slot."))
+JOBS_IN_FLIGHT = REGISTRY.register(Gauge("pdf_to_md_jobs_in_flight", "Jobs currently being processed."))
+JOBS_FINISHED = REGISTRY.register(Counter(
+    "pdf_to_md_jobs_finished_total",
+    "Finished jobs by outcome.",
+    ("status",),
+))
+JOBS_CANCELLED = REGISTRY.register(Counter(
+    "pdf_to_md_jobs_cancelled_total",
+    "Jobs cancelled through the API or by the deadline watchdog, by reason.",
+    ("reason",),
+))
+PAGES_CONVERTED = REGISTRY.register(Counter(
+    "pdf_to_md_pages_converted_total",
+    "Pages converted to Markdown, excluding cache hits. rate() gives pages per second.",
+))
+CONVERSIONS = REGISTRY.register(Counter(
+    "pdf_to_md_conversions_total",
+    "Conversions by the profile they ran with, after auto profile selection.",
+    ("profile",),
+))
+PAGES_REUSED = REGISTRY.register(Counter(
+    "pdf_to_md_pages_reused_total",
+    "Unchanged pages of revised PDFs copied from their previous Markdown instead of being converted.",
+))
+MEMORY_RESERVED = REGISTRY.register(Gauge(
+    "pdf_to_md_memory_reserved_bytes",
+    "Estimated memory of the conversions admitted by the memory budget.",
+))
+CONVERSIONS_WAITING_FOR_MEMORY = REGISTRY.register(Gauge(
+    "pdf_to_md_conversions_waiting_for_memory",
+    "Conversions waiting for their estimated memory to fit in the budget.",
+))
+WORKERS_RECYCLED = REGISTRY.register(Counter(
+    "pdf_to_md_workers_recycled_total",
+    "Conversion worker processes replaced after too many tasks or too much resident memory, by reason.",
+    ("reason",),
+))
+BYTES_TRANSFERRED = REGISTRY.register(Counter(
+    "pdf_to_md_bytes_transferred_total",
+    "Bytes read from and written to storage.",
+    ("backend", "direction"),
+))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "pdf_to_md_cache_lookups_total",
+    "Conversion cache lookups by result.",
+    ("result",),
+))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    "pdf_to_md_cache_hit_ratio",
+    "Share of conversion cache lookups that were hits since start.",
+))
+
+def _cache_hit_ratio() -> float:
+    hits = CACHE_LOOKUPS.value(result="hit")
+    lookups = hits + CACHE_LOOKUPS.value(result="miss")
+    return hits / lookups if lookups else 0.0
+
+CACHE_HIT_RATIO.set_function(_cache_hit_ratio)
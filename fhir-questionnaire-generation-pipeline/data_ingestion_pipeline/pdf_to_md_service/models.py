@@ -16,13 +16,31 @@
 
 import os
 import re
-from typing import List
+from enum import Enum
+from datetime import datetime
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, field_validator
 
+class ConversionProfile(str, Enum):
+    FAST = "fast"  # Text and headings only, no table detection, images or OCR
+    TABLES = "tables"  # Layout analysis with tables, without OCR
+    FULL = "full"  # Layout analysis with tables and OCR
+    AUTO = "auto"  # Sample the first pages and pick the cheapest profile that keeps their structure
+
 class ConvertRequest(BaseModel):
     job_id: str
     file_name: str
+    # Force (True) or disable (False) page-range parallel conversion, None uses PAGE_SPLIT_THRESHOLD
+    parallel_pages: Optional[bool] = None
+    # Jobs with a higher priority are started first, equal priorities share slots fairly
+    priority: int = 0
+    # Conversion profile, None uses DEFAULT_CONVERSION_PROFILE
+    profile: Optional[ConversionProfile] = None
+    # Profile the conversion and store a flame graph and per-page timings next to the Markdown
+    profiling: bool = False
+    # Store images in md/assets and link them from the Markdown, None uses EXTRACT_IMAGES
+    extract_images: Optional[bool] = None
 
     @field_validator("file_name")
     @classmethod
@@ -36,3 +54,37 @@ class ConvertRequest(BaseModel):
 
 class BatchConvertRequest(BaseModel):
     requests: List[ConvertRequest]
+    # Optional caller supplied batch ID, generated when omitted
+    batch_id: Optional[str] = None
+
+class JobStage(str, Enum):
+    QUEUED = "queued"
+    FETCH = "fetch"
+    CONVERT = "convert"
+    STORE = "store"
+    NOTIFY = "notify"
+    DONE = "done"
+
+class JobStatus(BaseModel):
+    job_id: str
+    file_name: str
+    batch_id: Optional[str] = None
+    stage: JobStage = JobStage.QUEUED
+    status: str = "queued"  # queued, running, completed or failed
+    message: Optional[str] = None
+    pages_done: int = 0
+    pages_total: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Seconds spent in each stage that has been entered so far
+    timings: Dict[str, float] = {}
+
+class BatchStatus(BaseModel):
+    batch_id: str
+    total: int
+    queued: int
+    running: int
+    completed: int
+    failed: int
+    jobs: List[JobStatus]
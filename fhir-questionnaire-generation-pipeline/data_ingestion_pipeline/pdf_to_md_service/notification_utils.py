@@ -0,0 +1,179 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import random
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+import httpx
+from settings import Configs
+from metrics import STAGE_DURATION
+
+# Statuses worth retrying; any other response is treated as delivered or rejected
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+@dataclass
+class Notification:
+    url: str
+    payload: Dict[str, Any]
+    job_ids: List[str] = field(default_factory=list)
+
+class NotificationDispatcher:
+    """Delivers job callbacks from a bounded outbox through one pooled HTTP client.
+
+    Jobs enqueue their notification and move on; a fixed set of sender tasks
+    posts them to `NOTIFICATION_CALLBACK_URL`, retrying failed deliveries with
+    exponential backoff and full jitter. When `NOTIFICATION_BATCH_CALLBACK_URL`
+    and a coalescing window are set, notifications of the same batch that
+    arrive within the window are sent there as a single callback. Every job
+    notification holds an outbox slot from enqueue until it is delivered, so
+    ones waiting to be coalesced count against `NOTIFICATION_QUEUE_SIZE` too.
+    Pending notifications are drained on shutdown.
+    """
+
+    def __init__(self, configs: Configs, logger: logging.Logger):
+        self.configs = configs
+        self.logger = logger
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(max(1, configs.NOTIFICATION_QUEUE_SIZE))
+        self._client: Optional[httpx.AsyncClient] = None
+        self._senders: List[asyncio.Task] = []
+        self._pending_batches: Dict[str, List[Dict[str, Any]]] = {}
+        self._batch_timers: Dict[str, asyncio.TimerHandle] = {}
+        self._flush_tasks: Set[asyncio.Task] = set()
+
+    def start(self):
+        """Create the shared HTTP client and the sender tasks."""
+        if self._client is not None:
+            return
+        concurrency = max(1, self.configs.NOTIFICATION_CONCURRENCY)
+        self._client = httpx.AsyncClient(
+            timeout=self.configs.NOTIFICATION_TIMEOUT,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+        self._senders = [asyncio.create_task(self._sender()) for _ in range(concurrency)]
+
+    async def close(self):
+        """Deliver queued notifications, then stop the senders and the client."""
+        for batch_id in list(self._pending_batches):
+            await self._flush_batch(batch_id)
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.configs.NOTIFICATION_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Dropping {self._queue.qsize()} undelivered notification(s) on shutdown")
+        for sender in self._senders:
+            sender.cancel()
+        await asyncio.gather(*self._senders, return_exceptions=True)
+        self._senders = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def enqueue(self, payload: Dict[str, Any], batch_id: Optional[str] = None):
+        """Queue a notification for delivery.
+
+        Waits only when the outbox is full, which applies backpressure to jobs
+        while the callback receiver is unavailable.
+        """
+        await self._slots.acquire()
+        if batch_id and self.configs.NOTIFICATION_BATCH_CALLBACK_URL and self.configs.NOTIFICATION_COALESCE_WINDOW > 0:
+            self._pending_batches.setdefault(batch_id, []).append(payload)
+            if batch_id not in self._batch_timers:
+                loop = asyncio.get_running_loop()
+                self._batch_timers[batch_id] = loop.call_later(
+                    self.configs.NOTIFICATION_COALESCE_WINDOW, self._schedule_flush, batch_id
+                )
+            return
+        await self._queue.put(Notification(self.configs.NOTIFICATION_CALLBACK_URL, payload, [payload["job_id"]]))
+
+    def _schedule_flush(self, batch_id: str):
+        task = asyncio.create_task(self._flush_batch(batch_id))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush_batch(self, batch_id: str):
+        timer = self._batch_timers.pop(batch_id, None)
+        if timer is not None:
+            timer.cancel()
+        payloads = self._pending_batches.pop(batch_id, [])
+        if not payloads:
+            return
+        if len(payloads) == 1:
+            notification = Notification(self.configs.NOTIFICATION_CALLBACK_URL, payloads[0], [payloads[0]["job_id"]])
+        else:
+            notification = Notification(
+                self.configs.NOTIFICATION_BATCH_CALLBACK_URL,
+                {"batch_id": batch_id, "notifications": payloads},
+                [payload["job_id"] for payload in payloads],
+            )
+        await self._queue.put(notification)
+
+    async def _sender(self):
+        while True:
+            notification = await self._queue.get()
+            try:
+                with STAGE_DURATION.time(stage="deliver_notification"):
+                    await self._deliver(notification)
+            except Exception as e:
+                self.logger.error(f"Failed to send notification for job(s) {notification.job_ids}: {e}")
+            finally:
+                for _ in notification.job_ids:
+                    self._slots.release()
+                self._queue.task_done()
+
+    async def _deliver(self, notification: Notification):
+        job_ids = ", ".join(notification.job_ids)
+        max_retries = self.configs.NOTIFICATION_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            try:
+                response = await self._client.post(notification.url, json=notification.payload)
+                if response.is_success:
+                    self.logger.info(f"Notification sent successfully for job {job_ids}")
+                    return
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    self.logger.warning(f"Notification failed with status {response.status_code} for job {job_ids}")
+                    return
+                reason = f"status {response.status_code}"
+            except httpx.HTTPError as e:
+                reason = str(e) or type(e).__name__
+            if attempt == max_retries:
+                break
+            delay = random.uniform(0, min(
+                self.configs.NOTIFICATION_RETRY_MAX_DELAY,
+                self.configs.NOTIFICATION_RETRY_BASE_DELAY * (2 ** attempt),
+            ))
+            self.logger.warning(f"Notification for job {job_ids} failed ({reason}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+        self.logger.error(f"Giving up on notification for job {job_ids} after {max_retries + 1} attempt(s): {reason}")
+
+_dispatcher: Optional[NotificationDispatcher] = None
+
+def get_notification_dispatcher(configs: Configs, logger: logging.Logger) -> NotificationDispatcher:
+    """Return the process wide notification dispatcher, starting it on first use."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = NotificationDispatcher(configs, logger)
+        _dispatcher.start()
+    return _dispatcher
+
+async def close_notification_dispatcher():
+    """Drain and close the notification dispatcher if it was started."""
+    global _dispatcher
+    if _dispatcher is not None:
+        await _dispatcher.close()
+        _dispatcher = None
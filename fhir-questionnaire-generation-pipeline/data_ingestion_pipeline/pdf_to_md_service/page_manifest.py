@@ -0,0 +1,112 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import json
+import hashlib
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import pymupdf
+
+MANIFEST_VERSION = 2
+MANIFEST_SUFFIX = ".pages.json"
+
+@dataclass
+class PageRecord:
+    fingerprint: str
+    size: int  # Bytes of the page's Markdown in the output
+
+@dataclass
+class PageManifest:
+    """Per-page fingerprints and Markdown sizes of a converted document.
+
+    Stored next to the Markdown, so a revised PDF can reuse the Markdown of
+    pages whose content did not change. The Markdown of page `i` starts at
+    the sum of the sizes of the pages before it.
+    """
+
+    profile: str
+    converter: str
+    markdown_sha256: str
+    pages: List[PageRecord]
+    version: int = MANIFEST_VERSION
+
+    def offsets(self) -> List[int]:
+        offsets, offset = [], 0
+        for page in self.pages:
+            offsets.append(offset)
+            offset += page.size
+        return offsets
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, content: str) -> Optional["PageManifest"]:
+        """Parse a manifest, returning None for invalid content or another manifest version."""
+        try:
+            data = json.loads(content)
+            if data.get("version") != MANIFEST_VERSION:
+                return None
+            data["pages"] = [PageRecord(**page) for page in data["pages"]]
+            return cls(**data)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return None
+
+@dataclass
+class PreviousOutput:
+    """Markdown stored by an earlier conversion of a file, described by its manifest."""
+
+    manifest: PageManifest
+    # Copies the stored Markdown to the given path, returns False when it could not be read
+    fetch: Callable[[str], Awaitable[bool]]
+
+def manifest_path(md_path: str) -> str:
+    """Return the path of the manifest stored next to a Markdown file."""
+    return os.path.splitext(md_path)[0] + MANIFEST_SUFFIX
+
+def fingerprint_pages(doc: "pymupdf.Document") -> List[str]:
+    """Fingerprint every page from its content stream and the resources it uses.
+
+    Resources are hashed by name and stream content rather than by object
+    number, so unchanged pages keep their fingerprint when a revision is
+    written out with renumbered objects.
+    """
+    digests: Dict[int, bytes] = {}
+
+    def digest(xref: int) -> bytes:
+        if xref <= 0:
+            return b""
+        if xref not in digests:
+            content = doc.xref_stream_raw(xref) or doc.xref_object(xref, compressed=True).encode()
+            digests[xref] = hashlib.sha256(content).digest()
+        return digests[xref]
+
+    fingerprints = []
+    for page in doc:
+        h = hashlib.sha256()
+        h.update(repr((tuple(page.rect), page.rotation)).encode())
+        h.update(page.read_contents())
+        for xref, smask, *_, name, _filter, _referencer in page.get_images(full=True):
+            h.update(name.encode() + digest(xref) + digest(smask))
+        for xref, _ext, _type, basefont, name, encoding, *_ in page.get_fonts(full=True):
+            h.update(f"{name}:{basefont}:{encoding}".encode() + digest(xref))
+        for xref, name, *_ in page.get_xobjects():
+            h.update(name.encode() + digest(xref))
+        fingerprints.append(h.hexdigest())
+    return fingerprints
@@ -33,9 +33,71 @@ class Configs(BaseSettings):
     FTP_PORT: int = 2121
     FTP_USERNAME: str = "ftp_user"
     FTP_PASSWORD: str = "ftp_password"
+    FTP_POOL_SIZE: int = 4  # Maximum number of concurrent FTP sessions
+    FTP_TIMEOUT: float = 60.0  # Socket timeout in seconds for FTP commands and transfers
+    FTP_KEEPALIVE_INTERVAL: float = 30.0  # Seconds between NOOPs on idle sessions, 0 disables keep-alive
+    FTP_HEALTH_CHECK_AFTER: float = 5.0  # Idle sessions older than this are checked before reuse
 
     # Local Storage Configs
     LOCAL_DIR: str = "../../data/"
 
+    # Watch Folder Configs
+    WATCH_FOLDER_ENABLED: bool = False  # Convert PDFs dropped into <LOCAL_DIR>/pdf without a /convert call, local storage only
+    WATCH_DEBOUNCE: float = 1.0  # Seconds a dropped PDF must stay unchanged before it is converted
+
+    # Conversion Engine Configs
+    CONVERSION_WORKERS: int = 0  # Number of conversion worker processes, 0 uses one per CPU core
+    PAGE_SPLIT_THRESHOLD: int = 50  # Documents with more pages are converted as concurrent page ranges
+    PAGE_RANGE_SIZE: int = 10  # Number of pages per range when a document is split
+    DEFAULT_CONVERSION_PROFILE: str = "full"  # Profile for requests without one: fast, tables, full or auto
+    AUTO_PROFILE_SAMPLE_PAGES: int = 3  # Leading pages inspected by the auto profile
+    MARKDOWN_INDEX_ENABLED: bool = False  # Store a JSON index of pages, headings and tables next to the Markdown
+    INCREMENTAL_CONVERSION: bool = False  # Store a page manifest with the Markdown and reconvert only changed pages of revised PDFs
+    EXTRACT_IMAGES: bool = False  # Store images of tables and full conversions in md/assets and link them from the Markdown
+    IMAGE_FORMAT: str = "png"  # Format of extracted images: png or jpg
+    IMAGE_DPI: int = 150  # Resolution of extracted images
+
+    # Memory Configs
+    MEMORY_BUDGET_MB: int = 2048  # Estimated conversion memory admitted at once, on top of the warm workers, 0 disables the budget
+    MEMORY_ESTIMATE_BASE_MB: float = 200.0  # Estimated memory of each worker task running for a conversion
+    MEMORY_ESTIMATE_PER_PAGE_MB: float = 2.0  # Estimated memory per page of a conversion
+    MEMORY_ESTIMATE_FILE_FACTOR: float = 2.0  # Estimated bytes of memory per byte of PDF, for each worker task
+    WORKER_MAX_TASKS: int = 500  # Tasks a worker process runs before it is replaced, 0 disables
+    WORKER_MAX_RSS_MB: int = 1536  # Workers whose resident memory exceeds this after a task are replaced, 0 disables
+
+    # Job Profiling Configs
+    PROFILING_SAMPLE_RATE: float = 0.0  # Share of jobs profiled without asking, 0 profiles only requests with "profiling"
+    PROFILING_INTERVAL: float = 0.005  # Seconds of worker CPU time between profiler samples
+
+    # Conversion Cache Configs
+    CACHE_ENABLED: bool = True  # Reuse converted markdown for previously seen PDF content
+    CACHE_DIR: str = ""  # Cache directory, defaults to <LOCAL_DIR>/cache
+    CACHE_MAX_BYTES: int = 1024 * 1024 * 1024  # Least recently used entries are evicted above this size
+    SPOOL_DIR: str = ""  # Scratch directory for Markdown being converted and PDFs downloaded from FTP, defaults to <LOCAL_DIR>/spool
+
+    # Markdown Storage Configs
+    MD_COMPRESSION: str = ""  # Store Markdown as gzip (<name>.md.gz) or zstd (<name>.md.zst, needs zstandard), empty stores plain <name>.md
+    MD_COMPRESSION_LEVEL: int = 0  # Compression level, 0 uses the codec default
+
+    # Job Scheduler Configs
+    MAX_CONCURRENT_JOBS: int = 8  # Jobs fetched, converted and stored at the same time
+    MAX_QUEUED_JOBS: int = 1000  # Jobs waiting for a slot, further submissions get HTTP 429
+    JOB_DURATION_ESTIMATE: float = 10.0  # Initial job duration in seconds for Retry-After, refined as jobs finish
+    JOB_DEADLINE_BASE: float = 300.0  # Seconds a job may hold conversion workers before the watchdog cancels it, 0 disables deadlines
+    JOB_DEADLINE_PER_PAGE: float = 10.0  # Seconds added to a job's deadline per page once its page count is known
+    JOB_WATCHDOG_INTERVAL: float = 1.0  # Seconds between deadline checks
+
+    # Job Tracking Configs
+    JOB_HISTORY_LIMIT: int = 1000  # Number of finished jobs kept for status queries
+
     # Notification Callback URL
     NOTIFICATION_CALLBACK_URL: str = "http://localhost:6080/notification"
+    NOTIFICATION_TIMEOUT: float = 10.0  # Timeout in seconds for each callback attempt
+    NOTIFICATION_CONCURRENCY: int = 4  # Concurrent callback deliveries and pooled connections
+    NOTIFICATION_QUEUE_SIZE: int = 1000  # Outbox capacity, jobs wait when it is full
+    NOTIFICATION_MAX_RETRIES: int = 5  # Retries for failed deliveries (connection errors, 408, 429 and 5xx)
+    NOTIFICATION_RETRY_BASE_DELAY: float = 0.5  # First retry delay in seconds, doubled on every attempt
+    NOTIFICATION_RETRY_MAX_DELAY: float = 30.0  # Upper bound of the retry delay in seconds
+    NOTIFICATION_BATCH_CALLBACK_URL: str = ""  # URL for coalesced batch callbacks, empty sends every callback per job
+    NOTIFICATION_COALESCE_WINDOW: float = 0.0  # Seconds to merge callbacks of the same batch, 0 disables coalescing
+    NOTIFICATION_DRAIN_TIMEOUT: float = 30.0  # Seconds to deliver queued notifications on shutdown
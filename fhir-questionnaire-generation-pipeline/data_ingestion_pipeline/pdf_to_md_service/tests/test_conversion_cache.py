@@ -0,0 +1,145 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import asyncio
+import logging
+
+import pytest
+
+from settings import Configs
+from conversion_cache import ConversionCache, SingleFlight
+
+
+def make_cache(tmp_path, max_bytes: int) -> ConversionCache:
+    configs = Configs(LOCAL_DIR=str(tmp_path), CACHE_MAX_BYTES=max_bytes, MARKDOWN_INDEX_ENABLED=False)
+    cache = ConversionCache(configs, logging.getLogger(__name__))
+    cache.load()
+    return cache
+
+
+def writer(content: str):
+    async def convert(path: str):
+        with open(path, "w") as f:
+            f.write(content)
+    return convert
+
+
+def test_single_flight_shares_result():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(flight.do("key", fn), flight.do("key", fn), flight.do("key", fn))
+        return calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert sorted(results) == [("result", False), ("result", True), ("result", True)]
+
+
+def test_single_flight_reruns_after_cancelled_leader():
+    async def scenario():
+        flight = SingleFlight()
+        started = asyncio.Event()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            started.set()
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        leader = asyncio.create_task(flight.do("key", fn))
+        await started.wait()
+        follower = asyncio.create_task(flight.do("key", fn))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower, calls
+
+    result, calls = asyncio.run(scenario())
+    # The follower ran the call itself instead of inheriting the cancellation
+    assert result == (2, False)
+    assert len(calls) == 2
+
+
+def test_single_flight_cancelled_follower_leaves_leader_running():
+    async def scenario():
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def fn():
+            started.set()
+            await asyncio.sleep(0.01)
+            return "result"
+
+        leader = asyncio.create_task(flight.do("key", fn))
+        await started.wait()
+        follower = asyncio.create_task(flight.do("key", fn))
+        await asyncio.sleep(0)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert asyncio.run(scenario()) == ("result", False)
+
+
+def test_pinned_entry_survives_eviction(tmp_path):
+    async def scenario():
+        cache = make_cache(tmp_path, max_bytes=15)
+        first, _ = await cache.get_or_convert("first", writer("a" * 10))
+        second, _ = await cache.get_or_convert("second", writer("b" * 10))
+        # "first" is over the budget but still being read
+        assert os.path.exists(first)
+        await cache.release(first)
+        await cache.release(second)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    # Releasing the last pin evicts the entry that was skipped
+    assert not os.path.exists(first)
+    assert os.path.exists(second)
+
+
+def test_shared_conversion_pins_for_each_caller(tmp_path):
+    async def scenario():
+        cache = make_cache(tmp_path, max_bytes=15)
+
+        async def slow(path: str):
+            await asyncio.sleep(0.01)
+            await writer("a" * 10)(path)
+
+        (leader, _), (follower, shared) = await asyncio.gather(
+            cache.get_or_convert("first", slow), cache.get_or_convert("first", slow)
+        )
+        assert shared and leader == follower
+        await cache.release(leader)
+        other, _ = await cache.get_or_convert("second", writer("b" * 10))
+        # The follower still holds a pin
+        assert os.path.exists(follower)
+        await cache.release(follower)
+        await cache.release(other)
+        return follower
+
+    assert not os.path.exists(asyncio.run(scenario()))
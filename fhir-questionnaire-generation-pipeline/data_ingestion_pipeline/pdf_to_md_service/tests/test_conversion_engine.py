@@ -0,0 +1,61 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import asyncio
+import logging
+
+import pytest
+
+from settings import Configs
+from models import ConversionProfile
+from conversion_engine import ConversionEngine
+
+SAMPLE_PDF = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "assets", "Sample_MRI_Medical_Policy.pdf"
+)
+
+
+def reference_markdown(profile: ConversionProfile) -> str:
+    import pymupdf4llm
+    return pymupdf4llm.to_markdown(SAMPLE_PDF, use_ocr=profile == ConversionProfile.FULL)
+
+
+def convert(tmp_path, profile: ConversionProfile, parallel_pages: bool) -> str:
+    output_path = str(tmp_path / "output.md")
+
+    async def scenario():
+        engine = ConversionEngine(Configs(CONVERSION_WORKERS=2, PAGE_RANGE_SIZE=1), logging.getLogger(__name__))
+        try:
+            return await engine.convert(SAMPLE_PDF, output_path, parallel_pages=parallel_pages, profile=profile)
+        finally:
+            engine.shutdown()
+
+    result = asyncio.run(scenario())
+    with open(output_path, encoding="utf-8") as f:
+        content = f.read()
+    assert sum(result.page_sizes) == len(content.encode("utf-8"))
+    return content
+
+
+@pytest.mark.parametrize("profile", [ConversionProfile.TABLES, ConversionProfile.FULL])
+def test_unsplit_conversion_matches_to_markdown(tmp_path, profile):
+    assert convert(tmp_path, profile, parallel_pages=False) == reference_markdown(profile)
+
+
+@pytest.mark.parametrize("profile", [ConversionProfile.TABLES, ConversionProfile.FULL])
+def test_page_range_conversion_matches_to_markdown(tmp_path, profile):
+    assert convert(tmp_path, profile, parallel_pages=True) == reference_markdown(profile)
@@ -0,0 +1,123 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import asyncio
+import logging
+
+from settings import Configs
+from job_clock import holding_worker
+from job_scheduler import JobScheduler, ScheduledJob
+
+
+def make_scheduler(**settings) -> JobScheduler:
+    return JobScheduler(Configs(**settings), logging.getLogger(__name__))
+
+
+def test_deadline_counts_only_time_holding_a_worker():
+    async def scenario():
+        scheduler = make_scheduler(JOB_DEADLINE_BASE=0.2, JOB_DEADLINE_PER_PAGE=0, JOB_WATCHDOG_INTERVAL=0.02)
+        outcomes = {}
+
+        async def waiting():
+            # Stands in for queueing for memory or a worker, and FTP transfers
+            await asyncio.sleep(0.4)
+            outcomes["waiting"] = "completed"
+
+        async def converting():
+            with holding_worker():
+                await asyncio.sleep(0.4)
+            outcomes["converting"] = "completed"
+
+        async def on_cancel(job_id, reason):
+            outcomes[job_id] = reason
+
+        scheduler.submit("lane", [
+            ScheduledJob(job_id=job_id, run=run, on_cancel=lambda reason, job_id=job_id: on_cancel(job_id, reason))
+            for job_id, run in (("waiting", waiting), ("converting", converting))
+        ])
+        await asyncio.sleep(0.6)
+        await scheduler.close()
+        return outcomes
+
+    assert asyncio.run(scenario()) == {"waiting": "completed", "converting": "timeout"}
+
+
+def test_deadline_counts_overlapping_worker_tasks_once():
+    async def scenario():
+        scheduler = make_scheduler(JOB_DEADLINE_BASE=0.3, JOB_DEADLINE_PER_PAGE=0, JOB_WATCHDOG_INTERVAL=0.02)
+        outcomes = []
+
+        async def page_range():
+            with holding_worker():
+                await asyncio.sleep(0.2)
+
+        async def run():
+            # Page ranges converted at once hold several workers for 0.2 seconds of wall time
+            await asyncio.gather(*(page_range() for _ in range(4)))
+            outcomes.append("completed")
+
+        scheduler.submit("lane", [ScheduledJob(job_id="job", run=run)])
+        await asyncio.sleep(0.4)
+        await scheduler.close()
+        return outcomes
+
+    assert asyncio.run(scenario()) == ["completed"]
+
+
+def run_order(scheduler: JobScheduler, submissions) -> list:
+    """Submit (lane, job IDs, priority) groups while the only slot is busy and return the order jobs start in."""
+    async def scenario():
+        started = []
+        release = asyncio.Event()
+
+        async def blocker():
+            await release.wait()
+
+        def job(job_id, priority):
+            async def run():
+                started.append(job_id)
+            return ScheduledJob(job_id=job_id, run=run, priority=priority)
+
+        scheduler.submit("blocker", [ScheduledJob(job_id="blocker", run=blocker)])
+        for lane, job_ids, priority in submissions:
+            scheduler.submit(lane, [job(job_id, priority) for job_id in job_ids])
+        release.set()
+        while scheduler.running or scheduler.queued:
+            await asyncio.sleep(0.01)
+        await scheduler.close()
+        return started
+
+    return asyncio.run(scenario())
+
+
+def test_lanes_are_served_round_robin():
+    scheduler = make_scheduler(MAX_CONCURRENT_JOBS=1, JOB_DEADLINE_BASE=0)
+    order = run_order(scheduler, [
+        ("batch:a", ["a1", "a2", "a3"], 0),
+        ("batch:b", ["b1", "b2"], 0),
+        ("job:c", ["c1"], 0),
+    ])
+    assert order == ["a1", "b1", "c1", "a2", "b2", "a3"]
+
+
+def test_higher_priority_lanes_go_first():
+    scheduler = make_scheduler(MAX_CONCURRENT_JOBS=1, JOB_DEADLINE_BASE=0)
+    order = run_order(scheduler, [
+        ("batch:a", ["a1", "a2"], 0),
+        ("job:b", ["b1"], 5),
+        ("batch:c", ["c1", "c2"], 5),
+    ])
+    assert order == ["b1", "c1", "c2", "a1", "a2"]
@@ -0,0 +1,43 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+from settings import Configs
+from models import JobStage
+from job_store import JobStore
+
+
+def test_jobs_joining_a_conversion_follow_the_job_running_it():
+    jobs = JobStore(Configs())
+    for job_id in ("leader", "early", "late"):
+        jobs.create(job_id, "policy.pdf")
+        jobs.set_stage(job_id, JobStage.FETCH)
+
+    jobs.join_conversion("policy.pdf:tables", "leader")
+    jobs.lead_conversion("policy.pdf:tables", "leader")
+    jobs.join_conversion("policy.pdf:tables", "early")
+    jobs.set_stage("leader", JobStage.CONVERT)
+    jobs.set_progress("leader", 3, 10)
+    assert (jobs.get("early").stage, jobs.get("early").pages_done, jobs.get("early").pages_total) == (JobStage.CONVERT, 3, 10)
+
+    # A job joining later catches up with the current stage and progress
+    jobs.join_conversion("policy.pdf:tables", "late")
+    assert (jobs.get("late").stage, jobs.get("late").pages_done) == (JobStage.CONVERT, 3)
+
+    jobs.leave_conversion("policy.pdf:tables", "leader")
+    jobs.set_stage("leader", JobStage.NOTIFY)
+    assert jobs.get("early").stage == JobStage.CONVERT
+    assert jobs.get("early").timings.get("fetch") is not None
@@ -0,0 +1,80 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import json
+
+from markdown_index import build_index, index_path, write_index
+
+PAGES = [
+    "# **Policy**\n\nIntro é\n\n## Coverage\n\n| Code | Limit |\n| --- | ---: |\n| 70551 | 1 |\n\n",
+    "```\n# not a heading\n| not | a table |\n```\n\n### Details\n\n## Exclusions\n\nNone\n",
+]
+
+
+def write_markdown(tmp_path) -> str:
+    path = tmp_path / "doc.md"
+    path.write_bytes("".join(PAGES).encode("utf-8"))
+    return str(path)
+
+
+def page_sizes():
+    return [len(page.encode("utf-8")) for page in PAGES]
+
+
+def section(content: bytes, span) -> str:
+    return content[span.start:span.end].decode("utf-8")
+
+
+def test_offsets_point_at_pages_headings_and_tables(tmp_path):
+    path = write_markdown(tmp_path)
+    content = open(path, "rb").read()
+    index = build_index(path, page_sizes())
+
+    assert index.markdown_bytes == len(content)
+    assert [section(content, page) for page in index.pages] == PAGES
+    assert [(h.level, h.title, h.page) for h in index.headings] == [
+        (1, "Policy", 1), (2, "Coverage", 1), (3, "Details", 2), (2, "Exclusions", 2)
+    ]
+    # Offsets are in bytes, past the two-byte "é"
+    assert section(content, index.headings[1]).startswith("## Coverage\n")
+    assert len(index.tables) == 1
+    table = index.tables[0]
+    assert (table.page, table.rows) == (1, 2)
+    assert section(content, table).startswith("| Code | Limit |")
+    assert section(content, table).endswith("| 70551 | 1 |\n")
+
+
+def test_sections_nest_and_end_at_the_next_heading_of_their_level(tmp_path):
+    path = write_markdown(tmp_path)
+    content = open(path, "rb").read()
+    policy, coverage, details, exclusions = build_index(path, page_sizes()).headings
+
+    assert (policy.parent, coverage.parent, details.parent, exclusions.parent) == (None, 0, 1, 0)
+    # A section spans the pages its subsections are on
+    assert coverage.end == exclusions.start
+    assert details.end == exclusions.start
+    assert policy.end == exclusions.end == len(content)
+    assert section(content, exclusions) == "## Exclusions\n\nNone\n"
+
+
+def test_written_index_records_its_encoding(tmp_path):
+    path = write_markdown(tmp_path)
+    write_index(path, page_sizes())
+    stored = json.loads(open(index_path(path), encoding="utf-8").read())
+
+    assert stored["encoding"] == "identity"
+    assert stored["markdown_bytes"] == sum(page_sizes())
+    assert stored["version"] == 1
@@ -14,27 +14,64 @@
 # specific language governing permissions and limitations
 # under the License.
 
-import httpx
+import os
+import time
+import shutil
+import random
+import asyncio
 import logging
-import pymupdf4llm
+from typing import Callable, List, Optional, Tuple
 from settings import Configs
+from models import ConversionProfile, JobStage
+from job_store import TERMINAL_STATUSES, JobStore
+from conversion_cache import ConversionCache
+from notification_utils import get_notification_dispatcher
+from metrics import BYTES_TRANSFERRED, CONVERSIONS, JOBS_CANCELLED, JOBS_FINISHED, PAGES_CONVERTED, PAGES_REUSED, STAGE_DURATION
+from page_manifest import PreviousOutput
+from job_profiler import JobProfile
+from image_assets import ImageExtraction, image_files
+from conversion_engine import ConversionEngine, ConversionResult, PdfSource, describe_source, output_variant
 
-from ftp_utils import read_pdf_file_ftp, store_md_content_ftp, delete_pdf_file_ftp
-from file_utils import read_pdf_file_local, store_md_content_local, delete_pdf_file_local
+from ftp_utils import (
+    read_pdf_file_ftp, store_md_content_ftp, delete_pdf_file_ftp, read_page_manifest_ftp, fetch_md_content_ftp,
+    store_artifacts_ftp, store_images_ftp
+)
+from file_utils import (
+    read_pdf_file_local, store_md_content_local, delete_pdf_file_local, read_page_manifest_local, fetch_md_content_local,
+    store_artifacts_local, store_images_local
+)
 
-def convert_pdf_to_markdown(pdfFile, logger: logging.Logger) -> str:
+async def convert_pdf_to_markdown(pdfFile: PdfSource, output_path: str, engine: ConversionEngine, logger: logging.Logger,
+                                  parallel_pages: Optional[bool] = None, on_progress: Optional[Callable[[int, int], None]] = None,
+                                  profile: Optional[ConversionProfile] = None, previous: Optional[PreviousOutput] = None,
+                                  job_profile: Optional[JobProfile] = None,
+                                  images: Optional[ImageExtraction] = None) -> ConversionResult:
     """
-    Convert a PDF document to Markdown format and save it to the specified directory.
+    Convert a PDF document to a Markdown file on the conversion engine's worker pool.
 
     Args:
-        source (str): The path or URL of the PDF document to convert.
-        output_dir (str): The directory where the Markdown file will be saved.
+        pdfFile (PdfSource): The path or in-memory content of the PDF document to convert.
+        output_path (str): The file the Markdown is written to, page by page.
+        engine (ConversionEngine): The engine that runs the conversion off the event loop.
+        parallel_pages (Optional[bool]): Overrides the page threshold for page-range parallel conversion.
+        on_progress (Optional[Callable]): Called with (pages_done, pages_total) as pages are converted.
+        profile (Optional[ConversionProfile]): The conversion profile, None uses the configured default.
+        previous (Optional[PreviousOutput]): Stored output of an earlier conversion, whose unchanged pages are reused.
+        job_profile (Optional[JobProfile]): Collects a sampling profile of the conversion's worker tasks when given.
+        images (Optional[ImageExtraction]): Extract images into its directory and link them from the Markdown.
     """
     try:
-        logger.info(f"Starting PDF to Markdown conversion for file: {pdfFile}")
-        markdown_content = pymupdf4llm.to_markdown(pdfFile)
-        logger.info("PDF to Markdown conversion completed successfully")
-        return markdown_content
+        logger.info(f"Starting PDF to Markdown conversion for file: {describe_source(pdfFile)}")
+        with STAGE_DURATION.time(stage="convert"):
+            result = await engine.convert(pdfFile, output_path, parallel_pages, on_progress, profile, previous, job_profile, images)
+        CONVERSIONS.inc(profile=result.profile.value)
+        PAGES_CONVERTED.inc(result.pages_converted)
+        PAGES_REUSED.inc(result.pages_reused)
+        logger.info(
+            f"PDF to Markdown conversion completed successfully with the '{result.profile.value}' profile, "
+            f"{result.pages_converted} page(s) converted and {result.pages_reused} reused"
+        )
+        return result
     except Exception as e:
         logger.error(f"An error occurred: {e}")
         raise e
@@ -43,8 +80,13 @@ def save_file(file_path: str, content: str) -> None:
     with open(file_path, "w") as f:
         f.write(content)
 
-async def send_notification(job_id: str, file_name: str, status: str, message: str, configs: Configs, logger: logging.Logger):
-    """Send notification to the callback URL."""
+async def send_notification(job_id: str, file_name: str, status: str, message: str, configs: Configs, logger: logging.Logger,
+                            batch_id: Optional[str] = None):
+    """Queue a notification for delivery to the callback URL.
+
+    Delivery, retries and batch coalescing are handled by the notification
+    dispatcher, so the job does not wait on the callback receiver.
+    """
     try:
         payload = {
             "job_id": job_id,
@@ -53,52 +95,207 @@ async def send_notification(job_id: str, file_name: str, status: str, message: s
             "message": message
         }
         logger.info(f"Sending notification to {configs.NOTIFICATION_CALLBACK_URL}: {payload}")
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(configs.NOTIFICATION_CALLBACK_URL, json=payload)
-            if response.status_code == 200:
-                logger.info(f"Notification sent successfully for job {job_id}")
-            else:
-                logger.warning(f"Notification failed with status {response.status_code} for job {job_id}")
+        await get_notification_dispatcher(configs, logger).enqueue(payload, batch_id)
     except Exception as e:
         logger.error(f"Failed to send notification for job {job_id}: {e}")
 
-async def process_pdf_file(job_id: str, file_name: str, logger: logging.Logger, configs: Configs):
+def effective_options(profile: Optional[ConversionProfile], extract_images: Optional[bool], configs: Configs,
+                      engine: ConversionEngine) -> Tuple[ConversionProfile, bool]:
+    """Resolve a request's profile and image extraction against the configured defaults."""
+    profile = ConversionProfile(profile or engine.default_profile)
+    extract_images = configs.EXTRACT_IMAGES if extract_images is None else extract_images
+    return profile, extract_images and profile != ConversionProfile.FAST
+
+async def read_previous_output(file_name: str, configs: Configs, logger: logging.Logger) -> Optional[PreviousOutput]:
+    """Return the stored markdown of an earlier conversion of `file_name` with its page manifest, if any."""
+    if configs.USE_FTP:
+        manifest = await read_page_manifest_ftp(file_name, configs, logger)
+        fetch = lambda dest_path: fetch_md_content_ftp(file_name, dest_path, configs, logger)
+    else:
+        manifest = await read_page_manifest_local(file_name, configs, logger)
+        fetch = lambda dest_path: fetch_md_content_local(file_name, dest_path, configs, logger)
+    if manifest is None:
+        return None
+    return PreviousOutput(manifest, fetch)
+
+async def convert_and_store(job_id: str, file_name: str, logger: logging.Logger, configs: Configs, engine: ConversionEngine,
+                            cache: ConversionCache, jobs: JobStore, parallel_pages: Optional[bool] = None,
+                            profile: Optional[ConversionProfile] = None, profiling: bool = False,
+                            extract_images: Optional[bool] = None) -> Optional[str]:
+    """Fetch a PDF, convert it and store the Markdown.
+
+    Previously converted content is served from the conversion cache, and
+    with INCREMENTAL_CONVERSION a revised PDF only converts the pages that
+    changed since its stored markdown was converted. Profiled jobs always convert and store their
+    profile next to the Markdown. Extracted images are stored before the conversion is
+    cached, so cached Markdown only links to images in storage.
+    Returns None on success, otherwise the failure message for the notification.
+    """
+    backend = "ftp" if configs.USE_FTP else "local"
+    # Local PDFs are converted in place, FTP downloads are spooled to a local file the workers read in place
+    spooled_pdf = cache.spool_path(".pdf") if configs.USE_FTP else None
+    try:
+        with STAGE_DURATION.time(stage=f"read_pdf_file_{backend}"):
+            if configs.USE_FTP:
+                pdf_source = spooled_pdf if await read_pdf_file_ftp(file_name, spooled_pdf, configs, logger) else None
+            else:
+                pdf_source = await read_pdf_file_local(file_name, configs, logger)
+        if not pdf_source:
+            logger.error(f"Job {job_id} failed - PDF file not found")
+            return "pdf_not_found"
+        pdf_size = os.path.getsize(pdf_source)
+        BYTES_TRANSFERRED.inc(pdf_size, backend=backend, direction="read")
+
+        # Convert PDF to markdown unless the same content was converted before
+        jobs.set_stage(job_id, JobStage.CONVERT)
+        # Profiles and image extraction produce different Markdown, plain full conversions keep the unsuffixed key of earlier entries
+        profile, extract_images = effective_options(profile, extract_images, configs, engine)
+        variant = output_variant(profile, extract_images)
+        cache_key = await cache.key_for(pdf_source, "" if variant == ConversionProfile.FULL.value else variant)
+        job_profile = JobProfile(configs.PROFILING_INTERVAL) if profiling else None
+        artifacts: List[Tuple[str, str]] = []
+
+        async def convert(output_path: str):
+            previous = await read_previous_output(file_name, configs, logger) if configs.INCREMENTAL_CONVERSION else None
+            started = time.perf_counter()
+            images = ImageExtraction(f"{output_path}.images", configs.IMAGE_FORMAT, configs.IMAGE_DPI) if extract_images else None
+            try:
+                result = await convert_pdf_to_markdown(
+                    pdf_source, output_path, engine, logger, parallel_pages,
+                    on_progress=lambda done, total: jobs.set_progress(job_id, done, total), profile=profile, previous=previous,
+                    job_profile=job_profile, images=images
+                )
+                names = image_files(images.directory) if images is not None else []
+                if names:
+                    with STAGE_DURATION.time(stage=f"store_images_{backend}"):
+                        if configs.USE_FTP:
+                            written = await store_images_ftp(images.directory, names, configs, logger)
+                        else:
+                            written = await store_images_local(images.directory, names, configs, logger)
+                    if written is None:
+                        raise RuntimeError(f"Could not store the images of {file_name}")
+                    BYTES_TRANSFERRED.inc(written, backend=backend, direction="write")
+            finally:
+                if images is not None:
+                    await asyncio.to_thread(shutil.rmtree, images.directory, True)
+            if job_profile is not None:
+                artifacts.extend(await asyncio.to_thread(
+                    job_profile.write, os.path.splitext(output_path)[0], job_id=job_id, file_name=file_name,
+                    profile=result.profile.value, page_count=len(result.page_sizes),
+                    pages_reused=result.pages_reused, wall_seconds=round(time.perf_counter() - started, 6)
+                ))
+
+        # A profiled job converts even when the content is cached, to have something to profile
+        md_path, reused = await cache.get_or_convert(cache_key, convert, reuse=not profiling)
+    finally:
+        # The PDF is not needed for uploading. Removed without awaiting, so a cancellation can't skip releasing md_path
+        if spooled_pdf is not None and os.path.exists(spooled_pdf):
+            os.remove(spooled_pdf)
+    if reused:
+        logger.info(f"Job {job_id} reused converted markdown for {file_name}")
+    if not md_path:
+        logger.error(f"Job {job_id} failed during conversion")
+        return "conversion_failed"
+
+    # Stream the markdown file to storage
+    jobs.set_stage(job_id, JobStage.STORE)
+    try:
+        with STAGE_DURATION.time(stage=f"store_md_content_{backend}"):
+            if configs.USE_FTP:
+                stored_bytes = await store_md_content_ftp(file_name, md_path, configs, logger)
+            else:
+                stored_bytes = await store_md_content_local(file_name, md_path, configs, logger)
+        # A missing profile does not fail the job
+        if artifacts and stored_bytes is not None:
+            if configs.USE_FTP:
+                await store_artifacts_ftp(file_name, artifacts, configs, logger)
+            else:
+                await store_artifacts_local(file_name, artifacts, configs, logger)
+    finally:
+        await cache.release(md_path)
+        for _, path in artifacts:
+            if os.path.exists(path):
+                os.remove(path)
+    logger.info(f"Storage success: {stored_bytes is not None}")
+    if stored_bytes is None:
+        logger.error(f"Job {job_id} failed during storage")
+        return "storage_failed"
+    # Bytes as stored, after compression
+    BYTES_TRANSFERRED.inc(stored_bytes, backend=backend, direction="write")
+    return None
+
+async def finish_job(job_id: str, file_name: str, status: str, message: str, logger: logging.Logger, configs: Configs,
+                     jobs: JobStore):
+    """Send the job's notification and record its outcome."""
+    jobs.set_stage(job_id, JobStage.NOTIFY)
+    job = jobs.get(job_id)
+    with STAGE_DURATION.time(stage="send_notification"):
+        await send_notification(job_id, file_name, status, message, configs, logger, job.batch_id if job else None)
+    jobs.finish(job_id, status, message)
+    JOBS_FINISHED.inc(status=status)
+
+async def cancel_pdf_file(job_id: str, file_name: str, reason: str, logger: logging.Logger, configs: Configs, jobs: JobStore):
+    """Report a job cancelled through the API ("cancelled") or by the deadline watchdog ("timeout").
+
+    Cancelled jobs fail with the reason as the notification message, so
+    callback receivers handle them like any other failed conversion.
+    """
+    job = jobs.get(job_id)
+    if job is not None and job.status in TERMINAL_STATUSES:
+        # Cancelled after its notification was sent, while removing the PDF
+        return
+    JOBS_CANCELLED.inc(reason=reason)
+    await finish_job(job_id, file_name, "failed", reason, logger, configs, jobs)
+
+async def process_pdf_file(job_id: str, file_name: str, logger: logging.Logger, configs: Configs, engine: ConversionEngine,
+                           cache: ConversionCache, jobs: JobStore, parallel_pages: Optional[bool] = None,
+                           profile: Optional[ConversionProfile] = None, profiling: bool = False,
+                           extract_images: Optional[bool] = None):
     """Background task to process PDF file conversion."""
-    file_path = None
+
+    async def notify(status: str, message: str):
+        await finish_job(job_id, file_name, status, message, logger, configs, jobs)
+
     try:
         logger.info(f"Job {job_id} started processing for file {file_name}")
-        file_path = None
-        if configs.USE_FTP:
-            file_path = await read_pdf_file_ftp(file_name, configs, logger)
+        jobs.set_stage(job_id, JobStage.FETCH)
+        profile, extract_images = effective_options(profile, extract_images, configs, engine)
+        profiling = profiling or random.random() < configs.PROFILING_SAMPLE_RATE
+        run = lambda: convert_and_store(
+            job_id, file_name, logger, configs, engine, cache, jobs, parallel_pages, profile, profiling, extract_images
+        )
+        if profiling:
+            # A profile belongs to the job that asked for it
+            error, shared = await run(), False
         else:
-            file_path = await read_pdf_file_local(file_name, configs, logger)
-        if not file_path:
-            logger.error(f"Job {job_id} failed - PDF file not found")
-            await send_notification(job_id, file_name, "failed", "pdf_not_found", configs, logger)
+            # Concurrent jobs for the same file and output share a single fetch, conversion and upload,
+            # and follow the stage and progress of the job that runs it
+            key = f"{file_name}:{output_variant(profile, extract_images)}"
+
+            async def lead():
+                jobs.lead_conversion(key, job_id)
+                return await run()
+
+            jobs.join_conversion(key, job_id)
+            try:
+                error, shared = await cache.coalesce_file(key, lead)
+            finally:
+                jobs.leave_conversion(key, job_id)
+        if shared:
+            logger.info(f"Job {job_id} joined an in-flight conversion of {file_name}")
+        if error:
+            await notify("failed", error)
             return
-        
-        # Convert PDF to markdown
-        markdown_content = convert_pdf_to_markdown(file_path, logger)
-        if markdown_content:
-            # Store the markdown content
-            if configs.USE_FTP:
-                storage_success = await store_md_content_ftp(file_name, markdown_content, file_path, configs, logger)
-            else:
-                storage_success = await store_md_content_local(file_name, markdown_content, configs, logger)
-            logger.info(f"Storage success: {storage_success}")
-            if storage_success:
-                logger.info(f"Job {job_id} completed successfully")
-                await send_notification(job_id, file_name, "completed", "pdf_to_md_done", configs, logger)
+
+        logger.info(f"Job {job_id} completed successfully")
+        await notify("completed", "pdf_to_md_done")
+        # Only the last job for the file removes it, so jobs with other options can still fetch it
+        if not jobs.has_unfinished(file_name, exclude=job_id):
+            with STAGE_DURATION.time(stage="delete_pdf_file_ftp" if configs.USE_FTP else "delete_pdf_file_local"):
                 if configs.USE_FTP:
                     await delete_pdf_file_ftp(file_name, configs, logger)
                 else:
                     await delete_pdf_file_local(file_name, configs, logger)
-            else:
-                logger.error(f"Job {job_id} failed during storage")
-                await send_notification(job_id, file_name, "failed", "storage_failed", configs, logger)
-        else:
-            logger.error(f"Job {job_id} failed during conversion")
-            await send_notification(job_id, file_name, "failed", "conversion_failed", configs, logger)
     except Exception as e:
         logger.error(f"Error processing job {job_id}: {e}")
-        await send_notification(job_id, file_name, "failed", f"error: {str(e)}", configs, logger)
+        await notify("failed", f"error: {str(e)}")
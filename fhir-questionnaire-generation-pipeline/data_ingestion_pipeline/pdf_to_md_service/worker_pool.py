@@ -0,0 +1,249 @@
+# Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+#
+# WSO2 LLC. licenses this file to you under the Apache License,
+# Version 2.0 (the "License"); you may not use this file except
+# in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+from metrics import WORKERS_RECYCLED
+from job_clock import holding_worker
+
+STOP_TIMEOUT = 5.0
+RESTART_DELAY = 1.0
+
+class WorkerCrashedError(Exception):
+    """Raised when a worker process exits while running a task."""
+
+def _worker_main(conn: Connection, initializer: Optional[Callable[[], Any]]):
+    """Run the initializer, report readiness and then run tasks received over `conn` until the pool closes it."""
+    try:
+        ready = (True, initializer() if initializer is not None else None)
+    except Exception as e:
+        ready = (False, e)
+    conn.send(ready)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            reply = (True, fn(*args))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # The result or exception could not be pickled
+            conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+class Worker:
+    """A worker process and the pipe its tasks are sent over."""
+
+    def __init__(self, context: multiprocessing.context.BaseContext, initializer: Optional[Callable[[], Any]]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, initializer), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.tasks = 0
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def rss(self) -> Optional[int]:
+        """Resident memory of the worker process in bytes, None where /proc is not available."""
+        try:
+            with open(f"/proc/{self.pid}/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def wait_ready(self) -> Tuple[bool, Any]:
+        """Block until the worker has run its initializer."""
+        return self.conn.recv()
+
+    def call(self, fn: Callable, args: Tuple) -> Tuple[bool, Any]:
+        """Run a task in the worker, blocking until it replies."""
+        self.conn.send((fn, args))
+        return self.conn.recv()
+
+    def kill(self):
+        # The thread waiting on the reply gets EOFError once the process is gone
+        self.process.kill()
+        self.process.join()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+class WorkerPool:
+    """A fixed number of worker processes that each run one task at a time.
+
+    Unlike `ProcessPoolExecutor`, the pool knows which process runs a task,
+    so a task that is cancelled while it runs, for example by the job
+    watchdog, has its worker killed and replaced without affecting the tasks
+    running on the other workers. A worker that crashes is replaced the same
+    way. Callers wait on the event loop for an idle worker.
+
+    New workers run `initializer` in the background before they take tasks,
+    so imports and other warm-up work are not paid by the first conversion.
+
+    MuPDF does not return all memory it allocates, so a worker is recycled
+    after `max_tasks` tasks, or when its resident memory is above `max_rss`
+    bytes after a task. It is stopped while idle and a new worker warms up
+    in its place. 0 disables either limit.
+    """
+
+    def __init__(self, size: int, logger: logging.Logger, initializer: Optional[Callable[[], Any]] = None,
+                 max_tasks: int = 0, max_rss: int = 0):
+        self.size = size
+        self.logger = logger
+        self.initializer = initializer
+        self.max_tasks = max_tasks
+        self.max_rss = max_rss
+        # Use spawn so workers never inherit the event loop or open sockets
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: Set[Worker] = set()
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._warming: Set[asyncio.Task] = set()
+        self._retiring: Set[asyncio.Task] = set()
+        # Each starting or busy worker has a thread waiting for its reply
+        self._threads = ThreadPoolExecutor(max_workers=size, thread_name_prefix="conversion-worker")
+
+    def start(self):
+        """Start the workers in the background, each becomes idle once it is warm.
+
+        The first worker warms up alone, so on hosts with few cores it isn't
+        slowed down by the others and the pool can take tasks sooner.
+        """
+        first = self._add_worker()
+        if self.size > 1:
+            first.add_done_callback(
+                lambda task: task.cancelled() or [self._add_worker() for _ in range(self.size - 1)]
+            )
+
+    def _add_worker(self, delay: float = 0) -> asyncio.Task:
+        task = asyncio.create_task(self._warm_up(delay))
+        self._warming.add(task)
+        task.add_done_callback(self._warming.discard)
+        return task
+
+    async def _warm_up(self, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        worker = Worker(self._context, self.initializer)
+        self._workers.add(worker)
+        loop = asyncio.get_running_loop()
+        try:
+            ok, result = await loop.run_in_executor(self._threads, worker.wait_ready)
+        except asyncio.CancelledError:
+            worker.kill()
+            self._workers.discard(worker)
+            raise
+        except (EOFError, OSError):
+            self.logger.error(f"Conversion worker {worker.pid} exited while starting, replacing it")
+            worker.kill()
+            self._workers.discard(worker)
+            self._add_worker(RESTART_DELAY)
+            return
+        if not ok:
+            # The worker still takes tasks, which do their own imports and report their own errors
+            self.logger.warning(f"Conversion worker {worker.pid} failed to warm up: {result}")
+        worker.ready = True
+        self._idle.put_nowait(worker)
+
+    def _replace(self, worker: Worker):
+        worker.kill()
+        self._workers.discard(worker)
+        self._add_worker()
+
+    def _recycle_reason(self, worker: Worker) -> Optional[str]:
+        if self.max_tasks and worker.tasks >= self.max_tasks:
+            return "tasks"
+        if self.max_rss:
+            rss = worker.rss()
+            if rss is not None and rss > self.max_rss:
+                return "rss"
+        return None
+
+    def _recycle(self, worker: Worker, reason: str):
+        """Stop an idle worker off the event loop and warm up a new one in its place."""
+        self.logger.info(f"Recycling conversion worker {worker.pid} after {worker.tasks} task(s) ({reason})")
+        WORKERS_RECYCLED.inc(reason=reason)
+        self._workers.discard(worker)
+        task = asyncio.create_task(asyncio.to_thread(worker.stop))
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+        self._add_worker()
+
+    @property
+    def ready_workers(self) -> int:
+        """Number of live workers that have finished warming up."""
+        return sum(1 for worker in self._workers if worker.ready)
+
+    def pids(self) -> List[int]:
+        return [worker.pid for worker in self._workers]
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run `fn(*args)` on an idle worker, killing the worker if the caller is cancelled.
+
+        The time the worker runs the task counts toward the calling job's deadline.
+        """
+        worker = await self._idle.get()
+        loop = asyncio.get_running_loop()
+        try:
+            with holding_worker():
+                ok, result = await loop.run_in_executor(self._threads, worker.call, fn, args)
+        except asyncio.CancelledError:
+            self.logger.warning(f"Killing conversion worker {worker.pid} of a cancelled task")
+            self._replace(worker)
+            raise
+        except (EOFError, OSError) as e:
+            self.logger.error(f"Conversion worker {worker.pid} terminated unexpectedly, replacing it")
+            self._replace(worker)
+            raise WorkerCrashedError(f"Conversion worker exited with code {worker.process.exitcode}") from e
+        worker.tasks += 1
+        reason = self._recycle_reason(worker)
+        if reason is None:
+            self._idle.put_nowait(worker)
+        else:
+            self._recycle(worker, reason)
+        if not ok:
+            raise result
+        return result
+
+    def shutdown(self):
+        """Stop every worker, killing those that do not finish their task in time."""
+        for task in self._warming:
+            task.cancel()
+        for worker in list(self._workers):
+            worker.stop()
+        self._workers.clear()
+        self._threads.shutdown(wait=False, cancel_futures=True)
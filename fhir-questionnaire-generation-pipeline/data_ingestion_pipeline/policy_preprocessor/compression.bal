@@ -0,0 +1,57 @@
+// Copyright (c) 2026, WSO2 LLC. (http://www.wso2.com).
+
+// WSO2 LLC. licenses this file to you under the Apache License,
+// Version 2.0 (the "License"); you may not use this file except
+// in compliance with the License.
+// You may obtain a copy of the License at
+
+// http://www.apache.org/licenses/LICENSE-2.0
+
+// Unless required by applicable law or agreed to in writing,
+// software distributed under the License is distributed on an
+// "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+// KIND, either express or implied.  See the License for the
+// specific language governing permissions and limitations
+// under the License.
+
+import ballerina/jballerina.java;
+
+// The PDF-to-Markdown service stores Markdown gzip compressed as <name>.md.gz when MD_COMPRESSION=gzip.
+// Ballerina has no gzip module, so it is decompressed with the JDK's GZIPInputStream.
+function gunzipToString(byte[] compressed) returns string|error {
+    handle bytes = decodeBase64(base64Decoder(), java:fromString(compressed.toBase64()));
+    handle input = check newGzipInputStream(newByteArrayInputStream(bytes));
+    handle content = check newString(check readAllBytes(input), java:fromString("UTF-8"));
+    return java:toString(content) ?: "";
+}
+
+function base64Decoder() returns handle = @java:Method {
+    name: "getDecoder",
+    'class: "java.util.Base64"
+} external;
+
+function decodeBase64(handle decoder, handle encoded) returns handle = @java:Method {
+    name: "decode",
+    'class: "java.util.Base64$Decoder",
+    paramTypes: ["java.lang.String"]
+} external;
+
+function newByteArrayInputStream(handle bytes) returns handle = @java:Constructor {
+    'class: "java.io.ByteArrayInputStream",
+    paramTypes: [{'class: "byte", dimensions: 1}]
+} external;
+
+function newGzipInputStream(handle input) returns handle|error = @java:Constructor {
+    'class: "java.util.zip.GZIPInputStream",
+    paramTypes: ["java.io.InputStream"]
+} external;
+
+function readAllBytes(handle input) returns handle|error = @java:Method {
+    name: "readAllBytes",
+    'class: "java.io.InputStream"
+} external;
+
+function newString(handle bytes, handle charsetName) returns handle|error = @java:Constructor {
+    'class: "java.lang.String",
+    paramTypes: [{'class: "byte", dimensions: 1}, "java.lang.String"]
+} external;
@@ -47,10 +47,21 @@ function chunk_document(string fileName, string jobId) returns error? {
 }
 
 function readFileContent(string fileName) returns string|error {
-    stream<byte[] & readonly, io:Error?> fileBytes = check storageGet(string `/md/${fileName}.md`);
+    string? mdPath = check mdStoragePath(fileName);
+    if mdPath is () {
+        return error("MD file not found for " + fileName);
+    }
+    stream<byte[] & readonly, io:Error?> fileBytes = check storageGet(mdPath);
     string mdFileContent = "";
     byte[][] & readonly chunks = check from byte[] & readonly chunk in fileBytes
         select chunk;
+    if mdPath.endsWith(".gz") {
+        byte[] compressed = [];
+        foreach byte[] & readonly chunk in chunks {
+            compressed.push(...chunk);
+        }
+        return gunzipToString(compressed);
+    }
     foreach byte[] & readonly chunk in chunks {
         mdFileContent += check string:fromBytes(chunk);
     }
@@ -310,7 +321,8 @@ isolated function replaceExampleUrls(json input) returns json {
 }
 
 function deleteProcessedFiles(string fileName) {
-    error? mdResult = storageDelete(string `/md/${fileName}.md`);
+    string?|error mdPath = mdStoragePath(fileName);
+    error? mdResult = mdPath is string ? storageDelete(mdPath) : mdPath ?: error("MD file not found");
     if mdResult is error {
         log:printError(string `Failed to delete MD file for ${fileName}: ${mdResult.message()}`);
     } else {
@@ -127,8 +127,8 @@ service / on new http:Listener(SERVICE_PORT) {
             }
         }
 
-        boolean fileExists = check storageExists(string `/md/${payload.file_name}.md`);
-        if !fileExists {
+        string? mdPath = check mdStoragePath(payload.file_name);
+        if mdPath is () {
             return <http:NotFound>{body: {"error": "Source file not found: " + payload.file_name}};
         }
 
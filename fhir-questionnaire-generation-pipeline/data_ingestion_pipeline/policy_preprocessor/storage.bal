@@ -56,6 +56,17 @@ function storageGet(string path) returns stream<byte[] & readonly, io:Error?>|er
     }
 }
 
+// Markdown is stored plain, or gzip compressed when the PDF-to-Markdown service runs with MD_COMPRESSION=gzip
+function mdStoragePath(string fileName) returns string?|error {
+    foreach string suffix in [".md", ".md.gz"] {
+        string path = string `/md/${fileName}${suffix}`;
+        if check storageExists(path) {
+            return path;
+        }
+    }
+    return ();
+}
+
 function storagePut(string path, stream<byte[] & readonly, io:Error?>|json content) returns error? {
     if STORAGE_TYPE == "local" {
         string fullPath = LOCAL_STORAGE_PATH + path;